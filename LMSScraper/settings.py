@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'scraperSite',
 ]
 
@@ -98,8 +99,83 @@ DATABASES = {
         'PORT': '5432',           # default PostgreSQL port
     }
 }
+# Moodle sites this deployment scans: name (stored on reports and jobs), DB alias and
+# moodledata file store. Scans of different sites run concurrently. The first entry is the
+# primary site; the read replica, local mirror and live log tail below apply to it only.
+# To add a site, define a DATABASES alias for it and append e.g.
+#   {'name': 'moodle2', 'alias': 'moodle2', 'filedir': r'V:\\', 'wwwroot': 'https://moodle2.example.edu'}
+MOODLE_FILEDIR_ROOT = os.environ.get('MOODLE_FILEDIR_ROOT', r'U:\\')
+# wwwroot: the site's base URL, to resolve relative links in course HTML (left unresolved when empty)
+MOODLE_WWWROOT = os.environ.get('MOODLE_WWWROOT', '')
+MOODLE_INSTANCES = [
+    {'name': 'moodle', 'alias': 'moodle', 'filedir': MOODLE_FILEDIR_ROOT, 'wwwroot': MOODLE_WWWROOT},
+]
+
+# Optional Moodle read replica: when set, scans read from it instead of the primary above
+MOODLE_REPLICA_HOST = os.environ.get('MOODLE_REPLICA_HOST', '')
+if MOODLE_REPLICA_HOST:
+    DATABASES['moodle_replica'] = {
+        **DATABASES['moodle'],
+        'HOST': MOODLE_REPLICA_HOST,
+        'PORT': os.environ.get('MOODLE_REPLICA_PORT', DATABASES['moodle']['PORT']),
+    }
+# Local mirror of the Moodle tables the scanner reads, kept in the moodle_mirror schema of the
+# default DB by URL_mirror_sync. With MOODLE_READ_FROM_MIRROR=1 scans and pages read the mirror
+# instead of Moodle; the mirror is topped up before a scan once it is older than the max lag.
+DATABASES['moodle_mirror'] = {
+    **DATABASES['default'],
+    'OPTIONS': {'options': '-c search_path=moodle_mirror'},
+}
+MOODLE_READ_FROM_MIRROR = os.environ.get('MOODLE_READ_FROM_MIRROR', '0') == '1'
+MOODLE_MIRROR_MAX_LAG_SECONDS = int(os.environ.get('MOODLE_MIRROR_MAX_LAG_SECONDS', '300'))
 DATABASE_ROUTERS = ['scraperSite.db_routers.MoodleRouter']
 
+# Moodle DB load governor (per process): concurrent query cap, latency target above which
+# queries are delayed by the excess (up to the max backoff), optional fixed gap between
+# queries, and rows per fetch on streamed results.
+MOODLE_MAX_CONCURRENT_QUERIES = int(os.environ.get('MOODLE_MAX_CONCURRENT_QUERIES', '4'))
+MOODLE_TARGET_LATENCY_MS = int(os.environ.get('MOODLE_TARGET_LATENCY_MS', '250'))
+MOODLE_MAX_BACKOFF_MS = int(os.environ.get('MOODLE_MAX_BACKOFF_MS', '2000'))
+MOODLE_MIN_QUERY_INTERVAL_MS = int(os.environ.get('MOODLE_MIN_QUERY_INTERVAL_MS', '0'))
+MOODLE_FETCH_SIZE = int(os.environ.get('MOODLE_FETCH_SIZE', '1000'))
+
+# Course -> managers map on the manual scan page is cached this many seconds
+COURSE_MANAGERS_CACHE_TTL = int(os.environ.get('COURSE_MANAGERS_CACHE_TTL', '600'))
+
+# Scanner daemon (python manage.py URL_scanner_daemon): keeps the model resident and accepts
+# scan jobs on a local socket. Collectors fall back to scanning in-process if it is down.
+# SCANNER_DAEMON_AUTHKEY is a shared secret that must come from .env: without it the daemon will not
+# start and clients do not try to reach it.
+SCANNER_DAEMON_HOST = os.environ.get('SCANNER_DAEMON_HOST', '127.0.0.1')
+SCANNER_DAEMON_PORT = int(os.environ.get('SCANNER_DAEMON_PORT', '8765'))
+SCANNER_DAEMON_AUTHKEY = os.environ.get('SCANNER_DAEMON_AUTHKEY', '')
+
+# Scanner allowlist: URLs on these domains (or their subdomains) skip the AI model and VirusTotal.
+# Comma separated in .env, e.g. SCANNER_TRUSTED_DOMAINS=murdoch.edu.au,moodle.murdoch.edu.au
+SCANNER_TRUSTED_DOMAINS = [
+    d.strip() for d in os.environ.get('SCANNER_TRUSTED_DOMAINS', '').split(',') if d.strip()
+]
+
+# Read-only reporting API (/api/...): tools send "Authorization: Bearer <token>".
+# Comma separated in .env; logged-in site users can call the API without a token.
+REPORTING_API_TOKENS = [
+    t.strip() for t in os.environ.get('REPORTING_API_TOKENS', '').split(',') if t.strip()
+]
+
+# Adaptive scan schedule (scan_changed_courses): course scans queued per run, the share of them
+# kept for changed / risky courses when more courses than that are overdue, and the
+# longest any active course goes without a scan even when nothing in it changed.
+ADAPTIVE_SCAN_BUDGET = int(os.environ.get('ADAPTIVE_SCAN_BUDGET', '40'))
+ADAPTIVE_SCAN_CHANGED_SHARE = float(os.environ.get('ADAPTIVE_SCAN_CHANGED_SHARE', '0.5'))
+ADAPTIVE_SCAN_MAX_AGE_DAYS = int(os.environ.get('ADAPTIVE_SCAN_MAX_AGE_DAYS', '28'))
+
+# Scan job leases: a worker renews its lease every minute; a job whose lease lapses this long
+# (crashed or partitioned node) is handed to another worker, up to SCAN_JOB_MAX_ATTEMPTS times.
+SCAN_LEASE_SECONDS = int(os.environ.get('SCAN_LEASE_SECONDS', '300'))
+SCAN_JOB_MAX_ATTEMPTS = int(os.environ.get('SCAN_JOB_MAX_ATTEMPTS', '3'))
+# A caller waiting on a scan job (URL_collector_all, URL_collector_single) fails it after this long
+SCAN_JOB_WAIT_SECONDS = int(os.environ.get('SCAN_JOB_WAIT_SECONDS', '21600'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
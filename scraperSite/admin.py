@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import User, ScanReport, UnsafeURL
+from .models import User, ScanReport, UnsafeURL, ScheduledTask
 
 admin.site.register(User)
 admin.site.register(ScanReport)
 admin.site.register(UnsafeURL)
+admin.site.register(ScheduledTask)
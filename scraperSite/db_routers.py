@@ -1,24 +1,36 @@
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, moodle_aliases, MIRROR_ALIAS
+
+
 class MoodleRouter:
     """
-    Routes Moodle models to the Moodle DB (read-only) and other models to default.
-    Disallows migrations or writes to Moodle DB.
+    Routes Moodle models to the Moodle DB (read-only; or its replica / local mirror, see moodle_alias)
+    and other models to default. Disallows migrations or writes to Moodle DB.
     """
 
-    MOODLE_MODELS = ['course']  # lowercase model names that exist in Moodle
+    # lowercase model names that exist in Moodle (and are kept in the mirror)
+    MOODLE_MODELS = [
+        'moodlecourse', 'moodlechat', 'moodlechatmessage', 'moodleurl', 'moodlemodules', 'moodlecoursemodules',
+        'moodlecoursesection', 'moodleuser', 'moodleroleassign', 'moodlecontext', 'moodlerole',
+        'forum', 'forumdiscussion', 'forumpost',
+    ]
+    # Moodle-only models that are never mirrored
+    LIVE_MODELS = ['moodlelogentry']
 
     def db_for_read(self, model, **hints):
         if model._meta.model_name in self.MOODLE_MODELS:
-            return 'moodle'
+            return moodle_alias()
+        if model._meta.model_name in self.LIVE_MODELS:
+            return moodle_alias(fresh=True)
         return 'default'
 
     def db_for_write(self, model, **hints):
-        if model._meta.model_name in self.MOODLE_MODELS:
+        if model._meta.model_name in self.MOODLE_MODELS + self.LIVE_MODELS:
             return None  # disallow writes to Moodle
         return 'default'
 
     def allow_relation(self, obj1, obj2, **hints):
         # Allow relations if both objects are in the same database
-        db_list = ('default', 'moodle')
+        db_list = {'default', MIRROR_ALIAS} | moodle_aliases()
         if obj1._state.db in db_list and obj2._state.db in db_list:
             return True
         return None
@@ -27,7 +39,7 @@ class MoodleRouter:
         # Only allow migrations on the default DB
         if db == 'default':
             return True
-        # Never run migrations on Moodle DB
-        if db == 'moodle':
+        # Never run migrations on a Moodle DB (any site, the read replica, or the mirror URL_mirror_sync manages)
+        if db in moodle_aliases() or db == MIRROR_ALIAS:
             return False
         return None
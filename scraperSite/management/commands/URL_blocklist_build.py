@@ -0,0 +1,70 @@
+import csv
+import os
+import time
+from django.core.management.base import BaseCommand
+from scraperSite.management.helpers.domain_blocklist_helper import DomainBlocklist, BLOCKLIST_PATH
+
+ADULT_DOMAINS_PATH = "datasets/train/adult_domains.csv"
+MERGED_CSV_PATH = "datasets/train/merged_urls_dataset.csv"
+
+
+def iter_adult_domains(path):
+    """adult_domains.csv: one domain per line, no header (see adult_domain_collector)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if row and row[0].strip():
+                yield row[0].strip(), "adult"
+
+
+def iter_merged_dataset(path):
+    """merged_urls_dataset.csv: url,label (URLhaus malware, PhishTank phish, adult, benign)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield (row.get("url") or "").strip(), (row.get("label") or "").strip()
+
+
+class Command(BaseCommand):
+    help = "Build the compact domain/URL blocklist consulted by the scanner before the AI model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--adult", type=str, default=ADULT_DOMAINS_PATH, help="Adult domain list CSV")
+        parser.add_argument("--merged", type=str, default=MERGED_CSV_PATH, help="Merged URL dataset CSV")
+        parser.add_argument("--output", type=str, default=BLOCKLIST_PATH, help="Where to save the .npz index")
+
+    def handle(self, *args, **options):
+        domains, urls = [], []
+
+        if os.path.exists(options["adult"]):
+            domains.extend(iter_adult_domains(options["adult"]))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ Adult domain list not found: {options['adult']}"))
+
+        if os.path.exists(options["merged"]):
+            for url, label in iter_merged_dataset(options["merged"]):
+                # Adult sources are whole-domain lists; malware/phish feeds list individual URLs
+                if label == "adult":
+                    domains.append((url, label))
+                elif label in ("phish", "malware"):
+                    urls.append((url, label))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ Merged dataset not found: {options['merged']}"))
+
+        if not domains and not urls:
+            self.stderr.write("❌ No blocklist sources found — nothing to build.")
+            return
+
+        start = time.perf_counter()
+        blocklist = DomainBlocklist.build(domains=domains, urls=urls)
+        elapsed = time.perf_counter() - start
+
+        blocklist.save(options["output"])
+
+        entries = len(blocklist)
+        per_million = 1_000_000 / entries if entries else 0
+        self.stdout.write(self.style.SUCCESS(f"✅ Blocklist saved to {options['output']} ({entries} entries)"))
+        self.stdout.write(f"   → Sources: {len(domains)} domains, {len(urls)} URLs")
+        self.stdout.write(f"   → Build time: {elapsed:.2f}s ({elapsed * per_million:.2f}s per million)")
+        self.stdout.write(
+            f"   → Index size: {blocklist.nbytes / 1024 / 1024:.2f} MB "
+            f"({blocklist.nbytes * per_million / 1024 / 1024:.2f} MB per million)"
+        )
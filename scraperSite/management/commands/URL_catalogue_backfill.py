@@ -0,0 +1,96 @@
+import csv
+import re
+from datetime import datetime
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from scraperSite.models import ScanOutput, ScanResult
+from scraperSite.management.helpers.domain_blocklist_helper import registered_domain
+
+# {scan_type}_{course_id}_{YYYYmmdd_HHMMSS}_scanned.txt, as written by scan_from_file
+SCANNED_FILE_RE = re.compile(r"^(auto|manual)_(\d+)_(\d{8}_\d{6})_scanned\.txt$")
+HEADER_LINES = 4  # Exported on / Course ID / Course Name / ===== separator
+
+
+def parse_confidence(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def read_scanned_file(path):
+    """Course name and the result rows of a scanned output file."""
+    course_name = ""
+    with open(path, newline="", encoding="utf-8") as f:
+        for _ in range(HEADER_LINES):
+            line = f.readline()
+            if line.startswith("Course Name:"):
+                course_name = line.split(":", 1)[1].strip()
+        rows = [
+            ScanResult(
+                url=row.get("url") or "",
+                domain=registered_domain(row.get("url") or ""),
+                author_username=row.get("authorUsername") or "",
+                author_name=row.get("authorName") or "",
+                author_email=row.get("authorEmail") or "",
+                source=row.get("source") or "",
+                pred_label=row.get("pred_label") or "",
+                confidence=parse_confidence(row.get("confidence")),
+                vt_result=row.get("vt_result") or "",
+                final_status=row.get("final_status") or "benign",
+                verdict_source=row.get("verdict_source") or "",
+            )
+            for row in csv.DictReader(f)
+        ]
+    return course_name, rows
+
+
+class Command(BaseCommand):
+    help = "Load scanned output files already under url_details/ into the ScanOutput/ScanResult tables (one-off)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", type=str, default="url_details", help="Scan output root folder")
+
+    def handle(self, *args, **options):
+        base_dir = Path(options["dir"])
+        if not base_dir.exists():
+            self.stderr.write(f"❌ Folder not found: {base_dir}")
+            return
+
+        # Outputs that already have their rows loaded are skipped
+        known = set(ScanOutput.objects.filter(results__isnull=False).values_list("path", flat=True).distinct())
+        added = 0
+
+        for txt_file in sorted(base_dir.glob("*/*_scanned.txt")):
+            match = SCANNED_FILE_RE.match(txt_file.name)
+            if not match or str(txt_file) in known:
+                continue
+
+            scan_type, course_id, stamp = match.groups()
+            course_name, results = read_scanned_file(txt_file)
+            statuses = [r.final_status for r in results]
+            safe = statuses.count("benign")
+            suspicious = statuses.count("suspicious")
+
+            with transaction.atomic():
+                output, _ = ScanOutput.objects.update_or_create(
+                    path=str(txt_file),
+                    defaults=dict(
+                        moodle_courseID=int(course_id),
+                        moodle_courseName=course_name,
+                        scan_type=scan_type,
+                        scanned_at=timezone.make_aware(datetime.strptime(stamp, "%Y%m%d_%H%M%S")),
+                        total_link=len(results),
+                        safe_link=safe,
+                        suspicious=suspicious,
+                        malicious=len(results) - safe - suspicious,
+                    ),
+                )
+                for result in results:
+                    result.output = output
+                ScanResult.objects.bulk_create(results, batch_size=1000)
+            added += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Loaded {added} scanned file(s) ({len(known)} already loaded)"))
@@ -1,60 +1,66 @@
 from django.core.management.base import BaseCommand
-from django.core.management import call_command
 from django.utils import timezone
-from scraperSite.models import MoodleCourse
-from scraperSite.management.helpers.URL_collector_helper import export_course_urls
-from datetime import timedelta
+from scraperSite.models import ScanJob
+from scraperSite.management.helpers.scan_queue_helper import enqueue_scan_job
+from scraperSite.management.helpers.scan_run_helper import start_or_resume_run, run_units
+from scraperSite.management.helpers.scheduler_helper import active_courses
+from scraperSite.management.helpers.moodle_db_helper import moodle_instances
 
 class Command(BaseCommand):
-    help = "Export and immediately scan Moodle URLs for courses that are visible or starting soon"
+    help = (
+        "Export and immediately scan Moodle URLs for courses that are visible or starting soon, "
+        "on every configured Moodle site (sites are scanned concurrently)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--enqueue",
+            action="store_true",
+            help="Only queue batch-priority scan jobs for the scanner daemon / URL_worker nodes instead of scanning here",
+        )
+        parser.add_argument(
+            "--fresh",
+            action="store_true",
+            help="Abandon an unfinished earlier run instead of resuming it",
+        )
 
     def handle(self, *args, **options):
-        now_ts = int(timezone.now().timestamp())
-        cutoff_ts = now_ts + 4 * 7 * 24 * 60 * 60  # 4 weeks ahead
-
-        # Fetch courses
-        courses = []
-        for c in MoodleCourse.objects.using("moodle").all():
-            start_ts = int(c.startdate)
-            # If timestamp is in milliseconds, convert to seconds
-            if start_ts > 1e12:
-                start_ts = start_ts // 1000
-
-            if c.visible == 1:
-                courses.append(c)
-            elif c.visible == 0 and now_ts <= start_ts <= cutoff_ts:
-                courses.append(c)
-
-        if not courses:
+        # Visible courses plus hidden ones starting within 4 weeks, per Moodle site
+        courses = {site["name"]: active_courses(instance=site["name"]) for site in moodle_instances()}
+        total = sum(len(site_courses) for site_courses in courses.values())
+
+        if not total:
             self.stdout.write(self.style.WARNING("⚠️ No courses found matching criteria."))
             return
 
-        total = 0
-        for course in courses:
-            scanner_file = export_course_urls(course)
-            if not scanner_file:
-                self.stdout.write(self.style.WARNING(
-                    f"⚠️ No URLs found for course: {course.fullname}"
-                ))
-                continue
-
-            total += 1
+        if options.get("enqueue"):
+            queued = 0
+            for instance, site_courses in courses.items():
+                for course in site_courses:
+                    _, created = enqueue_scan_job(course.id, scan_type="auto", priority=ScanJob.PRIORITY_BATCH,
+                                                  instance=instance)
+                    queued += int(created)
             self.stdout.write(self.style.SUCCESS(
-                f"✅ Prepared URLs for scanning: {scanner_file}"
+                f"🧾 Queued {queued} course scan(s) ({total - queued} already in flight); "
+                f"manual scans will still be served first."
+            ))
+            return
+
+        run, resumed = start_or_resume_run(courses, fresh=options["fresh"])
+        if resumed:
+            done = run.units.filter(status="done").count()
+            self.stdout.write(self.style.WARNING(
+                f"⏯️ Resuming run #{run.run_id} from {timezone.localtime(run.started_at):%Y-%m-%d %H:%M} "
+                f"({done} of {run.units.count()} course(s) already done)"
             ))
+        else:
+            sites = ", ".join(f"{len(c)} on {instance}" for instance, c in courses.items() if c)
+            self.stdout.write(f"🆕 Run #{run.run_id} over {total} course(s) ({sites})")
 
-            # 🧩 Run the scanner immediately for this file
-            self.stdout.write(f"🔍 Scanning URLs for: {course.fullname} ...")
-            try:
-                call_command("URL_scanner", file=scanner_file)
-                self.stdout.write(self.style.SUCCESS(
-                    f"✅ Scan completed for: {course.fullname}"
-                ))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(
-                    f"❌ Error scanning {course.fullname}: {e}"
-                ))
+        # 🧩 Collect + scan each course (on the scanner daemon / workers when running).
+        # A course already being scanned, e.g. by a manual scan, is attached to, not rescanned.
+        counts = run_units(run, report=self.stdout.write)
 
         self.stdout.write(self.style.SUCCESS(
-            f"🎉 Completed URL export and scan for {total} course(s)."
+            f"🎉 Run #{run.run_id} complete: {counts['done']} course(s) scanned, {counts['failed']} failed."
         ))
@@ -2,8 +2,8 @@
 
 from django.core.management.base import BaseCommand
 from scraperSite.models import MoodleCourse
-from scraperSite.management.helpers.URL_collector_helper import export_course_urls
-from scraperSite.management.helpers.URL_scanner_helper import scan_from_file
+from scraperSite.management.helpers.scan_queue_helper import run_course_scan, scan_service_available
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, get_instance
 
 
 class Command(BaseCommand):
@@ -23,33 +23,49 @@ class Command(BaseCommand):
             choices=['auto', 'manual'],
             help='Specify scan type: auto or manual',
         )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rescan even if the course is unchanged since its last report',
+        )
+        parser.add_argument(
+            '--instance',
+            type=str,
+            help='Moodle site the course belongs to (a MOODLE_INSTANCES name; default the primary)',
+        )
 
     def handle(self, *args, **options):
         course_id = options['course_id']
         scan_type = options.get('scan_type', 'auto')
+        try:
+            instance = get_instance(options['instance'])['name']
+        except ValueError as e:
+            self.stderr.write(f"❌ {e}")
+            return
 
         self.stdout.write(
-            f"🔍 Starting URL Collector for course_id={course_id} [{scan_type.upper()}]"
+            f"🔍 Starting URL Collector for course_id={course_id} on {instance} [{scan_type.upper()}]"
         )
 
         # 1️⃣ Get course
         try:
-            course = MoodleCourse.objects.using("moodle").get(id=course_id)
+            course = MoodleCourse.objects.using(moodle_alias(instance=instance)).get(id=course_id)
         except MoodleCourse.DoesNotExist:
-            self.stderr.write(f"❌ Course ID {course_id} not found in Moodle DB.")
+            self.stderr.write(f"❌ Course ID {course_id} not found in Moodle DB ({instance}).")
             return
 
-        # 2️⃣ Export URLs
-        try:
-            url_file = export_course_urls(course, scan_type=scan_type)
-            self.stdout.write(f"📄 Exported URLs → {url_file}")
-        except Exception as e:
-            self.stderr.write(f"⚠️ Failed to export URLs: {e}")
-            return
+        # 2️⃣ Export + scan URLs (on a queue worker when one is running, otherwise in this command).
+        # If this course is already being scanned, wait for that scan instead of starting another.
+        job = run_course_scan(course.id, scan_type=scan_type, reuse_unchanged=not options['force'], instance=instance,
+                              run_here=not scan_service_available())
 
-        # 3️⃣ Run scanning
-        try:
-            report = scan_from_file(url_file)
-            self.stdout.write(f"✅ Scan complete → Report #{report.report_id}")
-        except Exception as e:
-            self.stderr.write(f"❌ Scan failed: {e}")
+        if job.status == "failed":
+            self.stderr.write(f"❌ Scan failed: {job.error}")
+        elif job.report and job.message.startswith("Course unchanged"):
+            self.stdout.write(
+                f"♻️ {job.message} — returning it (use --force to rescan) → Report #{job.report.report_id}"
+            )
+        elif job.report:
+            self.stdout.write(f"✅ Scan complete → Report #{job.report.report_id}")
+        else:
+            self.stdout.write(f"⚠️ No URLs found for course: {course.fullname}")
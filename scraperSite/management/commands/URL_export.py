@@ -0,0 +1,60 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from scraperSite.management.helpers.export_helper import (
+    UNSAFE_HEADERS, RESULT_HEADERS, export_querysets, unsafe_rows, result_rows, write_xlsx, iter_csv_lines,
+)
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        raise CommandError(f"Invalid date (expected YYYY-MM-DD): {value}")
+
+
+class Command(BaseCommand):
+    help = "Export UnsafeURL rows and/or full scan results for a report, course or date range to XLSX or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", type=str, required=True, help="Output file (.xlsx or .csv)")
+        parser.add_argument("--kind", choices=["unsafe", "results", "both"], default="both",
+                            help="Which rows to export (CSV takes one kind)")
+        parser.add_argument("--report", type=int, help="Only this report id")
+        parser.add_argument("--course", type=int, help="Only this Moodle course id")
+        parser.add_argument("--instance", type=str, help="Moodle site of --course, or only this site (MOODLE_INSTANCES name)")
+        parser.add_argument("--date-from", type=str, help="First day, YYYY-MM-DD")
+        parser.add_argument("--date-to", type=str, help="Last day, YYYY-MM-DD")
+        parser.add_argument("--scan-type", choices=["auto", "manual", "live"], help="Only auto, manual or live scans")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        kind = options["kind"]
+        is_csv = output.lower().endswith(".csv")
+        if is_csv and kind == "both":
+            raise CommandError("CSV holds one table: use --kind unsafe or --kind results")
+
+        unsafe, results = export_querysets(
+            report_id=options["report"],
+            course_id=options["course"],
+            date_from=parse_date(options["date_from"]),
+            date_to=parse_date(options["date_to"]),
+            scan_type=options["scan_type"],
+            instance=options["instance"],
+        )
+
+        if is_csv:
+            headers, rows = (UNSAFE_HEADERS, unsafe_rows(unsafe)) if kind == "unsafe" else (RESULT_HEADERS, result_rows(results))
+            written = -1  # header line
+            with open(output, "w", newline="", encoding="utf-8") as f:
+                for line in iter_csv_lines(headers, rows):
+                    f.write(line)
+                    written += 1
+        else:
+            sheets = []
+            if kind in ("unsafe", "both"):
+                sheets.append(("Unsafe URLs", UNSAFE_HEADERS, unsafe_rows(unsafe)))
+            if kind in ("results", "both"):
+                sheets.append(("Scan results", RESULT_HEADERS, result_rows(results)))
+            written = write_xlsx(output, sheets)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Exported {written} row(s) → {output}"))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from scraperSite.management.helpers.live_scan_helper import (
+    LOG_TABLE, log_store_available, acquire_live_scan_lock, get_cursor, latest_log_id, poll_once, run_live_scan,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Tail the Moodle standard log and scan new or edited posts, chat messages, URL resources and files "
+        "within minutes, adding findings to a rolling per-course report for the day"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", type=int, default=60, help="Seconds between log polls")
+        parser.add_argument("--once", action="store_true", help="Catch up to the end of the log once and exit")
+        parser.add_argument("--skip-backlog", action="store_true",
+                            help="Move the cursor to the end of the log without scanning what was missed")
+
+    def handle(self, *args, **options):
+        if not log_store_available():
+            raise CommandError(f"{LOG_TABLE} not found — enable the 'Standard log' store in Moodle")
+        if not acquire_live_scan_lock():
+            self.stderr.write("⚠️ Another URL_live_scan is already tailing the log — exiting.")
+            return
+
+        cursor = get_cursor()
+        if options["skip_backlog"]:
+            cursor.position = latest_log_id()
+            cursor.save(update_fields=["position", "updated_at"])
+            self.stdout.write(f"⏭️ Cursor moved to log id {cursor.position}")
+
+        if options["once"]:
+            # Stop at the end of the log as it is now; events too recent to settle are left for the next run
+            stop_at = latest_log_id()
+            total_events = total_urls = 0
+            while True:
+                advanced, events, scanned, upto = poll_once(stop_at=stop_at)
+                total_events += events
+                total_urls += scanned
+                if not advanced or upto >= stop_at:
+                    break
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Live scan caught up: {total_events} event(s), {total_urls} new URL(s) scanned"
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"📡 Tailing the Moodle log from id {cursor.position}; polling every {options['poll']}s"
+        ))
+        try:
+            run_live_scan(poll_interval=options["poll"])
+        except KeyboardInterrupt:
+            self.stdout.write("👋 Live scan stopping")
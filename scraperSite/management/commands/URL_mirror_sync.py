@@ -0,0 +1,65 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from scraperSite.models import Watermark
+from scraperSite.management.helpers.moodle_db_helper import mirror_enabled
+from scraperSite.management.helpers.moodle_mirror_helper import MIRROR_TABLES, sync_mirror, mirror_lag
+
+
+class Command(BaseCommand):
+    help = (
+        "Incrementally copy the Moodle tables the scanner reads (courses, users, forums, chats, URLs, files, "
+        "contexts, roles) into the local moodle_mirror schema. Set MOODLE_READ_FROM_MIRROR=1 to scan from it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", action="append", help="Only sync this table (repeatable), e.g. mdl_forum_posts")
+        parser.add_argument("--reconcile", action="store_true", help="Also delete rows that were deleted in Moodle")
+        parser.add_argument("--full", action="store_true", help="Recopy the tables from scratch")
+        parser.add_argument("--poll", type=int, default=0, help="Keep syncing every N seconds (0 = sync once)")
+        parser.add_argument("--status", action="store_true", help="Show the watermark of each table, then exit")
+
+    def handle(self, *args, **options):
+        known = {t.name for t in MIRROR_TABLES}
+        unknown = set(options["table"] or ()) - known
+        if unknown:
+            raise CommandError(f"Not a mirrored table: {', '.join(sorted(unknown))}")
+
+        if options["status"]:
+            self.show_status()
+            return
+
+        if not mirror_enabled():
+            self.stdout.write("ℹ️ MOODLE_READ_FROM_MIRROR is off — syncing, but scans still read Moodle directly")
+
+        while True:
+            started = time.monotonic()
+            results = sync_mirror(
+                tables=options["table"], full=options["full"], reconcile=options["reconcile"], report=self.stdout.write,
+            )
+            if results is None:
+                self.stderr.write("⚠️ Another URL_mirror_sync is running — skipped")
+            else:
+                copied = sum(c for c, _ in results.values())
+                deleted = sum(d for _, d in results.values())
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Mirror synced: {len(results)} table(s), {copied} row(s) copied, {deleted} deleted "
+                    f"in {time.monotonic() - started:.1f}s"
+                ))
+            if not options["poll"]:
+                return
+            # Only the first pass needs to be a full copy / reconcile
+            options["full"] = options["reconcile"] = False
+            try:
+                time.sleep(options["poll"])
+            except KeyboardInterrupt:
+                self.stdout.write("👋 Mirror sync stopping")
+                return
+
+    def show_status(self):
+        marks = dict(Watermark.objects.filter(name__startswith="mirror:").values_list("name", "position"))
+        for table in MIRROR_TABLES:
+            position = marks.get(f"mirror:{table.name}")
+            watermark = table.watermark or "full copy"
+            self.stdout.write(f"🪞 {table.name:<24} {watermark:<13} {'never synced' if position is None else position}")
+        lag = mirror_lag()
+        self.stdout.write(f"⏱️ Last complete sync {'never' if lag is None else f'{lag}s ago'}")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from scraperSite.management.helpers.adaptive_scan_helper import plan_course_scans
+from scraperSite.management.helpers.scheduler_helper import active_courses, scan_changed_courses
+from scraperSite.management.helpers.moodle_db_helper import primary_instance
+
+
+class Command(BaseCommand):
+    help = "Show how the adaptive schedule would rank active courses right now (and optionally queue them)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget", type=int, help=f"Scans per run (default ADAPTIVE_SCAN_BUDGET={settings.ADAPTIVE_SCAN_BUDGET})")
+        parser.add_argument("--all", action="store_true", help="Also list skipped courses")
+        parser.add_argument("--queue", action="store_true", help="Queue the planned scans now (uses the configured budget)")
+        parser.add_argument("--instance", help="Moodle site to plan (a MOODLE_INSTANCES name; default the primary)")
+
+    def handle(self, *args, **options):
+        if options["queue"]:
+            self.stdout.write(self.style.SUCCESS(f"✅ {scan_changed_courses()}"))
+            return
+
+        instance = options["instance"] or primary_instance()
+        plans = plan_course_scans(active_courses(instance=instance), budget=options["budget"], instance=instance)
+        for plan in plans:
+            if not (plan.eligible or options["all"]):
+                continue
+            mark = "✅" if plan.queued else ("⏳" if plan.eligible else "💤")
+            last = timezone.localtime(plan.last_checked).strftime("%Y-%m-%d %H:%M") if plan.last_checked else "never"
+            new = ", ".join(f"{name} {n}" for name, n in plan.activity.items() if n) or "none"
+            self.stdout.write(
+                f"{mark} {plan.course.id:>6}  score {plan.score:5.2f}  last {last:<16}  "
+                f"unsafe {plan.unsafe:<4} new {new}  "
+                f"{plan.reason} — {plan.course.fullname}"
+            )
+
+        queued = sum(p.queued for p in plans)
+        waiting = sum(p.eligible and not p.queued for p in plans)
+        self.stdout.write(
+            f"📋 {queued} would be queued, {waiting} over budget, {len(plans) - queued - waiting} skipped "
+            f"of {len(plans)} active course(s)"
+        )
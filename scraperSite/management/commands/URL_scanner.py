@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from pathlib import Path
-from scraperSite.management.helpers.URL_scanner_helper import scan_from_file
+from scraperSite.management.helpers.URL_scanner_helper import scan_from_file, SCAN_CHUNK_SIZE
 from django.utils import timezone
 
 class Command(BaseCommand):
@@ -8,14 +8,21 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--file", type=str, help="Path to a specific TXT file to scan")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=SCAN_CHUNK_SIZE,
+            help=f"Rows classified and saved per chunk (default {SCAN_CHUNK_SIZE}, 0 = whole file at once)",
+        )
 
     def handle(self, *args, **options):
         today_str = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
         today_dir = Path("url_details") / today_str
         file_arg = options.get("file")
+        chunk_size = options.get("chunk_size") or None
 
         if file_arg:
-            scan_from_file(file_arg)
+            scan_from_file(file_arg, chunk_size=chunk_size)
         else:
             txt_files = list(today_dir.glob("*.txt"))
             if not txt_files:
@@ -23,5 +30,4 @@ class Command(BaseCommand):
                 return
 
             for f in txt_files:
-                scan_from_file(f)
-
+                scan_from_file(f, chunk_size=chunk_size)
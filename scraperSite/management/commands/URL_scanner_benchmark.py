@@ -0,0 +1,63 @@
+import csv
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from scraperSite.management.helpers.URL_scanner_helper import (
+    load_ai_model, iter_classified_chunks, SCAN_CHUNK_SIZE
+)
+
+
+def write_synthetic_input(path, rows):
+    """Write a scanner_input-style file with `rows` random URLs."""
+    rnd = random.Random(42)
+    tlds = ["com", "net", "org", "edu.au", "xyz", "io"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["url", "authorUsername", "authorName", "authorEmail", "source", "courseID", "courseName"])
+        for i in range(rows):
+            host = "".join(rnd.choices(string.ascii_lowercase, k=rnd.randint(4, 14)))
+            path_part = "/".join(
+                "".join(rnd.choices(string.ascii_lowercase + string.digits, k=rnd.randint(3, 10)))
+                for _ in range(rnd.randint(0, 4))
+            )
+            url = f"https://{host}.{rnd.choice(tlds)}/{path_part}"
+            writer.writerow([url, f"user{i % 500}", "Bench User", "bench@example.com", "chat_message", 1, "Benchmark Course"])
+
+
+class Command(BaseCommand):
+    help = "Compare peak memory of whole-file vs chunked scanning on a synthetic input file (no DB writes, no VT)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200000, help="Number of synthetic URLs to generate")
+        parser.add_argument("--chunk-size", type=int, default=SCAN_CHUNK_SIZE, help="Chunk size for streaming mode")
+        parser.add_argument("--model", type=str, default="trained_models/url_classifier.pkl", help="Path to model pickle")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        chunk_size = options["chunk_size"]
+        clf = load_ai_model(options["model"])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_file = os.path.join(tmp_dir, "bench_scanner_input.txt")
+            self.stdout.write(f"📝 Generating {rows} synthetic URLs...")
+            write_synthetic_input(input_file, rows)
+
+            results = []
+            for label, size in (("whole file", None), (f"chunked ({chunk_size})", chunk_size)):
+                tracemalloc.start()
+                start = time.perf_counter()
+                scanned = 0
+                for df_chunk in iter_classified_chunks(input_file, clf, chunk_size=size, run_vt=False):
+                    scanned += len(df_chunk)
+                elapsed = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results.append((label, scanned, elapsed, peak))
+
+        self.stdout.write(f"{'mode':<22}{'rows':>10}{'seconds':>10}{'peak MB':>10}")
+        for label, scanned, elapsed, peak in results:
+            self.stdout.write(f"{label:<22}{scanned:>10}{elapsed:>10.2f}{peak / 1024 / 1024:>10.1f}")
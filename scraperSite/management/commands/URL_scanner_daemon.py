@@ -0,0 +1,26 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from scraperSite.management.helpers.scanner_daemon_helper import serve
+
+
+class Command(BaseCommand):
+    help = "Run the long-lived scanner service (model kept in memory) that collectors and views submit jobs to"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", type=str, help="Bind address (default settings.SCANNER_DAEMON_HOST)")
+        parser.add_argument("--port", type=int, help="Port (default settings.SCANNER_DAEMON_PORT)")
+        parser.add_argument("--workers", type=int, default=2, help="Socket jobs processed concurrently")
+        parser.add_argument("--queue-workers", type=int, default=1, help="Threads draining the ScanJob queue")
+
+    def handle(self, *args, **options):
+        try:
+            serve(
+                host=options.get("host"),
+                port=options.get("port"),
+                workers=options["workers"],
+                queue_workers=options["queue_workers"],
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e)) from e
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Scanner daemon stopped.")
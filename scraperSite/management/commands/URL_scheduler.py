@@ -0,0 +1,45 @@
+import threading
+from django.core.management.base import BaseCommand
+from scraperSite.management.helpers.scheduler_helper import SchedulerLock, run_scheduler, run_due_tasks
+from scraperSite.management.helpers.scan_queue_helper import work_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the scan schedule (ScheduledTask rows) as a single cluster-wide instance and "
+        "process queued scan jobs on a local worker pool. Run as its own service, not inside the web server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2,
+                            help="Scan job worker threads in this process (0 = leave the queue to URL_scanner_daemon)")
+        parser.add_argument("--poll", type=int, default=30, help="Seconds between schedule checks")
+        parser.add_argument("--once", action="store_true", help="Run due tasks once and exit (for cron)")
+
+    def handle(self, *args, **options):
+        lock = SchedulerLock()
+        if not lock.held():
+            self.stderr.write("⚠️ Another URL_scheduler holds the scheduler lock — exiting.")
+            return
+
+        if options["once"]:
+            run_due_tasks()
+            lock.release()
+            return
+
+        stop_event = threading.Event()
+        for i in range(options["workers"]):
+            threading.Thread(
+                target=work_queue, kwargs={"stop_event": stop_event}, name=f"scan-worker-{i}", daemon=True,
+            ).start()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🗓️ Scheduler running with {options['workers']} scan worker(s); checking every {options['poll']}s"
+        ))
+        try:
+            run_scheduler(lock, poll_interval=options["poll"], stop_event=stop_event)
+        except KeyboardInterrupt:
+            self.stdout.write("👋 Scheduler stopping")
+        finally:
+            stop_event.set()
+            lock.release()
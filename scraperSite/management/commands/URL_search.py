@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from scraperSite.management.helpers.url_search_helper import (
+    MIN_QUERY_LENGTH, SEARCH_LIMIT, search_scanned_urls, backfill_domains,
+)
+
+
+class Command(BaseCommand):
+    help = "Search every scanned URL by registrable domain or URL substring (e.g. 'was evil-domain.xyz ever posted?')"
+
+    def add_arguments(self, parser):
+        parser.add_argument("query", nargs="?", help="Domain (evil-domain.xyz) or part of a URL")
+        parser.add_argument("--mode", choices=["domain", "contains"], help="Default: domain for bare hosts, else contains")
+        parser.add_argument("--limit", type=int, default=SEARCH_LIMIT, help="Most recent hits to list")
+        parser.add_argument("--backfill-domains", action="store_true",
+                            help="Fill the domain column for results stored before it existed")
+
+    def handle(self, *args, **options):
+        if options["backfill_domains"]:
+            updated = backfill_domains()
+            self.stdout.write(self.style.SUCCESS(f"✅ Filled domain for {updated} scan result(s)"))
+            if not options["query"]:
+                return
+
+        query = options["query"]
+        if not query or len(query.strip()) < MIN_QUERY_LENGTH:
+            raise CommandError(f"Give a search query of at least {MIN_QUERY_LENGTH} characters")
+
+        hits, summary = search_scanned_urls(query, mode=options["mode"], limit=options["limit"])
+        self.stdout.write(
+            f"🔎 {summary['matches']} match(es) by {summary['mode']} in "
+            f"{summary['courses']} course(s) / {summary['reports']} report(s)"
+        )
+        for hit in hits:
+            scanned = timezone.localtime(hit.output.scanned_at).strftime("%Y-%m-%d %H:%M")
+            author = hit.author_username or hit.author_name or "-"
+            self.stdout.write(
+                f"{scanned}  course {hit.output.moodle_courseID} ({hit.output.moodle_courseName})  "
+                f"report #{hit.output.report_id or '-'}  {hit.final_status:<10}  {author:<12}  {hit.source}  {hit.url}"
+            )
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from scraperSite.management.helpers.report_summary_helper import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the weekly / course-week dashboard aggregates from all stored scan reports"
+
+    def handle(self, *args, **options):
+        count = rebuild_summaries()
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt weekly summaries from {count} report(s)"))
@@ -0,0 +1,58 @@
+import threading
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from scraperSite.models import ScanJob, ScanWorker
+from scraperSite.management.helpers.scan_queue_helper import work_queue, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Run scan job workers on this node. Start one per machine; every node claims jobs from the shared "
+        "queue under renewable leases, and jobs from a crashed node are re-claimed once its lease expires."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=2, help="Jobs scanned concurrently on this node")
+        parser.add_argument("--poll", type=int, default=5, help="Seconds between queue polls when idle")
+        parser.add_argument("--status", action="store_true", help="List workers and leased jobs, then exit")
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.show_status()
+            return
+
+        stop_event = threading.Event()
+        threads = [
+            threading.Thread(
+                target=work_queue, name=f"scan-worker-{i}",
+                kwargs={"poll_interval": options["poll"], "stop_event": stop_event, "owner": worker_name(f"w{i}")},
+                daemon=True,
+            )
+            for i in range(options["threads"])
+        ]
+        for t in threads:
+            t.start()
+        self.stdout.write(self.style.SUCCESS(f"🛠️ {worker_name()} running {len(threads)} scan worker(s)"))
+
+        try:
+            for t in threads:
+                while t.is_alive():
+                    t.join(1)
+        except KeyboardInterrupt:
+            # Jobs in progress are not finished here: their leases lapse and another node takes them over
+            stop_event.set()
+            self.stdout.write("👋 Worker stopping")
+
+    def show_status(self):
+        now = timezone.now()
+        for w in ScanWorker.objects.order_by("name"):
+            self.stdout.write(f"🛠️ {w.name:<40} last seen {int((now - w.last_seen).total_seconds())}s ago")
+        for job in ScanJob.objects.filter(status="running").order_by("job_id"):
+            left = int((job.lease_expires_at - now).total_seconds()) if job.lease_expires_at else None
+            state = "no lease" if left is None else (f"lease {left}s left" if left > 0 else "lease EXPIRED")
+            self.stdout.write(
+                f"🧾 #{job.job_id} course {job.moodle_courseID} on {job.lease_owner or '-'} "
+                f"(attempt {job.attempts}, {state}) {job.message}"
+            )
+        queued = ScanJob.objects.filter(status="queued").count()
+        self.stdout.write(f"📋 {queued} job(s) queued")
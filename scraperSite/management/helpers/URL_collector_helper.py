@@ -1,24 +1,25 @@
 import os
 import csv
+import hashlib
 import re
 import mimetypes
+from itertools import islice
+from urllib.parse import urljoin
+from django.conf import settings
 from django.db import connections
 from django.utils import timezone
 from PyPDF2 import PdfReader
 import docx
 from pptx import Presentation
+from lxml import etree
 
-from scraperSite.models import (
-    MoodleUrl, MoodleUser,
-    MoodleCourseModules, MoodleModules,
-    Forum, ForumDiscussion, ForumPost,
-    MoodleCourse, MoodleChat, MoodleChatMessage
+from scraperSite.models import MoodleUser
+from scraperSite.management.helpers.moodle_db_helper import (
+    moodle_alias, get_instance, primary_instance, governor_for, governed_rows,
+)
+from scraperSite.management.helpers.content_sources_helper import (
+    available_sources, iter_source_rows, course_stamp_sql, course_activity_sql,
 )
-
-# ----------------------------------------------------
-# CONFIG: Moodle dataroot ("moodledata")
-# ----------------------------------------------------
-FILEDIR_ROOT = r"U:\\"
 
 
 # ----------------------------------------------------
@@ -45,6 +46,81 @@ def extract_urls_from_text(text):
     return [clean_url(u) for u in found]
 
 
+# Moodle stores posts, intros and page content as HTML: parsing it finds relative and
+# entity-encoded links (&amp; in query strings) the regex misses in raw markup.
+URL_ATTRIBUTES = {"href", "src", "action", "formaction", "poster", "cite", "background"}
+# Link targets that are not web pages (@@PLUGINFILE@@ = a Moodle file, scanned from moodledata)
+SKIP_LINK_PREFIXES = ("#", "mailto:", "javascript:", "data:", "tel:", "@@")
+# Recover from broken markup, never fetch anything
+HTML_PARSER = etree.HTMLParser(recover=True, remove_comments=True, remove_pis=True, no_network=True)
+# A field is only parsed when it has a tag; plain text keeps every character as typed
+MARKUP_REGEX = re.compile(r"<[a-zA-Z/!]")
+# "&" that does not start a terminated entity (&copy=2 in a query string): escaped before
+# parsing so it stays literal instead of becoming "©=2"
+BARE_AMPERSAND_REGEX = re.compile(r"&(?!#?\w+;)")
+
+
+def escape_bare_ampersands(html):
+    return BARE_AMPERSAND_REGEX.sub("&amp;", html)
+
+
+def resolve_link(value, base_url=None):
+    """Absolute http(s) URL of an href/src value, or None (anchor, mailto:, relative without a base...)."""
+    value = value.strip()
+    if not value or value.startswith(SKIP_LINK_PREFIXES):
+        return None
+    if value[:8].lower().startswith(("http://", "https://")):
+        return clean_url(value)
+    if value.startswith("//"):
+        return clean_url("https:" + value)
+    if ":" in value.split("/", 1)[0]:
+        return None  # another scheme (ftp:, ms-word:, ...)
+    return clean_url(urljoin(base_url, value)) if base_url else None
+
+
+def extract_urls_from_html(html, base_url=None):
+    """
+    Extract URLs from an HTML field in one pass over the parsed tree: href/src-style attributes
+    (relative ones resolved against base_url, the site's wwwroot, when given), URLs inside
+    data-* and srcset attributes, and URLs in the visible text. In document order, no repeats.
+    Only terminated entities (&amp;) are decoded; a field without tags is matched as plain text.
+    """
+    if not html:
+        return []
+    if "//" not in html and not (base_url and ("href" in html or "src" in html)):
+        return []  # nothing that could become an absolute URL: skip the parse
+    if not MARKUP_REGEX.search(html):
+        return list(dict.fromkeys(extract_urls_from_text(html)))
+    try:
+        root = etree.fromstring(escape_bare_ampersands(html), HTML_PARSER)
+    except (etree.ParserError, ValueError):
+        root = None
+    if root is None:
+        return list(dict.fromkeys(extract_urls_from_text(html)))
+
+    found = []
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            continue
+        for name, value in el.attrib.items():
+            if name in URL_ATTRIBUTES:
+                found.append(resolve_link(value, base_url))
+            elif name == "srcset":
+                found.extend(resolve_link(c.strip().split(" ")[0], base_url) for c in value.split(","))
+            elif name.startswith("data-"):
+                found.extend(extract_urls_from_text(value))
+        if el.text:
+            found.extend(extract_urls_from_text(el.text))
+        if el.tail:
+            found.extend(extract_urls_from_text(el.tail))
+    return [u for u in dict.fromkeys(found) if u]
+
+
+def extract_urls_from_html_batch(fields, base_url=None):
+    """extract_urls_from_html over a batch of fields (one fetch of rows); one URL list per field."""
+    return [extract_urls_from_html(field, base_url) for field in fields]
+
+
 def extract_urls_from_file(file_path):
     """Extract URLs from different file types (PDF, DOCX, PPTX, TXT)."""
     urls = set()
@@ -109,77 +185,94 @@ def write_url_row(writer, url, source, course, author=None):
 # ----------------------------------------------------
 # Moodle File API Helpers
 # ----------------------------------------------------
-def moodle_file_path_from_contenthash(contenthash):
-    """Convert Moodle contenthash into a full file path."""
+def moodle_file_path_from_contenthash(contenthash, filedir=None):
+    """Convert Moodle contenthash into a full file path under the site's moodledata filedir (primary by default)."""
     if not contenthash or len(contenthash) < 4:
         return None
     a, b = contenthash[0:2], contenthash[2:4]
-    return os.path.join(FILEDIR_ROOT, a, b, contenthash)
+    return os.path.join(filedir or get_instance()["filedir"], a, b, contenthash)
 
 
-def get_course_module_contextids(course_id, using="moodle"):
-    """Return all context IDs for modules in a given Moodle course."""
-    sql = """
-        SELECT ctx.id
-        FROM mdl_course_modules cm
-        JOIN mdl_context ctx
-          ON ctx.instanceid = cm.id
-         AND ctx.contextlevel = 70
-        WHERE cm.course = %s
-    """
-    ids = set()
-    with connections[using].cursor() as cur:
-        cur.execute(sql, [course_id])
-        for (ctx_id,) in cur.fetchall():
-            ids.add(ctx_id)
-    return ids
-
-
-def iter_files_for_contextids(context_ids, using="moodle"):
-    """Iterate through files linked to Moodle course context IDs."""
+def iter_files_modified_since(context_ids, since, using=None):
+    """Files in the given contexts added or replaced at or after unix time `since`."""
     if not context_ids:
         return
-    ids = list(context_ids)
-    chunk_size = 1000
-
-    sql_base = """
+    sql = """
         SELECT contextid, component, filearea, itemid, filename, contenthash, userid
         FROM mdl_files
         WHERE filename <> '.'
-          AND contextid IN ({placeholders})
+          AND contextid = ANY(%s)
+          AND timemodified >= %s
     """
+    with connections[using or moodle_alias()].chunked_cursor() as cur:
+        cur.execute(sql, [list(context_ids), int(since)])
+        yield from governed_rows(cur)
 
-    with connections[using].cursor() as cur:
-        for i in range(0, len(ids), chunk_size):
-            chunk = ids[i:i+chunk_size]
-            placeholders = ",".join(["%s"] * len(chunk))
-            sql = sql_base.format(placeholders=placeholders)
-            cur.execute(sql, chunk)
-            for row in cur.fetchall():
-                yield row
+
+def course_content_fingerprint(course_id, using=None):
+    """
+    Cheap fingerprint of everything export_course_urls reads for a course:
+    row counts + latest modification time of every content source the site has
+    (see content_sources_helper), hashed into one hex string.
+    Counts catch deletions that do not move any timemodified.
+    """
+    db = using or moodle_alias()
+    with connections[db].cursor() as cur:
+        cur.execute(course_stamp_sql(available_sources(db)), {"course": course_id})
+        row = cur.fetchone()
+    return hashlib.sha1(",".join(str(v) for v in row).encode("utf-8")).hexdigest()
 
 
-def lookup_moodle_user(user_id, using="moodle"):
-    """Look up Moodle user safely."""
-    if not user_id:
-        return None
-    return MoodleUser.objects.using(using).filter(id=user_id).first()
+def course_activity_since(since_by_course, using=None):
+    """
+    {course_id: {source name: new or edited rows}} for {course_id: unix timestamp}, covering every
+    registered content source this site has, in one round trip. A timestamp of 0 counts everything.
+    """
+    if not since_by_course:
+        return {}
+    db = using or moodle_alias()
+    sources = [s for s in available_sources(db) if s.activity_sql]
+    courses = [int(c) for c in since_by_course]
+    with connections[db].cursor() as cur:
+        cur.execute(course_activity_sql(sources), {
+            "courses": courses,
+            "since": [int(since_by_course[c]) for c in since_by_course],
+        })
+        return {
+            row[0]: {source.name: n for source, n in zip(sources, row[1:])}
+            for row in cur.fetchall()
+        }
+
+
+def batched(rows, size):
+    """Split an iterator into lists of up to `size` items."""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
 
 
 # ----------------------------------------------------
 # MAIN EXPORT FUNCTION
 # ----------------------------------------------------
-def export_course_urls(course, export_dir=None, scan_type="auto"):
+def export_course_urls(course, export_dir=None, scan_type="auto", instance=None):
     """
     Exports all URLs from the course into a CSV-like text file.
     scan_type = "auto" or "manual"  (used for filename prefix)
+    instance = Moodle site the course belongs to (MOODLE_INSTANCES name; primary by default)
     """
     today_str = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
     export_dir = export_dir or os.path.join("url_details", today_str)
     os.makedirs(export_dir, exist_ok=True)
 
-    # 👇 Tag output filename with scan type
-    output_csv = os.path.join(export_dir, f"{scan_type}_{course.id}_scanner_input.txt")
+    site = get_instance(instance)
+    db = moodle_alias(instance=site["name"])
+
+    # 👇 Tag output filename with scan type (and the site, for courses outside the primary)
+    prefix = scan_type if site["name"] == primary_instance() else f"{scan_type}_{site['name']}"
+    output_csv = os.path.join(export_dir, f"{prefix}_{course.id}_scanner_input.txt")
     urls_set = set()
 
     print(f"📁 Exporting URLs for course: {course.fullname}")
@@ -189,75 +282,42 @@ def export_course_urls(course, export_dir=None, scan_type="auto"):
         writer = csv.writer(f, quoting=csv.QUOTE_ALL)
         writer.writerow(["url", "authorUsername", "authorName", "authorEmail", "source", "courseID", "courseName"])
 
-        # ---------- URL resources ----------
-        for u in MoodleUrl.objects.using("moodle").filter(course=course.id):
-            author = MoodleUser.objects.using("moodle").filter(id=getattr(u, "userid", None)).first()
-            for url in extract_urls_from_text(getattr(u, "externalurl", "") or ""):
-                if url not in urls_set:
-                    urls_set.add(url)
-                    write_url_row(writer, url, "url_resource", course, author)
-
-        # ---------- Forums ----------
-        forums = Forum.objects.using("moodle").filter(course=course.id)
-        for forum in forums:
-            for url in extract_urls_from_text(forum.intro or ""):
-                if url not in urls_set:
-                    urls_set.add(url)
-                    write_url_row(writer, url, "forum_intro", course)
-
-            discussions = ForumDiscussion.objects.using("moodle").filter(forum=forum.id)
-            for discussion in discussions:
-                author = MoodleUser.objects.using("moodle").filter(id=discussion.userid).first()
-                for field in ("name", "content", "message"):
-                    text = getattr(discussion, field, "") or ""
-                    for url in extract_urls_from_text(text):
-                        if url not in urls_set:
-                            urls_set.add(url)
-                            write_url_row(writer, url, f"forum_discussion_{field}", course, author)
-
-                posts = ForumPost.objects.using("moodle").filter(discussion=discussion.id)
-                for post in posts:
-                    post_author = MoodleUser.objects.using("moodle").filter(id=post.userid).first()
-                    for url in extract_urls_from_text(post.message or ""):
+        # ---------- Every registered content source: one streamed query each ----------
+        authors = {}
+        file_urls_by_hash = {}
+        batch_size = getattr(settings, "MOODLE_FETCH_SIZE", 1000)
+        for source in available_sources(db):
+            for batch in batched(iter_source_rows(source, course.id, using=db), batch_size):
+                # One query per batch for authors not seen yet in this course
+                missing = {user_id for _, user_id, _ in batch if user_id and user_id not in authors}
+                if missing:
+                    found = MoodleUser.objects.using(db).in_bulk(missing)
+                    authors.update({user_id: found.get(user_id) for user_id in missing})
+
+                if source.kind == "html":
+                    urls_by_row = extract_urls_from_html_batch([value for value, _, _ in batch], site.get("wwwroot"))
+                for i, (value, user_id, tag) in enumerate(batch):
+                    if source.kind == "file":
+                        # The same file attached in several places is read once
+                        if value not in file_urls_by_hash:
+                            file_path = moodle_file_path_from_contenthash(value, site["filedir"])
+                            file_urls_by_hash[value] = extract_urls_from_file(file_path) if file_path else []
+                        urls = file_urls_by_hash[value]
+                    elif source.kind == "html":
+                        urls = urls_by_row[i]
+                    else:
+                        urls = extract_urls_from_text(value or "")
+
+                    for url in urls:
                         if url not in urls_set:
                             urls_set.add(url)
-                            write_url_row(writer, url, "forum_post", course, post_author)
-
-        # ---------- Chats ----------
-        chats = MoodleChat.objects.using("moodle").filter(course=course.id)
-        for chat in chats:
-            for url in extract_urls_from_text(chat.intro or ""):
-                if url not in urls_set:
-                    urls_set.add(url)
-                    write_url_row(writer, url, "chat_intro", course)
-
-            msgs = MoodleChatMessage.objects.using("moodle").filter(chatid=chat.id)
-            for msg in msgs:
-                msg_author = MoodleUser.objects.using("moodle").filter(id=msg.userid).first()
-                for url in extract_urls_from_text(msg.message or ""):
-                    if url not in urls_set:
-                        urls_set.add(url)
-                        write_url_row(writer, url, "chat_message", course, msg_author)
-
-        # ---------- Moodle Files ----------
-        context_ids = get_course_module_contextids(course.id, "moodle")
-        for contextid, component, filearea, itemid, filename, contenthash, file_userid in iter_files_for_contextids(context_ids):
-            file_path = moodle_file_path_from_contenthash(contenthash)
-            if not file_path or not os.path.exists(file_path):
-                continue
-
-            file_urls = extract_urls_from_file(file_path)
-            if not file_urls:
-                continue
-
-            author = lookup_moodle_user(file_userid)
-            source = f"{component}:{filearea}"
-
-            for url in file_urls:
-                if url not in urls_set:
-                    urls_set.add(url)
-                    write_url_row(writer, url, source, course, author)
+                            write_url_row(writer, url, tag, course, authors.get(user_id))
 
     print(f"✅ EXPORT COMPLETE — Total URLs: {len(urls_set)}")
+    site_governor = governor_for(db)
+    if site_governor:
+        stats = site_governor.stats()
+        print(f"🗄️ Moodle DB ({site['name']}): {stats['queries']} queries so far, ~{stats['latency_ms']}ms each, "
+              f"{stats['waited_s']}s spent backing off")
     print(f"📄 Saved to: {output_csv}")
     return output_csv
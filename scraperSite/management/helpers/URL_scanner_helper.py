@@ -1,5 +1,6 @@
 import os
 import re
+import hashlib
 import time
 import numpy as np
 import pandas as pd
@@ -7,8 +8,15 @@ import tldextract
 import joblib
 import requests
 from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
-from scraperSite.models import ScanReport, UnsafeURL
+from scraperSite.models import ScanReport, UnsafeURL, ScanOutput, ScanResult
+from scraperSite.management.helpers.domain_blocklist_helper import get_blocklist, registered_domain, BLOCKLIST_PATH
+from scraperSite.management.helpers.allowlist_helper import load_allowlist, allowlist_version
+from scraperSite.management.helpers.report_summary_helper import record_report_summary
+from scraperSite.management.helpers.moodle_db_helper import primary_instance
 
 VT_API_KEY = os.environ.get("VIRUSTOTAL_API_KEY")
 VT_BASE = "https://www.virustotal.com/api/v3"
@@ -55,10 +63,37 @@ def poll_analysis(analysis_id, timeout=120, interval=4):
 # -----------------------------
 # Local AI model loader
 # -----------------------------
+_model_cache = {}
+
+
 def load_ai_model(model_path="trained_models/url_classifier.pkl"):
+    """
+    Load the pickled classifier once per process.
+    The cache is keyed on the file's mtime, so a retrained model is picked up automatically.
+    """
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found: {model_path}")
-    return joblib.load(model_path)
+    mtime = os.path.getmtime(model_path)
+    cached = _model_cache.get(model_path)
+    if cached is None or cached[0] != mtime:
+        _model_cache[model_path] = (mtime, joblib.load(model_path))
+    return _model_cache[model_path][1]
+
+
+def scanner_version(model_path="trained_models/url_classifier.pkl"):
+    """
+    Identify everything that decides a verdict: the model and blocklist files (size and mtime),
+    the review allowlist version and the trusted domains.
+    Cached reports are not reused once any of them changes.
+    """
+    parts = []
+    for path in (model_path, BLOCKLIST_PATH):
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    parts.append(f"allowlist:{allowlist_version()}")
+    parts.append("trusted:" + ",".join(sorted(getattr(settings, "SCANNER_TRUSTED_DOMAINS", []))))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
 
 
 # -----------------------------
@@ -86,112 +121,280 @@ def url_lexical_features(urls):
 
 
 # -----------------------------
-# Scan one exported TXT file
+# Verdict helpers (vectorised)
 # -----------------------------
-def scan_from_file(url_file):
-    if not os.path.exists(url_file):
-        print(f"⚠️ File not found: {url_file}")
-        return
+LABEL_MAP = {0: "benign", 1: "phish", 2: "malware", 3: "adult"}
+FEATURE_COLS = ["url_text", "url_len", "num_dots", "num_digits", "path_len", "char_entropy"]
+UNSAFE_LABELS = ["adult", "phish", "malware"]
+EXPORT_COLS = [
+    "url", "authorUsername", "authorName", "authorEmail", "source",
+    "pred_label", "confidence", "vt_result", "final_status", "verdict_source"
+]
+
+
+def run_vt_checks(urls, confidence):
+    """
+    Send every low-confidence URL to VirusTotal.
+    Returns two boolean arrays aligned with `urls`: (vt_malicious, vt_checked).
+    """
+    vt_malicious = np.zeros(len(urls), dtype=bool)
+    vt_checked = np.zeros(len(urls), dtype=bool)
+    if not VT_API_KEY:
+        return vt_malicious, vt_checked
+
+    for idx in np.flatnonzero(np.asarray(confidence) < 0.8):
+        url = urls[idx]
+        try:
+            analysis_id = vt_submit_url(url)
+            vt_malicious[idx] = poll_analysis(analysis_id)
+            vt_checked[idx] = True
+        except Exception as e:
+            print(f"⚠️ VT error for {url}: {e}")
+
+    return vt_malicious, vt_checked
+
+
+def compute_final_status(pred_label, confidence, vt_malicious):
+    """
+    Decide the final status of every row at once:
+      - unsafe label with confidence >= 0.8 (or VT confirms) -> the label itself
+      - unsafe label with 0.7 <= confidence < 0.8             -> suspicious
+      - benign label but VT says malicious                    -> suspicious
+      - everything else                                       -> benign
+    """
+    labels = np.asarray(pred_label, dtype=object)
+    conf = np.asarray(confidence, dtype=float)
+    flagged = np.isin(labels, UNSAFE_LABELS)
+
+    conditions = [
+        flagged & ((conf >= 0.8) | vt_malicious),
+        flagged & (conf >= 0.7),
+        ~flagged & vt_malicious,
+    ]
+    choices = [labels, "suspicious", "suspicious"]
+    return np.select(conditions, choices, default="benign")
 
-    print(f"📂 Scanning file: {url_file}")
 
-    clf = load_ai_model()
-    label_map = {0: "benign", 1: "phish", 2: "malware", 3: "adult"}
+def vt_result_column(vt_malicious, vt_checked):
+    return np.where(vt_malicious, "malicious", np.where(vt_checked, "checked", "not_checked"))
+
+
+# -----------------------------
+# Chunked classification
+# -----------------------------
+# Rows read from the scanner input per chunk; peak memory is bounded by this, not by course size
+SCAN_CHUNK_SIZE = 5000
+
 
-    df_original = pd.read_csv(url_file, dtype=str, quotechar='"')
+def classify_chunk(clf, df_chunk, run_vt=True, allowlist=None):
+    """
+    Classify one chunk of scanner input in place.
+    Adds pred_label, confidence, verdict_source, vt_result, final_status and moodle_url_id columns.
+    """
+    df_chunk = df_chunk.reset_index(drop=True)
 
     required_cols = ["url", "authorUsername", "authorName", "authorEmail", "source"]
     for c in required_cols:
-        if c not in df_original.columns:
-            df_original[c] = ""
+        if c not in df_chunk.columns:
+            df_chunk[c] = ""
+
+    urls_list = df_chunk["url"].fillna("").tolist()
+    pred_label = np.full(len(urls_list), "benign", dtype=object)
+    confidence = np.ones(len(urls_list), dtype=float)
+    verdict_source = np.full(len(urls_list), "model", dtype=object)
+
+    # Reviewed-safe URLs and trusted domains are short-circuited as benign
+    if allowlist is not None:
+        is_allowed = allowlist.match_urls(urls_list)
+        verdict_source[is_allowed] = "allowlist"
+    else:
+        is_allowed = np.zeros(len(urls_list), dtype=bool)
+
+    # Known-bad URLs/domains are labelled straight from the blocklist and skip the model and VT
+    blocklist = get_blocklist()
+    if blocklist is not None:
+        listed = blocklist.match_urls(urls_list)
+        is_listed = (listed > 0) & ~is_allowed
+        pred_label[is_listed] = pd.Series(listed[is_listed]).map(LABEL_MAP).to_numpy()
+        verdict_source[is_listed] = "blocklist"
+    else:
+        is_listed = np.zeros(len(urls_list), dtype=bool)
+
+    to_model = np.flatnonzero(~(is_listed | is_allowed))
+    if len(to_model):
+        df_features = url_lexical_features([urls_list[i] for i in to_model])
+        probs = clf.predict_proba(df_features[FEATURE_COLS])
+        del df_features
+        # predict() is argmax over predict_proba, so reuse the probabilities instead of a second forest pass
+        preds = clf.classes_[np.argmax(probs, axis=1)]
+        pred_label[to_model] = pd.Series(preds).map(LABEL_MAP).to_numpy()
+        confidence[to_model] = np.max(probs, axis=1).round(4)
+
+    df_chunk["pred_label"] = pred_label
+    df_chunk["confidence"] = confidence
+    df_chunk["verdict_source"] = verdict_source
+
+    if run_vt:
+        vt_malicious, vt_checked = run_vt_checks(urls_list, df_chunk["confidence"].to_numpy())
+    else:
+        vt_malicious = vt_checked = np.zeros(len(df_chunk), dtype=bool)
+    df_chunk["vt_result"] = vt_result_column(vt_malicious, vt_checked)
+    df_chunk["final_status"] = compute_final_status(
+        df_chunk["pred_label"], df_chunk["confidence"], vt_malicious
+    )
 
-    course_id = int(df_original.iloc[0].get("courseID", 0))
-    course_name = df_original.iloc[0].get("courseName", "Unknown Course")
+    if "moodle_url_id" in df_chunk.columns:
+        df_chunk["moodle_url_id"] = pd.to_numeric(df_chunk["moodle_url_id"], errors="coerce").fillna(0).astype(int)
+    else:
+        df_chunk["moodle_url_id"] = 0
+    df_chunk["source"] = df_chunk["source"].fillna("Unknown")
+    return df_chunk
+
+
+def iter_classified_chunks(url_file, clf, chunk_size=SCAN_CHUNK_SIZE, run_vt=True, allowlist=None):
+    """
+    Stream the scanner input file and yield classified chunks.
+    chunk_size=None reads the whole file as a single chunk.
+    """
+    if chunk_size:
+        reader = pd.read_csv(url_file, dtype=str, quotechar='"', chunksize=chunk_size)
+    else:
+        reader = [pd.read_csv(url_file, dtype=str, quotechar='"')]
+
+    for df_chunk in reader:
+        if df_chunk.empty:
+            continue
+        yield classify_chunk(clf, df_chunk, run_vt=run_vt, allowlist=allowlist)
+
+
+def chunk_status_counts(df_chunk):
+    """Return (safe, suspicious, malicious) counts for one classified chunk."""
+    status_counts = df_chunk["final_status"].value_counts()
+    safe_links = int(status_counts.get("benign", 0))
+    suspicious_links = int(status_counts.get("suspicious", 0))
+    malicious_links = int(status_counts.reindex(UNSAFE_LABELS, fill_value=0).sum())
+    return safe_links, suspicious_links, malicious_links
+
+
+def persist_chunk(report, df_chunk, output=None):
+    """
+    Save one chunk's unsafe URLs (and every row as a ScanResult of `output`, if given)
+    and add its counts to the report, in a single transaction.
+    Returns the chunk's (safe, suspicious, malicious) counts.
+    """
+    safe_links, suspicious_links, malicious_links = chunk_status_counts(df_chunk)
+    df_unsafe = df_chunk.loc[df_chunk["final_status"] != "benign", ["url", "moodle_url_id", "final_status", "source"]]
+
+    with transaction.atomic():
+        if output is not None:
+            ScanResult.objects.bulk_create(
+                [
+                    ScanResult(
+                        output=output, url=url, domain=registered_domain(url), author_username=username, author_name=name,
+                        author_email=email, source=source, pred_label=label, confidence=conf,
+                        vt_result=vt, final_status=status, verdict_source=verdict,
+                    )
+                    for url, username, name, email, source, label, conf, vt, status, verdict in
+                    df_chunk[EXPORT_COLS].fillna("").itertuples(index=False, name=None)
+                ],
+                batch_size=1000,
+            )
+        UnsafeURL.objects.bulk_create(
+            [
+                UnsafeURL(url=url, moodle_userID=user_id, status=status, source=source, report=report)
+                for url, user_id, status, source in df_unsafe.itertuples(index=False, name=None)
+            ],
+            batch_size=1000,
+        )
+        ScanReport.objects.filter(pk=report.pk).update(
+            total_link=F("total_link") + len(df_chunk),
+            safe_link=F("safe_link") + safe_links,
+            suspicious=F("suspicious") + suspicious_links,
+            malicious=F("malicious") + malicious_links,
+            allowlisted=F("allowlisted") + int((df_chunk["verdict_source"] == "allowlist").sum()),
+            vt_calls=F("vt_calls") + int((df_chunk["vt_result"] != "not_checked").sum()),
+        )
+
+    return safe_links, suspicious_links, malicious_links
 
-    urls_list = df_original["url"].tolist()
-    df_features = url_lexical_features(urls_list)
 
-    preds = clf.predict(df_features[["url_text", "url_len", "num_dots", "num_digits", "path_len", "char_entropy"]])
-    probs = clf.predict_proba(df_features[["url_text", "url_len", "num_dots", "num_digits", "path_len", "char_entropy"]])
-    df_features["pred_label"] = [label_map[p] for p in preds]
-    df_features["confidence"] = np.max(probs, axis=1).round(4)
+# -----------------------------
+# Scan one exported TXT file
+# -----------------------------
+def discard_partial_report(report, file_path):
+    """Delete an unfinished report (its outputs, results and unsafe URLs cascade) and its output file."""
+    try:
+        ScanReport.objects.filter(pk=report.pk, finalised=False).delete()
+    except Exception as e:
+        print(f"⚠️ Could not remove partial report {report.pk}: {e}")
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+    print(f"🧹 Scan aborted — partial report {report.pk} discarded")
+
+
+def finalise_report(report, output, **fields):
+    """
+    Mark a fully saved report finalised (with any extra ScanReport `fields`), add it to the summaries
+    and copy its totals to its output, all or nothing: a crash part way leaves it unfinalised and uncounted.
+    """
+    with transaction.atomic():
+        ScanReport.objects.filter(pk=report.pk).update(finalised=True, **fields)
+        report.refresh_from_db()
+        record_report_summary(report)
+        ScanOutput.objects.filter(pk=output.pk).update(
+            total_link=report.total_link,
+            safe_link=report.safe_link,
+            suspicious=report.suspicious,
+            malicious=report.malicious,
+        )
+
+
+def scan_from_file(url_file, chunk_size=SCAN_CHUNK_SIZE, progress=None, instance=None, report_fields=None):
+    """
+    Classify every URL in a scanner_input file, save the report and write the scanned output file.
+    `progress`, if given, is called with the number of rows done after each chunk.
+    `instance` is the Moodle site the file was collected from (primary by default).
+    `report_fields` are extra ScanReport fields (e.g. the content fingerprint) set as it is finalised.
+    """
+    if not os.path.exists(url_file):
+        print(f"⚠️ File not found: {url_file}")
+        return
 
-    df_combined = pd.concat([df_original.reset_index(drop=True),
-                             df_features[["pred_label", "confidence"]].reset_index(drop=True)], axis=1)
+    print(f"📂 Scanning file: {url_file}")
+
+    clf = load_ai_model()
+    allowlist = load_allowlist()
+    chunks = iter_classified_chunks(url_file, clf, chunk_size=chunk_size, allowlist=allowlist)
 
-    df_combined["vt_result"] = "not_checked"
-    df_combined["final_status"] = "benign"
+    df_chunk = next(chunks, None)
+    if df_chunk is None:
+        print(f"⚠️ No URLs to scan in: {url_file}")
+        return
+
+    first_row = df_chunk.iloc[0]
+    course_id = int(first_row.get("courseID", 0))
+    course_name = first_row.get("courseName", "Unknown Course")
 
     report = ScanReport.objects.create(
         date=timezone.now().date(),
-        total_link=len(df_combined),
+        total_link=0,
         safe_link=0,
         suspicious=0,
         malicious=0,
         moodle_courseID=course_id,
         moodle_courseName=course_name,
+        instance=instance or primary_instance(),
         all_url=str(url_file)
     )
 
-    safe_links, suspicious_links, malicious_links = 0, 0, 0
-
-    for idx, row in df_combined.iterrows():
-        url = row["url"]
-        pred_label = row["pred_label"]
-        confidence = row["confidence"]
-        moodle_url_id = int(row.get("moodle_url_id", 0))
-        source = row.get("source", "Unknown")
-
-        vt_malicious = False
-        vt_checked = False
-        if confidence < 0.8 and VT_API_KEY:
-            try:
-                analysis_id = vt_submit_url(url)
-                vt_malicious = poll_analysis(analysis_id)
-                vt_checked = True
-            except Exception as e:
-                print(f"⚠️ VT error for {url}: {e}")
-
-        if pred_label in ["adult", "phish", "malware"]:
-            if confidence >= 0.8 or vt_malicious:
-                status = pred_label
-                malicious_links += 1
-            elif 0.7 <= confidence < 0.8:
-                status = "suspicious"
-                suspicious_links += 1
-            else:
-                status = "benign"
-                safe_links += 1
-        else:
-            if not vt_malicious:
-                status = "benign"
-                safe_links += 1
-            else:
-                status = "suspicious"
-                suspicious_links += 1
-
-        df_combined.at[idx, "vt_result"] = "malicious" if vt_malicious else ("checked" if vt_checked else "not_checked")
-        df_combined.at[idx, "final_status"] = status
-
-        if status != "benign":
-            UnsafeURL.objects.create(
-                url=url,
-                moodle_userID=moodle_url_id,
-                status=status,
-                source=source,
-                report=report
-            )
-
-    report.safe_link = safe_links
-    report.suspicious = suspicious_links
-    report.malicious = malicious_links
-    report.save()
-
     # -----------------------------
     # Output File (manual vs auto separation)
     # -----------------------------
-    today_str = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
-    now_datetime = timezone.localtime(timezone.now()).strftime("%Y%m%d_%H%M%S")
+    scanned_at = timezone.now()
+    today_str = timezone.localtime(scanned_at).strftime("%Y-%m-%d")
+    now_datetime = timezone.localtime(scanned_at).strftime("%Y%m%d_%H%M%S")
     export_dir = Path("url_details") / today_str
     export_dir.mkdir(parents=True, exist_ok=True)
 
@@ -202,24 +405,47 @@ def scan_from_file(url_file):
     else:
         scan_type = "auto"
 
-    file_path = export_dir / f"{scan_type}_{course_id}_{now_datetime}_scanned.txt"
+    site_prefix = "" if report.instance == primary_instance() else f"{report.instance}_"
+    file_path = export_dir / f"{scan_type}_{site_prefix}{course_id}_{now_datetime}_scanned.txt"
     print(f"🗂️ Detected scan type: {scan_type.upper()}")
 
-    export_cols = [
-        "url", "authorUsername", "authorName", "authorEmail", "source",
-        "pred_label", "confidence", "vt_result", "final_status"
-    ]
+    output = ScanOutput.objects.create(
+        report=report,
+        moodle_courseID=course_id,
+        moodle_courseName=course_name,
+        scan_type=scan_type,
+        scanned_at=scanned_at,
+        path=str(file_path),
+    )
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(f"Exported on: {timezone.localtime(timezone.now()).strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Course ID: {course_id}\nCourse Name: {course_name}\n")
-        f.write("=" * 100 + "\n")
-        f.write(",".join(export_cols) + "\n")
-        for _, row in df_combined.iterrows():
-            f.write(",".join(str(row[c]) for c in export_cols) + "\n")
+    safe_links, suspicious_links, malicious_links = 0, 0, 0
+
+    try:
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            f.write(f"Exported on: {timezone.localtime(scanned_at).strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"Course ID: {course_id}\nCourse Name: {course_name}\n")
+            f.write("=" * 100 + "\n")
+            f.write(",".join(EXPORT_COLS) + "\n")
+
+            while df_chunk is not None:
+                safe, suspicious, malicious = persist_chunk(report, df_chunk, output=output)
+                safe_links += safe
+                suspicious_links += suspicious
+                malicious_links += malicious
+                df_chunk[EXPORT_COLS].to_csv(f, header=False, index=False, lineterminator="\n")
+                if progress:
+                    progress(safe_links + suspicious_links + malicious_links)
+                df_chunk = next(chunks, None)
+        finalise_report(report, output, **(report_fields or {}))
+    except BaseException:
+        # Chunks commit one by one: drop what was saved so the aborted scan leaves nothing behind.
+        # (If the process is killed outright the rows stay, but unfinalised and so ignored.)
+        discard_partial_report(report, file_path)
+        raise
 
     print(f"✅ Course {course_id} scanned successfully → {file_path}")
     print(f"   → Safe: {safe_links} | Suspicious: {suspicious_links} | Malicious: {malicious_links}")
+    print(f"   → Allowlisted (skipped model/VT): {report.allowlisted}")
 
     try:
         os.remove(url_file)
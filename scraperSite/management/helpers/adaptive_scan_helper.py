@@ -0,0 +1,150 @@
+import math
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from scraperSite.models import ScanJob, ScanOutput, UnsafeURL, finalised_q, catalogued_q, site_q
+from scraperSite.management.helpers.URL_collector_helper import course_activity_since
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, primary_instance
+
+# A course is not rescanned more often than this, however busy it is
+MIN_SCAN_INTERVAL = timedelta(hours=20)
+# Courses with unreviewed unsafe findings are rechecked at least this often (VirusTotal verdicts change)
+RISKY_RESCAN_INTERVAL = timedelta(days=7)
+# Unsafe findings older than this no longer make a course "risky"
+RISK_WINDOW = timedelta(days=90)
+# How much one unit of risk counts against one unit of content change when ranking
+RISK_WEIGHT = 2.0
+
+
+class CoursePlan:
+    """Why a course would (or would not) be scanned on this run."""
+    def __init__(self, course, last_checked, activity, unsafe, now):
+        self.course = course
+        self.last_checked = last_checked
+        self.activity = activity  # {content source name: new or edited rows} since last_checked
+        self.unsafe = unsafe
+        self.age = (now - last_checked) if last_checked else None
+        self.reason = ""
+        self.eligible = False
+        self.queued = False
+
+    @property
+    def changes(self):
+        return sum(self.activity.values())
+
+    @property
+    def score(self):
+        # log damping: one very chatty forum should not starve every other course
+        staleness = (self.age / max_scan_age()) if self.age is not None else 1.0
+        return math.log1p(self.changes) + RISK_WEIGHT * math.log1p(self.unsafe) + staleness
+
+
+def changed_share():
+    """Share of each run's budget reserved for changed / risky courses, so overdue ones cannot crowd them out."""
+    return min(max(getattr(settings, "ADAPTIVE_SCAN_CHANGED_SHARE", 0.5), 0.0), 1.0)
+
+
+def max_scan_age():
+    """Every course is rescanned at least this often, changed or not."""
+    return timedelta(days=getattr(settings, "ADAPTIVE_SCAN_MAX_AGE_DAYS", 28))
+
+
+def last_checked_by_course(course_ids, instance=None):
+    """
+    When each course (of the given Moodle site, primary by default) had its content last read.
+    Uses the start of the latest finished job (collection begins after it, so nothing is missed),
+    falling back to catalogued outputs for scans from before the job queue.
+    Live (log-tailing) reports only cover the records that changed, so they do not count.
+    """
+    instance = instance or primary_instance()
+    outputs = ScanOutput.objects.filter(
+        catalogued_q(), site_q(instance), moodle_courseID__in=course_ids, scan_type__in=("auto", "manual"),
+    )
+    checked = {
+        row["moodle_courseID"]: row["last"]
+        for row in outputs.values("moodle_courseID").annotate(last=Max("scanned_at"))
+    }
+    for row in (
+        ScanJob.objects.filter(instance=instance, moodle_courseID__in=course_ids, status="done",
+                               started_at__isnull=False)
+        .values("moodle_courseID").annotate(last=Max("started_at"))
+    ):
+        checked[row["moodle_courseID"]] = row["last"]
+    return checked
+
+
+def recent_unsafe_by_course(course_ids, now, instance=None):
+    """Unsafe findings per course in RISK_WINDOW, leaving out ones reviewed as safe."""
+    return {
+        row["report__moodle_courseID"]: row["n"]
+        for row in UnsafeURL.objects.filter(
+            finalised_q("report__"),
+            report__instance=instance or primary_instance(),
+            report__moodle_courseID__in=course_ids,
+            report__date__gte=(now - RISK_WINDOW).date(),
+        ).exclude(check_status="safe")
+        .values("report__moodle_courseID").annotate(n=Count("url_id"))
+    }
+
+
+def plan_course_scans(courses, budget=None, now=None, instance=None):
+    """
+    Rank one Moodle site's courses (primary by default) for this run and mark up to `budget` of them as queued.
+      - never scanned, or not scanned within max_scan_age(): due, oldest first
+      - new or edited content in any content source since the last scan, or risky and not checked for
+        RISKY_RESCAN_INTERVAL: ranked by change + risk + staleness
+      - anything scanned within MIN_SCAN_INTERVAL, or dormant and not risky: skipped
+    Up to changed_share() of the budget goes to the ranked courses first and the rest to due ones;
+    budget either side leaves unused goes to the other. Courses over the budget are left for the
+    next run, when their staleness counts for more.
+    Returns every CoursePlan, queued ones first.
+    """
+    now = now or timezone.now()
+    if budget is None:
+        budget = getattr(settings, "ADAPTIVE_SCAN_BUDGET", 40)
+
+    ids = [c.id for c in courses]
+    checked = last_checked_by_course(ids, instance=instance)
+    unsafe = recent_unsafe_by_course(ids, now, instance=instance)
+    activity = course_activity_since({
+        cid: int(checked[cid].timestamp()) if cid in checked else 0 for cid in ids
+    }, using=moodle_alias(instance=instance))
+
+    plans = [
+        CoursePlan(c, checked.get(c.id), activity.get(c.id, {}), unsafe.get(c.id, 0), now)
+        for c in courses
+    ]
+
+    due, ranked = [], []
+    for plan in plans:
+        if plan.age is None:
+            plan.reason = "never scanned"
+            due.append(plan)
+        elif plan.age >= max_scan_age():
+            plan.reason = f"not scanned for {plan.age.days} days"
+            due.append(plan)
+        elif plan.age < MIN_SCAN_INTERVAL:
+            plan.reason = "scanned recently"
+        elif plan.changes:
+            plan.reason = f"{plan.changes} new item(s)"
+            ranked.append(plan)
+        elif plan.unsafe and plan.age >= RISKY_RESCAN_INTERVAL:
+            plan.reason = f"{plan.unsafe} unsafe finding(s) to recheck"
+            ranked.append(plan)
+        else:
+            plan.reason = "no changes"
+
+    due.sort(key=lambda p: p.age or timedelta.max, reverse=True)
+    ranked.sort(key=lambda p: p.score, reverse=True)
+    for plan in due + ranked:
+        plan.eligible = True
+
+    reserved = min(len(ranked), math.ceil(budget * changed_share()))
+    queued = ranked[:reserved] + due[:budget - reserved]
+    queued += (due[budget - reserved:] + ranked[reserved:])[:budget - len(queued)]
+    for plan in queued:
+        plan.queued = True
+
+    return sorted(plans, key=lambda p: (not p.queued, -p.score))
@@ -0,0 +1,62 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from scraperSite.models import UnsafeURL, Watermark
+from scraperSite.management.helpers.domain_blocklist_helper import normalize_url_key, url_host, parent_domains
+
+# Watermark row bumped whenever a review decision changes, so every process knows to reload
+ALLOWLIST_MARK = "allowlist"
+
+_allowlist_cache = {}
+
+
+class Allowlist:
+    """
+    Known-safe URLs and domains, held in hash sets for O(1) lookups:
+      - URLs a reviewer has marked check_status='safe' (exact URL match)
+      - trusted domains from settings.SCANNER_TRUSTED_DOMAINS (host or any parent domain)
+    """
+
+    def __init__(self, urls=(), domains=()):
+        self.urls = {normalize_url_key(u) for u in urls if u}
+        self.domains = {url_host(d) for d in domains if d}
+        self.domains.discard("")
+
+    def __len__(self):
+        return len(self.urls) + len(self.domains)
+
+    def is_allowed(self, url):
+        if normalize_url_key(url) in self.urls:
+            return True
+        return any(d in self.domains for d in parent_domains(url_host(url)))
+
+    def match_urls(self, urls):
+        """Boolean array: True where the URL is allowlisted."""
+        return np.fromiter((self.is_allowed(u) for u in urls), dtype=bool, count=len(urls))
+
+
+def allowlist_version():
+    """Current review version; changes whenever allowlist_changed() is called in any process."""
+    return Watermark.objects.filter(name=ALLOWLIST_MARK).values_list("position", flat=True).first() or 0
+
+
+def allowlist_changed():
+    """Record that a review decision changed, so cached allowlists are rebuilt on their next use."""
+    mark, _ = Watermark.objects.get_or_create(name=ALLOWLIST_MARK)
+    Watermark.objects.filter(pk=mark.pk).update(position=F("position") + 1, updated_at=timezone.now())
+    _allowlist_cache.clear()
+
+
+def load_allowlist():
+    """
+    The allowlist from reviewer decisions and configured trusted domains, cached per process.
+    Rebuilt only when the review version or SCANNER_TRUSTED_DOMAINS has changed.
+    """
+    trusted = tuple(getattr(settings, "SCANNER_TRUSTED_DOMAINS", []))
+    key = (allowlist_version(), trusted)
+    if key not in _allowlist_cache:
+        reviewed = UnsafeURL.objects.filter(check_status="safe").values_list("url", flat=True).distinct()
+        _allowlist_cache.clear()
+        _allowlist_cache[key] = Allowlist(urls=reviewed.iterator(), domains=trusted)
+    return _allowlist_cache[key]
@@ -0,0 +1,293 @@
+from django.db import connections
+
+from scraperSite.management.helpers.moodle_db_helper import governed_rows
+
+_source_tables_cache = {}
+
+# ----------------------------------------------------
+# Registry of the Moodle content the collector reads
+# ----------------------------------------------------
+# Every source is fetched the same way: one query for the whole course, streamed in
+# MOODLE_FETCH_SIZE batches, with authors looked up once per batch (see export_course_urls).
+# To cover a new activity type, register a source here (and add its tables to the mirror).
+
+
+class ContentSource:
+    """
+    One kind of Moodle content.
+      rows_sql:  one query keyed by %(course)s returning (text, author user id or NULL, source tag);
+                 for kind="file" the first column is the file's contenthash instead of text
+      kind:      "html" for editor fields (parsed with lxml), "text" for plain text such as a URL
+                 resource or chat line (regex only, nothing decoded), or "file"
+      stamp_sql: scalar subqueries (row count, latest change) that go into the course fingerprint
+      activity_sql: scalar expression counting the rows of course s.course changed after unix time s.ts,
+                 for the adaptive schedule (see course_activity_sql); None leaves the source out
+      tables:    Moodle tables it reads; a site without them (plugin not installed) skips the source
+    """
+    def __init__(self, name, tables, rows_sql, stamp_sql, kind="html", activity_sql=None):
+        self.name = name
+        self.tables = tuple(tables)
+        self.rows_sql = rows_sql
+        self.stamp_sql = tuple(stamp_sql)
+        self.kind = kind
+        self.activity_sql = activity_sql
+
+    def __repr__(self):
+        return f"<ContentSource {self.name}>"
+
+
+SOURCES = []
+
+
+def register_source(source):
+    SOURCES.append(source)
+    return source
+
+
+# Fingerprints hash the stamps in registration order: keep existing sources first and add new ones
+# at the end, so courses on sites without the new tables keep their fingerprint.
+register_source(ContentSource(
+    "url", ["mdl_url"],
+    "SELECT externalurl, NULL, 'url_resource' FROM mdl_url WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_url WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_url WHERE course = %(course)s)"],
+    kind="text",
+    activity_sql="(SELECT COUNT(*) FROM mdl_url WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "forum", ["mdl_forum"],
+    "SELECT intro, NULL, 'forum_intro' FROM mdl_forum WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_forum WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_forum WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_forum WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "forum_discussion", ["mdl_forum", "mdl_forum_discussions"],
+    """
+    SELECT d.name, d.userid, 'forum_discussion_name'
+    FROM mdl_forum_discussions d
+    JOIN mdl_forum f ON f.id = d.forum
+    WHERE f.course = %(course)s
+    """,
+    ["""(SELECT COUNT(*) FROM mdl_forum_discussions d
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = %(course)s)""",
+     """(SELECT COALESCE(MAX(d.timemodified), 0) FROM mdl_forum_discussions d
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = %(course)s)"""],
+    kind="text",
+    activity_sql="""(SELECT COUNT(*) FROM mdl_forum_discussions d
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = s.course AND d.timemodified > s.ts)""",
+))
+
+register_source(ContentSource(
+    "forum_post", ["mdl_forum", "mdl_forum_discussions", "mdl_forum_posts"],
+    """
+    SELECT p.message, p.userid, 'forum_post'
+    FROM mdl_forum_posts p
+    JOIN mdl_forum_discussions d ON d.id = p.discussion
+    JOIN mdl_forum f ON f.id = d.forum
+    WHERE f.course = %(course)s
+    """,
+    ["""(SELECT COUNT(*) FROM mdl_forum_posts p
+           JOIN mdl_forum_discussions d ON d.id = p.discussion
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = %(course)s)""",
+     """(SELECT COALESCE(MAX(p.modified), 0) FROM mdl_forum_posts p
+           JOIN mdl_forum_discussions d ON d.id = p.discussion
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = %(course)s)"""],
+    activity_sql="""(SELECT COUNT(*) FROM mdl_forum_posts p
+           JOIN mdl_forum_discussions d ON d.id = p.discussion
+           JOIN mdl_forum f ON f.id = d.forum
+          WHERE f.course = s.course AND p.modified > s.ts)""",
+))
+
+register_source(ContentSource(
+    "chat", ["mdl_chat"],
+    "SELECT intro, NULL, 'chat_intro' FROM mdl_chat WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_chat WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_chat WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_chat WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "chat_message", ["mdl_chat", "mdl_chat_messages"],
+    """
+    SELECT m.message, m.userid, 'chat_message'
+    FROM mdl_chat_messages m
+    JOIN mdl_chat c ON c.id = m.chatid
+    WHERE c.course = %(course)s
+    """,
+    ["""(SELECT COUNT(*) FROM mdl_chat_messages m
+           JOIN mdl_chat c ON c.id = m.chatid
+          WHERE c.course = %(course)s)""",
+     """(SELECT COALESCE(MAX(m.timestamp), 0) FROM mdl_chat_messages m
+           JOIN mdl_chat c ON c.id = m.chatid
+          WHERE c.course = %(course)s)"""],
+    kind="text",
+    activity_sql="""(SELECT COUNT(*) FROM mdl_chat_messages m
+           JOIN mdl_chat c ON c.id = m.chatid
+          WHERE c.course = s.course AND m.timestamp > s.ts)""",
+))
+
+# Files attached to the course's activities (module context = level 70), read from moodledata
+register_source(ContentSource(
+    "file", ["mdl_files", "mdl_context", "mdl_course_modules"],
+    """
+    SELECT fl.contenthash, fl.userid, fl.component || ':' || fl.filearea
+    FROM mdl_files fl
+    JOIN mdl_context ctx ON ctx.id = fl.contextid AND ctx.contextlevel = 70
+    JOIN mdl_course_modules cm ON cm.id = ctx.instanceid
+    WHERE cm.course = %(course)s AND fl.filename <> '.'
+    """,
+    ["""(SELECT COUNT(*) FROM mdl_files fl
+           JOIN mdl_context ctx ON ctx.id = fl.contextid AND ctx.contextlevel = 70
+           JOIN mdl_course_modules cm ON cm.id = ctx.instanceid
+          WHERE cm.course = %(course)s AND fl.filename <> '.')""",
+     """(SELECT COALESCE(MAX(fl.timemodified), 0) FROM mdl_files fl
+           JOIN mdl_context ctx ON ctx.id = fl.contextid AND ctx.contextlevel = 70
+           JOIN mdl_course_modules cm ON cm.id = ctx.instanceid
+          WHERE cm.course = %(course)s AND fl.filename <> '.')"""],
+    kind="file",
+    activity_sql="""(SELECT COUNT(*) FROM mdl_files fl
+           JOIN mdl_context ctx ON ctx.id = fl.contextid AND ctx.contextlevel = 70
+           JOIN mdl_course_modules cm ON cm.id = ctx.instanceid
+          WHERE cm.course = s.course AND fl.filename <> '.' AND fl.timemodified > s.ts)""",
+))
+
+register_source(ContentSource(
+    "page", ["mdl_page"],
+    """
+    SELECT intro, NULL, 'page_intro' FROM mdl_page WHERE course = %(course)s
+    UNION ALL
+    SELECT content, NULL, 'page_content' FROM mdl_page WHERE course = %(course)s
+    """,
+    ["(SELECT COUNT(*) FROM mdl_page WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_page WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_page WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "label", ["mdl_label"],
+    "SELECT intro, NULL, 'label_intro' FROM mdl_label WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_label WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_label WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_label WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "book", ["mdl_book", "mdl_book_chapters"],
+    """
+    SELECT intro, NULL, 'book_intro' FROM mdl_book WHERE course = %(course)s
+    UNION ALL
+    SELECT ch.content, NULL, 'book_chapter'
+    FROM mdl_book_chapters ch
+    JOIN mdl_book b ON b.id = ch.bookid
+    WHERE b.course = %(course)s
+    """,
+    ["(SELECT COUNT(*) FROM mdl_book WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_book WHERE course = %(course)s)",
+     """(SELECT COUNT(*) FROM mdl_book_chapters ch
+           JOIN mdl_book b ON b.id = ch.bookid
+          WHERE b.course = %(course)s)""",
+     """(SELECT COALESCE(MAX(ch.timemodified), 0) FROM mdl_book_chapters ch
+           JOIN mdl_book b ON b.id = ch.bookid
+          WHERE b.course = %(course)s)"""],
+    activity_sql="""(SELECT COUNT(*) FROM mdl_book WHERE course = s.course AND timemodified > s.ts)
+     + (SELECT COUNT(*) FROM mdl_book_chapters ch
+          JOIN mdl_book b ON b.id = ch.bookid
+         WHERE b.course = s.course AND ch.timemodified > s.ts)""",
+))
+
+register_source(ContentSource(
+    "assign", ["mdl_assign"],
+    "SELECT intro, NULL, 'assign_intro' FROM mdl_assign WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_assign WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_assign WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_assign WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "quiz", ["mdl_quiz"],
+    "SELECT intro, NULL, 'quiz_intro' FROM mdl_quiz WHERE course = %(course)s",
+    ["(SELECT COUNT(*) FROM mdl_quiz WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_quiz WHERE course = %(course)s)"],
+    activity_sql="(SELECT COUNT(*) FROM mdl_quiz WHERE course = s.course AND timemodified > s.ts)",
+))
+
+register_source(ContentSource(
+    "lesson", ["mdl_lesson", "mdl_lesson_pages"],
+    """
+    SELECT intro, NULL, 'lesson_intro' FROM mdl_lesson WHERE course = %(course)s
+    UNION ALL
+    SELECT lp.contents, NULL, 'lesson_page'
+    FROM mdl_lesson_pages lp
+    JOIN mdl_lesson l ON l.id = lp.lessonid
+    WHERE l.course = %(course)s
+    """,
+    ["(SELECT COUNT(*) FROM mdl_lesson WHERE course = %(course)s)",
+     "(SELECT COALESCE(MAX(timemodified), 0) FROM mdl_lesson WHERE course = %(course)s)",
+     """(SELECT COUNT(*) FROM mdl_lesson_pages lp
+           JOIN mdl_lesson l ON l.id = lp.lessonid
+          WHERE l.course = %(course)s)""",
+     """(SELECT COALESCE(MAX(lp.timemodified), 0) FROM mdl_lesson_pages lp
+           JOIN mdl_lesson l ON l.id = lp.lessonid
+          WHERE l.course = %(course)s)"""],
+    activity_sql="""(SELECT COUNT(*) FROM mdl_lesson WHERE course = s.course AND timemodified > s.ts)
+     + (SELECT COUNT(*) FROM mdl_lesson_pages lp
+          JOIN mdl_lesson l ON l.id = lp.lessonid
+         WHERE l.course = s.course AND lp.timemodified > s.ts)""",
+))
+
+
+# ----------------------------------------------------
+# Fetching
+# ----------------------------------------------------
+def available_sources(using):
+    """
+    Registered sources whose tables exist on this DB alias, in registration order.
+    The table list is read once per alias per process; forget_source_tables() drops it.
+    """
+    if using not in _source_tables_cache:
+        _source_tables_cache[using] = set(connections[using].introspection.table_names())
+    tables = _source_tables_cache[using]
+    return [s for s in SOURCES if set(s.tables) <= tables]
+
+
+def forget_source_tables(using=None):
+    """Re-read the table list on next use (e.g. after the mirror sync created tables)."""
+    if using is None:
+        _source_tables_cache.clear()
+    else:
+        _source_tables_cache.pop(using, None)
+
+
+def iter_source_rows(source, course_id, using):
+    """Stream (text, author id, source tag) rows of one source for a course through a server-side cursor."""
+    with connections[using].chunked_cursor() as cur:
+        cur.execute(source.rows_sql, {"course": course_id})
+        yield from governed_rows(cur)
+
+
+def course_stamp_sql(sources):
+    """One SELECT returning every source's stamps for %(course)s, for the course fingerprint."""
+    return "SELECT " + ",\n       ".join(stamp for s in sources for stamp in s.stamp_sql)
+
+
+def course_activity_sql(sources):
+    """
+    One SELECT returning (course, one count per source) for every pair in %(courses)s / %(since)s,
+    counting what each source has new or edited since the course's unix timestamp.
+    """
+    counts = "".join(f",\n       {s.activity_sql}" for s in sources)
+    return f"""
+    WITH since AS (
+        SELECT * FROM unnest(%(courses)s::bigint[], %(since)s::bigint[]) AS s(course, ts)
+    )
+    SELECT s.course{counts}
+    FROM since s
+    """
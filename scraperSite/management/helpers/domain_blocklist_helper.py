@@ -0,0 +1,154 @@
+import os
+import hashlib
+from urllib.parse import urlsplit
+import numpy as np
+import tldextract
+
+# ----------------------------------------------------
+# CONFIG
+# ----------------------------------------------------
+BLOCKLIST_PATH = "trained_models/domain_blocklist.npz"
+
+# Same codes as the classifier output (see LABEL_MAP in URL_scanner_helper)
+LABEL_CODES = {"phish": 1, "malware": 2, "adult": 3}
+
+_blocklist_cache = {}
+
+
+# ----------------------------------------------------
+# Key helpers
+# ----------------------------------------------------
+def normalize_url_key(url):
+    """Lower-case URL without scheme or trailing slash, so http/https variants match."""
+    u = (url or "").strip().lower()
+    if "://" in u:
+        u = u.split("://", 1)[1]
+    return u.rstrip("/")
+
+
+def url_host(url):
+    """Hostname of a URL (or bare domain), lower-cased, without port or leading 'www.'."""
+    u = (url or "").strip().lower()
+    if "://" not in u:
+        u = "http://" + u
+    try:
+        host = urlsplit(u).hostname or ""
+    except ValueError:
+        return ""
+    host = host.rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+def registered_domain(url):
+    """Registrable domain of a URL or host ('https://a.evil.co.uk/x' -> 'evil.co.uk'); the host if none."""
+    host = url_host(url)
+    return tldextract.extract(host).registered_domain or host
+
+
+def parent_domains(host):
+    """'a.b.example.com' -> ['a.b.example.com', 'b.example.com', 'example.com'] (bare TLD is never tested)."""
+    labels = host.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)]
+
+
+def hash_key(key):
+    """64-bit hash of a key; 8 bytes per entry instead of a Python string object."""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# ----------------------------------------------------
+# Compact index: sorted uint64 hashes + parallel uint8 labels
+# ----------------------------------------------------
+class DomainBlocklist:
+    """
+    Domain entries ("d:<host>") match the host and every parent domain.
+    URL entries ("u:<url>") match only that exact URL, so a single bad link on a
+    shared host (github.com, drive.google.com, ...) does not block the whole host.
+    """
+
+    def __init__(self, hashes, labels):
+        self.hashes = hashes
+        self.labels = labels
+
+    @classmethod
+    def build(cls, domains=(), urls=()):
+        """
+        domains / urls: iterables of (value, label) pairs, label in LABEL_CODES.
+        When the same key appears twice the last label wins.
+        """
+        entries = {}
+        for domain, label in domains:
+            host = url_host(domain)
+            if host and label in LABEL_CODES:
+                entries[hash_key("d:" + host)] = LABEL_CODES[label]
+        for url, label in urls:
+            key = normalize_url_key(url)
+            if key and label in LABEL_CODES:
+                entries[hash_key("u:" + key)] = LABEL_CODES[label]
+
+        hashes = np.fromiter(entries.keys(), dtype=np.uint64, count=len(entries))
+        labels = np.fromiter(entries.values(), dtype=np.uint8, count=len(entries))
+        order = np.argsort(hashes)
+        return cls(hashes[order], labels[order])
+
+    @classmethod
+    def load(cls, path=BLOCKLIST_PATH):
+        data = np.load(path)
+        return cls(data["hashes"], data["labels"])
+
+    def save(self, path=BLOCKLIST_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, hashes=self.hashes, labels=self.labels)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes + self.labels.nbytes
+
+    def lookup_hashes(self, hashes):
+        """Return the label code for each hash (0 = not listed)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(self.hashes) or not len(hashes):
+            return np.zeros(len(hashes), dtype=np.uint8)
+        pos = np.searchsorted(self.hashes, hashes)
+        pos_clipped = np.minimum(pos, len(self.hashes) - 1)
+        found = self.hashes[pos_clipped] == hashes
+        return np.where(found, self.labels[pos_clipped], 0).astype(np.uint8)
+
+    def match_urls(self, urls):
+        """
+        Return one label code per URL (0 = not listed), checking the exact URL
+        first and then the host and its parent domains; the most specific entry listed wins.
+        """
+        candidate_hashes = []
+        owners = []
+        for idx, url in enumerate(urls):
+            keys = ["u:" + normalize_url_key(url)]
+            keys += ["d:" + d for d in parent_domains(url_host(url))]
+            candidate_hashes.extend(hash_key(k) for k in keys)
+            owners.extend([idx] * len(keys))
+
+        codes = np.zeros(len(urls), dtype=np.uint8)
+        if not candidate_hashes:
+            return codes
+        hits = self.lookup_hashes(np.array(candidate_hashes, dtype=np.uint64))
+        owners = np.asarray(owners)
+        matched = np.flatnonzero(hits)
+        # Several candidates of one URL may match: keep the first, i.e. the most specific
+        # (exact URL, then the host, then each parent domain), as the candidates are in that order
+        urls_hit, first = np.unique(owners[matched], return_index=True)
+        codes[urls_hit] = hits[matched[first]]
+        return codes
+
+
+def get_blocklist(path=BLOCKLIST_PATH):
+    """Load the blocklist once per process; returns None if it has not been built yet."""
+    if path not in _blocklist_cache:
+        if os.path.exists(path):
+            _blocklist_cache[path] = DomainBlocklist.load(path)
+            print(f"🧱 Loaded domain blocklist ({len(_blocklist_cache[path])} entries) from {path}")
+        else:
+            _blocklist_cache[path] = None
+    return _blocklist_cache[path]
@@ -0,0 +1,126 @@
+import csv
+from datetime import datetime, timedelta
+import xlsxwriter
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from scraperSite.models import UnsafeURL, ScanOutput, ScanResult, finalised_q, catalogued_q, site_q
+from scraperSite.management.helpers.moodle_db_helper import primary_instance
+
+# Rows fetched per round trip; on Postgres .iterator() uses a server-side cursor, so only this many are held
+EXPORT_FETCH_SIZE = 2000
+# Rows an .xlsx worksheet can hold, header included; longer exports continue on "<name> (2)", ...
+XLSX_MAX_ROWS = 1048576
+# Excel's limit on worksheet name length
+XLSX_MAX_NAME = 31
+
+UNSAFE_HEADERS = ["url_id", "url", "status", "check_status", "source", "moodle_userID",
+                  "report_id", "report_date", "course_id", "course_name", "instance"]
+RESULT_HEADERS = ["course_id", "course_name", "scan_type", "scanned_at", "url", "authorUsername",
+                  "authorName", "authorEmail", "source", "pred_label", "confidence", "vt_result",
+                  "final_status", "verdict_source", "instance"]
+
+
+def day_start(day):
+    return timezone.make_aware(datetime(day.year, day.month, day.day))
+
+
+def export_querysets(report_id=None, course_id=None, date_from=None, date_to=None, scan_type=None, instance=None):
+    """
+    (UnsafeURL, ScanResult) querysets for one report, one course and/or a date range (inclusive dates).
+    A course is looked up on `instance` (the primary Moodle site by default).
+    Both are ordered by primary key so exports are stable.
+    """
+    unsafe = UnsafeURL.objects.select_related("report").filter(finalised_q("report__"))
+    results = ScanResult.objects.select_related("output__report").filter(catalogued_q("output__"))
+    if course_id and not instance:
+        instance = primary_instance()
+    if instance:
+        unsafe = unsafe.filter(report__instance=instance)
+        results = results.filter(site_q(instance, "output__"))
+
+    if report_id:
+        unsafe = unsafe.filter(report_id=report_id)
+        results = results.filter(output__report_id=report_id)
+    if course_id:
+        unsafe = unsafe.filter(report__moodle_courseID=course_id)
+        results = results.filter(output__moodle_courseID=course_id)
+    if date_from:
+        unsafe = unsafe.filter(report__date__gte=date_from)
+        results = results.filter(output__scanned_at__gte=day_start(date_from))
+    if date_to:
+        unsafe = unsafe.filter(report__date__lte=date_to)
+        results = results.filter(output__scanned_at__lt=day_start(date_to + timedelta(days=1)))
+    if scan_type:
+        # UnsafeURL has no scan type of its own; go through the report's catalogued outputs.
+        # EXISTS rather than a join, which would repeat each URL once per matching output.
+        unsafe = unsafe.filter(Exists(ScanOutput.objects.filter(report_id=OuterRef("report_id"), scan_type=scan_type)))
+        results = results.filter(output__scan_type=scan_type)
+
+    return unsafe.order_by("url_id"), results.order_by("result_id")
+
+
+def unsafe_rows(queryset):
+    for u in queryset.iterator(chunk_size=EXPORT_FETCH_SIZE):
+        yield [u.url_id, u.url, u.status, u.check_status, u.source, u.moodle_userID,
+               u.report_id, u.report.date.isoformat(), u.report.moodle_courseID, u.report.moodle_courseName,
+               u.report.instance]
+
+
+def result_rows(queryset):
+    for r in queryset.iterator(chunk_size=EXPORT_FETCH_SIZE):
+        yield [r.output.moodle_courseID, r.output.moodle_courseName, r.output.scan_type,
+               timezone.localtime(r.output.scanned_at).strftime("%Y-%m-%d %H:%M:%S"), r.url,
+               r.author_username, r.author_name, r.author_email, r.source, r.pred_label,
+               r.confidence, r.vt_result, r.final_status, r.verdict_source,
+               r.output.report.instance if r.output.report else primary_instance()]
+
+
+def sheet_name(name, part):
+    """Name of the part-th worksheet of `name`: "Name", "Name (2)", ... within Excel's length limit."""
+    if part == 1:
+        return name[:XLSX_MAX_NAME]
+    suffix = f" ({part})"
+    return name[:XLSX_MAX_NAME - len(suffix)] + suffix
+
+
+def write_xlsx(target, sheets):
+    """
+    Write [(sheet name, headers, rows)] to an .xlsx path or file object.
+    constant_memory flushes each row to disk as it is written, so memory stays flat for any size;
+    rows must therefore be written strictly in order, which the row generators do.
+    A sheet that reaches XLSX_MAX_ROWS carries on in a new one ("Name (2)", ...) under the same headers.
+    Returns the number of data rows written.
+    """
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True, "strings_to_urls": False})
+    bold = workbook.add_format({"bold": True})
+    written = 0
+    for name, headers, rows in sheets:
+        part, row_num, sheet = 0, XLSX_MAX_ROWS, None
+        for row in rows:
+            if row_num >= XLSX_MAX_ROWS:
+                part += 1
+                sheet = workbook.add_worksheet(sheet_name(name, part))
+                sheet.write_row(0, 0, headers, bold)
+                row_num = 1
+            sheet.write_row(row_num, 0, row)
+            row_num += 1
+            written += 1
+        if sheet is None:
+            workbook.add_worksheet(sheet_name(name, 1)).write_row(0, 0, headers, bold)
+    workbook.close()
+    return written
+
+
+class Echo:
+    """File-like object whose write() hands the line back, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def iter_csv_lines(headers, rows):
+    """CSV text one line at a time (for StreamingHttpResponse or writing to a file)."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
@@ -0,0 +1,303 @@
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+import pandas as pd
+from django.db import connection, connections
+from django.db.models import F, Max
+from django.utils import timezone
+
+from scraperSite.models import (
+    ScanReport, ScanOutput, ScanResult, Watermark, MoodleLogEntry, MoodleCourse, MoodleUser,
+    MoodleUrl, MoodleModules, MoodleCourseModules, Forum, ForumDiscussion, ForumPost, MoodleChat, MoodleChatMessage,
+)
+from scraperSite.management.helpers.URL_collector_helper import (
+    extract_urls_from_text, extract_urls_from_html, extract_urls_from_file, iter_files_modified_since,
+    moodle_file_path_from_contenthash, write_url_row,
+)
+from scraperSite.management.helpers.URL_scanner_helper import (
+    EXPORT_COLS, load_ai_model, classify_chunk, persist_chunk,
+)
+from scraperSite.management.helpers.allowlist_helper import load_allowlist
+from scraperSite.management.helpers.report_summary_helper import add_to_summaries
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, get_instance
+
+LOG_TABLE = "mdl_logstore_standard_log"
+LIVE_CURSOR = "moodle_logstore"
+# Two-int advisory lock key held for the tailer's lifetime (302 = course scans, 303 = scheduler)
+LIVE_LOCK_NAMESPACE = 304
+LIVE_LOCK_ID = 1
+
+# Log ids read per pass; the range is walked on the primary key, so each pass is one bounded index scan
+LOG_ID_WINDOW = 5000
+# Files are matched on timemodified, so allow for clock skew between the web nodes and the DB
+FILE_TIME_SLACK = 60
+# Log ids are taken when a Moodle transaction inserts, not when it commits, so id N can appear after
+# N+1 was read. The cursor only moves past events older than this many seconds: the recent tail is
+# re-read on the next pass (URLs already in today's report are skipped) and late commits are caught.
+COMMIT_LAG = 120
+
+# Events that can add or change a URL: posts, discussions, chat messages, and module create/update
+# (which covers URL resources, forum/chat intros and uploaded files)
+TRACKED_TABLES = ("forum_posts", "forum_discussions", "chat_messages", "course_modules")
+INPUT_COLS = ["url", "authorUsername", "authorName", "authorEmail", "source", "courseID", "courseName"]
+
+
+class RowCollector:
+    """csv.writer stand-in so write_url_row can fill a list instead of a file."""
+    def __init__(self):
+        self.rows = []
+
+    def writerow(self, row):
+        self.rows.append(row)
+
+
+# ----------------------------------------------------
+# Cursor + lock
+# ----------------------------------------------------
+def log_store_available():
+    return LOG_TABLE in connections[moodle_alias(fresh=True)].introspection.table_names()
+
+
+def latest_log_id():
+    return MoodleLogEntry.objects.using(moodle_alias(fresh=True)).aggregate(m=Max("id"))["m"] or 0
+
+
+def get_cursor():
+    """The persisted log position; a first run starts at the current end of the log (history is the batch scan's job)."""
+    cursor, created = Watermark.objects.get_or_create(name=LIVE_CURSOR)
+    if created:
+        cursor.position = latest_log_id()
+        cursor.save(update_fields=["position", "updated_at"])
+        print(f"📍 Live scan starting at Moodle log id {cursor.position}")
+    return cursor
+
+
+def acquire_live_scan_lock():
+    """Only one tailer may advance the cursor; released automatically if the process dies."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s, %s)", [LIVE_LOCK_NAMESPACE, LIVE_LOCK_ID])
+        return cur.fetchone()[0]
+
+
+# ----------------------------------------------------
+# Log events -> scanner input rows
+# ----------------------------------------------------
+def settled_log_id(after, upto):
+    """Highest log id in (after, upto] older than COMMIT_LAG, or `after` if every event there is recent."""
+    settled = (
+        MoodleLogEntry.objects.using(moodle_alias(fresh=True))
+        .filter(id__gt=after, id__lte=upto, timecreated__lte=int(time.time()) - COMMIT_LAG)
+        .aggregate(m=Max("id"))["m"]
+    )
+    return settled or after
+
+
+def read_events(after, upto):
+    return list(
+        MoodleLogEntry.objects.using(moodle_alias(fresh=True))
+        .filter(id__gt=after, id__lte=upto, crud__in=("c", "u"), objecttable__in=TRACKED_TABLES,
+                courseid__isnull=False, courseid__gt=0)
+        .values_list("courseid", "objecttable", "objectid", "contextid", "timecreated")
+    )
+
+
+def collect_event_urls(events):
+    """
+    Re-read just the records the events point at (primary-key lookups, one query per table),
+    always from Moodle itself: the mirror may not have caught up with these edits yet,
+    and return {course_id: [scanner input row, ...]}, de-duplicated per course.
+    """
+    ids = defaultdict(dict)  # objecttable -> {objectid: course_id}
+    context_course = {}
+    since = None
+    for course_id, table, object_id, context_id, created in events:
+        ids[table][object_id] = course_id
+        context_course[context_id] = course_id
+        since = created if since is None else min(since, created)
+
+    found = []  # (course_id, urls, source, author user id)
+    wwwroot = get_instance().get("wwwroot")
+
+    posts = ids["forum_posts"]
+    for post in ForumPost.objects.using(moodle_alias(fresh=True)).filter(id__in=posts):
+        found.append((posts[post.id], extract_urls_from_html(post.message, wwwroot), "forum_post", post.userid))
+
+    discussions = ids["forum_discussions"]
+    for d in ForumDiscussion.objects.using(moodle_alias(fresh=True)).filter(id__in=discussions):
+        found.append((discussions[d.id], extract_urls_from_text(d.name or ""), "forum_discussion_name", d.userid))
+    # A new discussion logs discussion_created but not its first post
+    for post in ForumPost.objects.using(moodle_alias(fresh=True)).filter(discussion__in=discussions):
+        found.append((discussions[post.discussion], extract_urls_from_html(post.message, wwwroot), "forum_post", post.userid))
+
+    messages = ids["chat_messages"]
+    for msg in MoodleChatMessage.objects.using(moodle_alias(fresh=True)).filter(id__in=messages):
+        found.append((messages[msg.id], extract_urls_from_text(msg.message or ""), "chat_message", msg.userid))
+
+    modules = ids["course_modules"]
+    if modules:
+        cms = list(MoodleCourseModules.objects.using(moodle_alias(fresh=True)).filter(id__in=modules))
+        names = dict(MoodleModules.objects.using(moodle_alias(fresh=True)).filter(id__in={cm.module for cm in cms})
+                     .values_list("id", "name"))
+        instances = defaultdict(dict)  # module name -> {instance id: course_id}
+        for cm in cms:
+            instances[names.get(cm.module)][cm.instance] = cm.course
+        for u in MoodleUrl.objects.using(moodle_alias(fresh=True)).filter(id__in=instances["url"]):
+            found.append((instances["url"][u.id], extract_urls_from_text(u.externalurl or ""), "url_resource", None))
+        for forum in Forum.objects.using(moodle_alias(fresh=True)).filter(id__in=instances["forum"]):
+            found.append((instances["forum"][forum.id], extract_urls_from_html(forum.intro, wwwroot), "forum_intro", None))
+        for chat in MoodleChat.objects.using(moodle_alias(fresh=True)).filter(id__in=instances["chat"]):
+            found.append((instances["chat"][chat.id], extract_urls_from_html(chat.intro, wwwroot), "chat_intro", None))
+
+    # Files uploaded with a post or to a module land in that module's context
+    if since is not None:
+        for contextid, component, filearea, _, _, contenthash, file_userid in iter_files_modified_since(
+                context_course, since - FILE_TIME_SLACK, using=moodle_alias(fresh=True)):
+            file_path = moodle_file_path_from_contenthash(contenthash)
+            if file_path and os.path.exists(file_path):
+                found.append((context_course[contextid], extract_urls_from_file(file_path),
+                              f"{component}:{filearea}", file_userid))
+
+    found = [f for f in found if f[1]]
+    if not found:
+        return {}
+
+    users = MoodleUser.objects.using(moodle_alias(fresh=True)).in_bulk({f[3] for f in found if f[3]})
+    courses = MoodleCourse.objects.using(moodle_alias(fresh=True)).in_bulk({f[0] for f in found})
+
+    by_course = defaultdict(RowCollector)
+    seen = defaultdict(set)
+    for course_id, urls, source, user_id in found:
+        course = courses.get(course_id)
+        if course is None:
+            continue
+        for url in urls:
+            if url not in seen[course_id]:
+                seen[course_id].add(url)
+                write_url_row(by_course[course_id], url, source, course, users.get(user_id))
+    return {course_id: collector.rows for course_id, collector in by_course.items()}
+
+
+# ----------------------------------------------------
+# Rolling per-course report
+# ----------------------------------------------------
+def live_output_path(course_id, now):
+    return str(Path("url_details") / timezone.localtime(now).strftime("%Y-%m-%d") / f"live_{course_id}_scanned.txt")
+
+
+def create_live_output(course_id, course_name, path, now):
+    """Today's rolling report for a course, with its catalogue entry and output file header."""
+    report = ScanReport.objects.create(
+        date=timezone.localtime(now).date(),
+        total_link=0,
+        safe_link=0,
+        suspicious=0,
+        malicious=0,
+        moodle_courseID=course_id,
+        moodle_courseName=course_name,
+        all_url=path,
+        # Rolling: every append commits complete rows and totals
+        finalised=True,
+    )
+    output = ScanOutput.objects.create(
+        report=report,
+        moodle_courseID=course_id,
+        moodle_courseName=course_name,
+        scan_type="live",
+        scanned_at=now,
+        path=path,
+    )
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(f"Exported on: {timezone.localtime(now).strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Course ID: {course_id}\nCourse Name: {course_name}\n")
+        f.write("=" * 100 + "\n")
+        f.write(",".join(EXPORT_COLS) + "\n")
+    return output
+
+
+def scan_live_rows(course_id, rows, clf, allowlist, now=None):
+    """Classify new rows for one course and add them to its rolling report. Returns rows scanned."""
+    now = now or timezone.now()
+    path = live_output_path(course_id, now)
+    output = ScanOutput.objects.select_related("report").filter(path=path).first()
+
+    # Edits re-log the whole post; only URLs not already in today's report are scanned
+    if output is not None:
+        known = set(ScanResult.objects.filter(output=output, url__in=[r[0] for r in rows])
+                    .values_list("url", flat=True))
+        rows = [r for r in rows if r[0] not in known]
+    if not rows:
+        return 0
+
+    created = output is None
+    if created:
+        output = create_live_output(course_id, rows[0][6], path, now)
+
+    df_chunk = classify_chunk(clf, pd.DataFrame(rows, columns=INPUT_COLS, dtype=str), allowlist=allowlist)
+    safe, suspicious, malicious = persist_chunk(output.report, df_chunk, output=output)
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        df_chunk[EXPORT_COLS].to_csv(f, header=False, index=False, lineterminator="\n")
+
+    totals = {
+        "total_link": len(df_chunk), "safe_link": safe, "suspicious": suspicious, "malicious": malicious,
+        "allowlisted": int((df_chunk["verdict_source"] == "allowlist").sum()),
+        "vt_calls": int((df_chunk["vt_result"] != "not_checked").sum()),
+    }
+    ScanOutput.objects.filter(pk=output.pk).update(
+        total_link=F("total_link") + len(df_chunk), safe_link=F("safe_link") + safe,
+        suspicious=F("suspicious") + suspicious, malicious=F("malicious") + malicious,
+    )
+    unsafe = df_chunk[df_chunk["final_status"] != "benign"]
+    add_to_summaries(
+        output.report, totals,
+        ((status, source, n) for (status, source), n in unsafe.groupby(["final_status", "source"]).size().items()),
+        reports=int(created),
+    )
+
+    print(f"🔴 Course {course_id}: {len(df_chunk)} new URL(s) → Report #{output.report_id} "
+          f"(Safe: {safe} | Suspicious: {suspicious} | Malicious: {malicious})")
+    for url, status, source in unsafe[["url", "final_status", "source"]].itertuples(index=False, name=None):
+        print(f"   ⚠️ {status.upper()}: {url} ({source})")
+    return len(df_chunk)
+
+
+# ----------------------------------------------------
+# Tail loop
+# ----------------------------------------------------
+def poll_once(stop_at=None):
+    """
+    Handle the next window of the Moodle log after the cursor (up to log id `stop_at`, if given).
+    The cursor moves only after the window is saved, so a crash replays it (duplicates are skipped),
+    and only past settled events (see COMMIT_LAG), so ids committed out of order are not lost.
+    Returns (log ids the cursor advanced, events, URLs scanned, last log id read). The events after
+    the cursor are read again next time, so only the advance says how far the log was caught up.
+    """
+    cursor = get_cursor()
+    upto = min(latest_log_id(), cursor.position + LOG_ID_WINDOW)
+    if stop_at is not None:
+        upto = min(upto, stop_at)
+    if upto <= cursor.position:
+        return 0, 0, 0, cursor.position
+
+    events = read_events(cursor.position, upto)
+    scanned = 0
+    by_course = collect_event_urls(events) if events else {}
+    if by_course:
+        clf = load_ai_model()
+        allowlist = load_allowlist()
+        for course_id, rows in by_course.items():
+            scanned += scan_live_rows(course_id, rows, clf, allowlist)
+
+    settled = settled_log_id(cursor.position, upto)
+    if settled > cursor.position:
+        Watermark.objects.filter(pk=cursor.pk).update(position=settled, updated_at=timezone.now())
+    return settled - cursor.position, len(events), scanned, upto
+
+
+def run_live_scan(poll_interval=60, stop_event=None):
+    """Poll the log every poll_interval seconds (back to back while catching up) until stop_event is set."""
+    while not (stop_event and stop_event.is_set()):
+        advanced, _, _, _ = poll_once()
+        if advanced < LOG_ID_WINDOW:
+            time.sleep(poll_interval)
@@ -0,0 +1,185 @@
+import threading
+import time
+from django.conf import settings
+
+# Kept free of pandas/sklearn imports: signals.py installs the governor in every process, web workers included.
+
+REPLICA_ALIAS = "moodle_replica"
+# Local copy of the tables the scanner reads, kept by URL_mirror_sync (schema moodle_mirror in the default DB)
+MIRROR_ALIAS = "moodle_mirror"
+
+# Weight of the newest query in the latency average
+EWMA_ALPHA = 0.2
+# Backoff state changes are printed at most this often (seconds)
+LOG_INTERVAL = 30
+
+
+def moodle_instances():
+    """Configured Moodle sites, primary first: [{'name', 'alias', 'filedir', 'wwwroot'}, ...]."""
+    return getattr(settings, "MOODLE_INSTANCES", None) or [{"name": "moodle", "alias": "moodle", "filedir": ""}]
+
+
+def primary_instance():
+    return moodle_instances()[0]["name"]
+
+
+def get_instance(name=None):
+    """Settings entry of a Moodle site by name (the primary for None); ValueError if unknown."""
+    name = name or primary_instance()
+    for instance in moodle_instances():
+        if instance["name"] == name:
+            return instance
+    raise ValueError(f"Unknown Moodle instance '{name}'")
+
+
+def mirror_enabled():
+    return getattr(settings, "MOODLE_READ_FROM_MIRROR", False) and MIRROR_ALIAS in settings.DATABASES
+
+
+def moodle_alias(fresh=False, instance=None):
+    """
+    Database alias for Moodle reads. Other instances are read from their own alias.
+    For the primary: the local mirror when MOODLE_READ_FROM_MIRROR is on,
+    otherwise (or with fresh=True, for the log tail and the mirror sync itself)
+    the read replica when one is configured, else the primary.
+    """
+    if instance and instance != primary_instance():
+        return get_instance(instance)["alias"]
+    if not fresh and mirror_enabled():
+        return MIRROR_ALIAS
+    return REPLICA_ALIAS if REPLICA_ALIAS in settings.DATABASES else get_instance()["alias"]
+
+
+def moodle_aliases():
+    """Aliases that reach a production Moodle server (and so are governed)."""
+    return {REPLICA_ALIAS} | {i["alias"] for i in moodle_instances()}
+
+
+class MoodleGovernor:
+    """
+    Execute wrapper on every Moodle connection (see signals.py):
+      - at most MOODLE_MAX_CONCURRENT_QUERIES queries in flight per process
+      - an EWMA of query latency; while it is above MOODLE_TARGET_LATENCY_MS, each query waits
+        for the excess first (capped at MOODLE_MAX_BACKOFF_MS), so we ease off as Moodle slows down
+      - MOODLE_MIN_QUERY_INTERVAL_MS between query starts, for a fixed pace on top
+    """
+    def __init__(self, max_concurrent, target_ms, max_backoff_ms, min_interval_ms):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.target = target_ms / 1000
+        self.max_backoff = max_backoff_ms / 1000
+        self.min_interval = min_interval_ms / 1000
+        self.ewma = 0.0
+        self.queries = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._backing_off = False
+        self._last_log = 0.0
+
+    def backoff(self):
+        """Seconds the next query should wait given current latency."""
+        return min(max(self.ewma - self.target, 0.0), self.max_backoff)
+
+    def pace(self):
+        """Wait out backoff and pacing; also called between fetches of a streamed result."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now + self.backoff(), self._next_start)
+            self._next_start = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            self.waited += delay
+            time.sleep(delay)
+
+    def record(self, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.ewma = elapsed if self.queries == 1 else EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.ewma
+            backing_off = self.ewma > self.target
+            changed = backing_off != self._backing_off
+            self._backing_off = backing_off
+            now = time.monotonic()
+            if changed and now - self._last_log >= LOG_INTERVAL:
+                self._last_log = now
+                if backing_off:
+                    print(f"🐢 Moodle latency {self.ewma * 1000:.0f}ms over {self.target * 1000:.0f}ms target — backing off")
+                else:
+                    print(f"🐇 Moodle latency back to {self.ewma * 1000:.0f}ms — full speed")
+
+    def __call__(self, execute, sql, params, many, context):
+        self.pace()
+        with self.slots:
+            started = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.record(time.monotonic() - started)
+
+    def stats(self):
+        return {"queries": self.queries, "latency_ms": round(self.ewma * 1000), "waited_s": round(self.waited, 1)}
+
+
+def new_governor():
+    return MoodleGovernor(
+        max_concurrent=getattr(settings, "MOODLE_MAX_CONCURRENT_QUERIES", 4),
+        target_ms=getattr(settings, "MOODLE_TARGET_LATENCY_MS", 250),
+        max_backoff_ms=getattr(settings, "MOODLE_MAX_BACKOFF_MS", 2000),
+        min_interval_ms=getattr(settings, "MOODLE_MIN_QUERY_INTERVAL_MS", 0),
+    )
+
+
+# The primary site's governor; every other site gets its own, so a slow site only slows its own scans
+governor = new_governor()
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def governor_for(alias):
+    """
+    Governor of the Moodle site behind a DB alias (the replica counts as the primary),
+    or None for local aliases such as the mirror, which need no pacing.
+    """
+    if alias not in moodle_aliases():
+        return None
+    if alias in ("moodle", REPLICA_ALIAS) or alias == get_instance()["alias"]:
+        return governor
+    with _governors_lock:
+        if alias not in _governors:
+            _governors[alias] = new_governor()
+        return _governors[alias]
+
+
+def install_governor(connection):
+    """Attach the governor to a Moodle connection once (connection_created fires on every reconnect)."""
+    site_governor = governor_for(connection.alias)
+    if site_governor not in connection.execute_wrappers:
+        connection.execute_wrappers.append(site_governor)
+
+
+def governed_rows(cursor, size=None):
+    """
+    fetchmany() a cursor in MOODLE_FETCH_SIZE batches, pacing between batches.
+    Use a connection's chunked_cursor() (server-side) so the batches are really fetched one at a time.
+    """
+    size = size or getattr(settings, "MOODLE_FETCH_SIZE", 1000)
+    site_governor = governor_for(cursor.db.alias)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+        if site_governor:
+            site_governor.pace()
+
+
+def governed_iter(queryset, size=None):
+    """
+    Stream a Moodle queryset with a server-side cursor in MOODLE_FETCH_SIZE chunks.
+    Chunk fetches bypass execute wrappers, so pacing is applied here between chunks.
+    """
+    size = size or getattr(settings, "MOODLE_FETCH_SIZE", 1000)
+    site_governor = governor_for(queryset.db)
+    for i, obj in enumerate(queryset.iterator(chunk_size=size), start=1):
+        yield obj
+        if site_governor and i % size == 0:
+            site_governor.pace()
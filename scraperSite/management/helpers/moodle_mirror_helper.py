@@ -0,0 +1,260 @@
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+from scraperSite.models import Watermark
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, mirror_enabled, governed_rows
+from scraperSite.management.helpers.content_sources_helper import forget_source_tables
+
+# Schema in the default DB holding the mirror (the moodle_mirror alias has it on its search_path)
+MIRROR_SCHEMA = "moodle_mirror"
+
+# Two-int advisory lock key held while syncing (302 = course scans, 303 = scheduler, 304 = live scan)
+MIRROR_LOCK_NAMESPACE = 305
+MIRROR_LOCK_ID = 1
+
+# Time-watermarked tables are re-read from this many seconds before the watermark, so rows written
+# by a transaction that committed after a later one are not skipped
+WATERMARK_OVERLAP = 300
+# Id-watermarked tables are re-read from this many ids below the watermark, for the same reason:
+# ids are handed out at insert, so a slow transaction can commit a lower id after a higher one
+ID_OVERLAP = 1000
+UPSERT_BATCH = 1000
+
+# Watermark row recording when the last complete sync started (epoch seconds)
+SYNCED_MARK = "mirror:synced"
+
+# watermark: a time column (rows modified since the last sync are re-copied), "id" for tables whose
+# rows are not edited in ways we read (only new ids are copied), or None for tables copied whole
+# (small ones, and ones edited in place without a time column to find the edits by).
+# indexes: local indexes for the collector's lookups. columns: None mirrors every source column.
+MirrorTable = namedtuple("MirrorTable", "name watermark indexes columns")
+
+MIRROR_TABLES = (
+    MirrorTable("mdl_course", "timemodified", (), None),
+    MirrorTable("mdl_course_sections", "timemodified", ("course",), None),
+    # visible / deletioninprogress change in place and only `added` is stamped, so copy it whole
+    MirrorTable("mdl_course_modules", None, ("course", "module, instance"), None),
+    MirrorTable("mdl_modules", None, (), None),
+    MirrorTable("mdl_context", "id", ("contextlevel, instanceid",), None),
+    # Only what reports show: no password hashes or profile data in the scraper DB
+    MirrorTable("mdl_user", "timemodified", (),
+                ("id", "username", "firstname", "lastname", "email", "deleted", "suspended", "timemodified")),
+    MirrorTable("mdl_role", None, (), None),
+    MirrorTable("mdl_role_assignments", "timemodified", ("contextid", "userid"), None),
+    MirrorTable("mdl_forum", "timemodified", ("course",), None),
+    MirrorTable("mdl_forum_discussions", "timemodified", ("course", "forum"), None),
+    MirrorTable("mdl_forum_posts", "modified", ("discussion",), None),
+    MirrorTable("mdl_chat", "timemodified", ("course",), None),
+    MirrorTable("mdl_chat_messages", "id", ("chatid",), None),
+    MirrorTable("mdl_url", "timemodified", ("course",), None),
+    MirrorTable("mdl_files", "timemodified", ("contextid",), None),
+    # Activity types read by the content sources in content_sources_helper
+    MirrorTable("mdl_page", "timemodified", ("course",), None),
+    MirrorTable("mdl_label", "timemodified", ("course",), None),
+    MirrorTable("mdl_book", "timemodified", ("course",), None),
+    MirrorTable("mdl_book_chapters", "timemodified", ("bookid",), None),
+    MirrorTable("mdl_assign", "timemodified", ("course",), None),
+    MirrorTable("mdl_quiz", "timemodified", ("course",), None),
+    MirrorTable("mdl_lesson", "timemodified", ("course",), None),
+    MirrorTable("mdl_lesson_pages", "timemodified", ("lessonid",), None),
+)
+
+SOURCE_COLUMNS_SQL = """
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+    FROM pg_attribute a
+    JOIN pg_class c ON c.oid = a.attrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relname = %s AND n.nspname = current_schema() AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum
+"""
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+def mirror_table_name(table):
+    return f"{MIRROR_SCHEMA}.{quote(table)}"
+
+
+def source_columns(spec):
+    """[(column, type)] of the table on the Moodle side, limited to spec.columns; [] if it does not exist."""
+    with connections[moodle_alias(fresh=True)].cursor() as cur:
+        cur.execute(SOURCE_COLUMNS_SQL, [spec.name])
+        columns = cur.fetchall()
+    if spec.columns:
+        columns = [c for c in columns if c[0] in spec.columns]
+    return columns
+
+
+def ensure_mirror_table(spec, columns):
+    """Create the mirror table (and its indexes) on first sync; add columns Moodle gained since."""
+    table = mirror_table_name(spec.name)
+    with connection.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {MIRROR_SCHEMA}")
+        column_sql = ", ".join(f"{quote(name)} {type_}" for name, type_ in columns)
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {table} ({column_sql}, PRIMARY KEY (id))")
+        for name, type_ in columns:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {quote(name)} {type_}")
+        for index in spec.indexes:
+            index_name = f"{spec.name}_{index.replace(', ', '_')}_idx"
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {table} ({index})")
+
+
+def upsert_rows(spec, names, rows):
+    assignments = ", ".join(f"{quote(n)} = EXCLUDED.{quote(n)}" for n in names if n != "id")
+    sql = (
+        f"INSERT INTO {mirror_table_name(spec.name)} ({', '.join(quote(n) for n in names)}) VALUES %s "
+        f"ON CONFLICT (id) DO " + (f"UPDATE SET {assignments}" if assignments else "NOTHING")
+    )
+    with connection.cursor() as cur:
+        execute_values(cur.cursor, sql, rows, page_size=len(rows))
+
+
+def prune_deleted(spec):
+    """Delete mirror rows whose id no longer exists in Moodle. Returns how many went."""
+    source = connections[moodle_alias(fresh=True)]
+    with connection.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE mirror_source_ids (id bigint PRIMARY KEY) ON COMMIT DROP")
+        with source.chunked_cursor() as src:
+            src.execute(f"SELECT id FROM {quote(spec.name)}")
+            batch = []
+            for row in governed_rows(src):
+                batch.append(row)
+                if len(batch) >= UPSERT_BATCH:
+                    execute_values(cur.cursor, "INSERT INTO mirror_source_ids (id) VALUES %s", batch, page_size=len(batch))
+                    batch = []
+            if batch:
+                execute_values(cur.cursor, "INSERT INTO mirror_source_ids (id) VALUES %s", batch, page_size=len(batch))
+        cur.execute(
+            f"DELETE FROM {mirror_table_name(spec.name)} m "
+            f"WHERE NOT EXISTS (SELECT 1 FROM mirror_source_ids s WHERE s.id = m.id)"
+        )
+        return cur.rowcount
+
+
+def sync_table(spec, full=False, reconcile=False):
+    """
+    Bring one mirror table up to date. Returns (rows copied, rows deleted),
+    or None if the table does not exist on this Moodle.
+    """
+    columns = source_columns(spec)
+    if not columns:
+        return None
+    ensure_mirror_table(spec, columns)
+    names = [name for name, _ in columns]
+    if spec.watermark not in names:
+        # e.g. an older Moodle without the column: copy whole, like the small tables
+        spec = spec._replace(watermark=None)
+
+    mark, _ = Watermark.objects.get_or_create(name=f"mirror:{spec.name}")
+    since = 0 if full else mark.position
+    where, params = "", []
+    if spec.watermark == "id" and since:
+        where, params = "WHERE id > %s", [max(since - ID_OVERLAP, 0)]
+    elif spec.watermark and since:
+        where, params = f"WHERE {quote(spec.watermark)} >= %s", [max(since - WATERMARK_OVERLAP, 0)]
+    position = names.index(spec.watermark) if spec.watermark else None
+
+    copied = deleted = 0
+    highest = since
+    # Data and watermark move together: a sync that dies half way is simply redone
+    with transaction.atomic():
+        if full:
+            with connection.cursor() as cur:
+                cur.execute(f"TRUNCATE {mirror_table_name(spec.name)}")
+
+        source = connections[moodle_alias(fresh=True)]
+        with source.chunked_cursor() as src:
+            src.execute(f"SELECT {', '.join(quote(n) for n in names)} FROM {quote(spec.name)} {where}", params)
+            batch = []
+            for row in governed_rows(src):
+                batch.append(row)
+                if position is not None and row[position] is not None:
+                    highest = max(highest, row[position])
+                if len(batch) >= UPSERT_BATCH:
+                    upsert_rows(spec, names, batch)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                upsert_rows(spec, names, batch)
+                copied += len(batch)
+
+        if (reconcile or spec.watermark is None) and not full:
+            deleted = prune_deleted(spec)
+        Watermark.objects.filter(pk=mark.pk).update(position=highest, updated_at=timezone.now())
+    return copied, deleted
+
+
+def acquire_mirror_lock(wait=False):
+    with connection.cursor() as cur:
+        if wait:
+            cur.execute("SELECT pg_advisory_lock(%s, %s)", [MIRROR_LOCK_NAMESPACE, MIRROR_LOCK_ID])
+            return True
+        cur.execute("SELECT pg_try_advisory_lock(%s, %s)", [MIRROR_LOCK_NAMESPACE, MIRROR_LOCK_ID])
+        return cur.fetchone()[0]
+
+
+def release_mirror_lock():
+    with connection.cursor() as cur:
+        cur.execute("SELECT pg_advisory_unlock(%s, %s)", [MIRROR_LOCK_NAMESPACE, MIRROR_LOCK_ID])
+
+
+def sync_mirror(tables=None, full=False, reconcile=False, wait=False, max_lag=None, report=print):
+    """
+    Incrementally copy the Moodle tables the scanner reads into the mirror schema.
+    full=True recopies from scratch; reconcile=True also drops rows deleted in Moodle
+    (small tables are always reconciled). With max_lag, nothing is done if a sync
+    finished within that many seconds. Returns {table: (copied, deleted)},
+    or None if another sync holds the lock and wait is False.
+    """
+    specs = [s for s in MIRROR_TABLES if not tables or s.name in tables]
+    if not acquire_mirror_lock(wait=wait):
+        return None
+    try:
+        lag = mirror_lag()
+        if max_lag is not None and lag is not None and lag <= max_lag:
+            return {}
+        started = int(time.time())
+        results = {}
+        for spec in specs:
+            t0 = time.monotonic()
+            result = sync_table(spec, full=full, reconcile=reconcile)
+            if result is None:
+                report(f"⚠️ {spec.name} not found in Moodle — skipped")
+                continue
+            results[spec.name] = result
+            if result[0] or result[1]:
+                report(f"🪞 {spec.name}: {result[0]} row(s) copied, {result[1]} deleted ({time.monotonic() - t0:.1f}s)")
+        # The sync may have created mirror tables, and with them new sources to read
+        forget_source_tables()
+        if not tables:
+            Watermark.objects.update_or_create(name=SYNCED_MARK, defaults={"position": started})
+        return results
+    finally:
+        release_mirror_lock()
+
+
+def mirror_lag():
+    """Seconds since the last complete sync started, or None if the mirror was never synced."""
+    synced = Watermark.objects.filter(name=SYNCED_MARK).values_list("position", flat=True).first()
+    return None if not synced else int(time.time()) - synced
+
+
+def ensure_mirror_fresh(report=print):
+    """
+    Before a scan reads the mirror: sync if it is older than MOODLE_MIRROR_MAX_LAG_SECONDS.
+    If another process is already syncing, wait for it rather than read half-updated tables.
+    """
+    if not mirror_enabled():
+        return
+    max_lag = getattr(settings, "MOODLE_MIRROR_MAX_LAG_SECONDS", 300)
+    lag = mirror_lag()
+    if lag is not None and lag <= max_lag:
+        return
+    # Checked again under the lock: the sync we waited for may have just brought it up to date
+    sync_mirror(wait=True, max_lag=max_lag, report=report)
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F
+
+from scraperSite.models import ScanReport, WeeklySummary, CourseWeekSummary, WeeklyUnsafeCount
+
+TOTAL_FIELDS = ("total_link", "safe_link", "suspicious", "malicious", "allowlisted", "vt_calls")
+
+
+def week_start(day):
+    """Monday of the week containing `day`."""
+    return day - timedelta(days=day.weekday())
+
+
+def source_type(source):
+    """File sources are "component:filearea"; group them by component."""
+    return (source or "Unknown").split(":", 1)[0]
+
+
+def add_to_row(model, lookup, defaults=None, **increments):
+    """Upsert-and-increment: F() keeps concurrent finalisations from losing updates."""
+    row, _ = model.objects.get_or_create(**lookup, defaults=defaults or {})
+    model.objects.filter(pk=row.pk).update(**{name: F(name) + value for name, value in increments.items()})
+
+
+def record_report_summary(report):
+    """Add a finalised report to its week and course-week totals and the weekly unsafe breakdown."""
+    totals = {name: getattr(report, name) for name in TOTAL_FIELDS}
+    statuses = report.unsafe_urls.values("status", "source").annotate(n=Count("url_id"))
+    add_to_summaries(report, totals, ((row["status"], row["source"], row["n"]) for row in statuses))
+
+
+def add_to_summaries(report, totals, unsafe_rows, reports=1):
+    """
+    Add `totals` and (status, source, count) unsafe rows to the report's week.
+    Rolling reports call this once per batch, counting the report itself (reports=1) only on the first.
+    """
+    week = week_start(report.date)
+    unsafe_counts = {}
+    for status, source, n in unsafe_rows:
+        key = (status, source_type(source))
+        unsafe_counts[key] = unsafe_counts.get(key, 0) + n
+
+    with transaction.atomic():
+        add_to_row(WeeklySummary, {"week_start": week}, reports=reports, **totals)
+        add_to_row(
+            CourseWeekSummary,
+            {"week_start": week, "instance": report.instance, "moodle_courseID": report.moodle_courseID},
+            defaults={"moodle_courseName": report.moodle_courseName},
+            reports=reports, **totals,
+        )
+        for (status, src_type), n in unsafe_counts.items():
+            add_to_row(WeeklyUnsafeCount, {"week_start": week, "status": status, "source_type": src_type}, count=n)
+
+
+def rebuild_summaries():
+    """Recompute every aggregate from the stored reports (first deploy, or after deleting reports)."""
+    with transaction.atomic():
+        WeeklySummary.objects.all().delete()
+        CourseWeekSummary.objects.all().delete()
+        WeeklyUnsafeCount.objects.all().delete()
+        count = 0
+        for report in ScanReport.objects.filter(finalised=True).order_by("report_id").iterator():
+            record_report_summary(report)
+            count += 1
+    return count
+
+
+def weekly_trend(weeks=12):
+    """The most recent `weeks` weekly totals, oldest first."""
+    return list(reversed(WeeklySummary.objects.order_by("-week_start")[:weeks]))
@@ -0,0 +1,407 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction, close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from scraperSite.models import ScanJob, ScanReport, ScanWorker, MoodleCourse
+from scraperSite.management.helpers.scanner_client import daemon_is_running
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, primary_instance
+
+# The collector/scanner helpers (pandas, sklearn) are imported inside run_scan_job so the
+# web workers can enqueue and poll jobs without loading them.
+
+# Share of the progress bar given to URL collection; scanning fills the rest
+COLLECT_PROGRESS = 10
+
+# First key of the two-int Postgres advisory lock taken per course (second key = hash of "site:course id")
+COURSE_LOCK_NAMESPACE = 302
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# Leases are renewed this often; settings.SCAN_LEASE_SECONDS must be several times longer
+HEARTBEAT_SECONDS = 60
+
+
+class LeaseLost(Exception):
+    """Another worker re-claimed the job after this worker's lease expired."""
+
+
+def worker_name(suffix=""):
+    """host:pid (plus a thread suffix) — unique per worker across nodes."""
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{name}/{suffix}" if suffix else name
+
+
+def lease_expiry(now=None):
+    return (now or timezone.now()) + timedelta(seconds=settings.SCAN_LEASE_SECONDS)
+
+
+def expired_lease_q(now):
+    """Running, but its worker stopped renewing the lease (or it was started before leases existed)."""
+    return Q(status="running") & (Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True))
+
+
+def claimable_q(now):
+    return Q(status="queued") | expired_lease_q(now)
+
+
+def lease_expired(job, now=None):
+    return job.status == "running" and (job.lease_expires_at is None or job.lease_expires_at < (now or timezone.now()))
+
+
+# ----------------------------------------------------
+# Queue operations (default Postgres DB)
+# ----------------------------------------------------
+def enqueue_scan_job(course_id, scan_type="auto", priority=None, requested_by="", reuse_unchanged=False,
+                     instance=None):
+    """
+    Single-flight enqueue: returns (job, created).
+    If the course already has a queued or running job, that job is returned instead of
+    creating a duplicate (and bumped to the more urgent priority if needed).
+    A per-course advisory lock makes the check-then-insert safe across processes.
+    `instance` is the Moodle site of the course (primary by default).
+    """
+    if priority is None:
+        priority = ScanJob.PRIORITY_MANUAL if scan_type == "manual" else ScanJob.PRIORITY_BATCH
+    instance = instance or primary_instance()
+
+    with transaction.atomic():
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+                        [COURSE_LOCK_NAMESPACE, f"{instance}:{int(course_id)}"])
+
+        job = (
+            ScanJob.objects.filter(instance=instance, moodle_courseID=int(course_id), status__in=ACTIVE_STATUSES)
+            .order_by("created_at")
+            .first()
+        )
+        if job is not None:
+            if priority < job.priority:
+                update_job(job, priority=priority)
+            return job, False
+
+        job = ScanJob.objects.create(
+            moodle_courseID=int(course_id),
+            instance=instance,
+            scan_type=scan_type,
+            priority=priority,
+            requested_by=requested_by or "",
+            reuse_unchanged=reuse_unchanged,
+        )
+        return job, True
+
+
+def claim_next_job(owner=None):
+    """
+    Take the most urgent claimable job (lowest priority number, then oldest) and lease it to `owner`.
+    Claimable = queued, or running under a lease that has expired (its worker crashed or lost the DB).
+    SKIP LOCKED lets any number of workers on any number of nodes poll the same queue without blocking.
+    """
+    owner = owner or worker_name()
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            job = (
+                ScanJob.objects.select_for_update(skip_locked=True)
+                .filter(claimable_q(now))
+                .order_by("priority", "created_at")
+                .first()
+            )
+            if job is None:
+                return None
+
+            if job.status == "running":
+                if job.attempts >= settings.SCAN_JOB_MAX_ATTEMPTS:
+                    job.status, job.stage, job.finished_at = "failed", "finished", now
+                    job.message = "Scan failed"
+                    job.error = f"Lease expired {job.attempts} time(s), last held by {job.lease_owner}"
+                    job.save(update_fields=["status", "stage", "finished_at", "message", "error"])
+                    print(f"💀 Scan job #{job.job_id} gave up after {job.attempts} expired lease(s)")
+                    continue
+                print(f"♻️ Re-claiming scan job #{job.job_id} from {job.lease_owner} (lease expired)")
+
+            job.status = "running"
+            job.started_at = now
+            job.lease_owner = owner
+            job.lease_expires_at = lease_expiry(now)
+            job.attempts += 1
+            job.save(update_fields=["status", "started_at", "lease_owner", "lease_expires_at", "attempts"])
+            return job
+
+
+def start_job(job, owner=None):
+    """
+    Lease a specific job to this process: queued, or running under an expired lease
+    (e.g. left behind by a run that died). False if another worker holds it, or if the job
+    had already used up SCAN_JOB_MAX_ATTEMPTS (it is failed instead).
+    """
+    now = timezone.now()
+    ScanJob.objects.filter(
+        expired_lease_q(now), pk=job.pk, attempts__gte=settings.SCAN_JOB_MAX_ATTEMPTS,
+    ).update(
+        status="failed", stage="finished", finished_at=now, message="Scan failed",
+        error=f"Lease expired {settings.SCAN_JOB_MAX_ATTEMPTS} time(s)",
+    )
+    started = ScanJob.objects.filter(claimable_q(now), pk=job.pk).update(
+        status="running", started_at=now, lease_owner=owner or worker_name(),
+        lease_expires_at=lease_expiry(now), attempts=F("attempts") + 1,
+    )
+    if started:
+        job.refresh_from_db()
+    return bool(started)
+
+
+class JobLease:
+    """
+    Heartbeat for a leased job: a background thread extends the lease every HEARTBEAT_SECONDS,
+    and checks `worker` (a queue worker's ScanWorker name) in, so a long scan does not make it look offline.
+    If the lease was taken over, `lost` is set and check() raises LeaseLost so the scan stops.
+    """
+    def __init__(self, job, worker=None):
+        self.job = job
+        self.worker = worker
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"lease-{job.job_id}", daemon=True)
+
+    def renew(self):
+        return bool(held_lease(self.job).update(lease_expires_at=lease_expiry()))
+
+    def heartbeat(self):
+        """Renew the lease and check the worker in. False once the lease is lost."""
+        if self.worker:
+            check_in(self.worker)
+        return self.renew()
+
+    def _beat(self):
+        try:
+            while not self._stop.wait(HEARTBEAT_SECONDS):
+                if not self.heartbeat():
+                    print(f"⚠️ Lost the lease on scan job #{self.job.job_id}")
+                    self.lost.set()
+                    return
+        finally:
+            connection.close()
+
+    def check(self):
+        if self.lost.is_set():
+            raise LeaseLost(f"job #{self.job.job_id} was re-claimed by another worker")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_leased_job(job, worker=None):
+    """Run a job this process has leased, keeping the lease (and the worker's check-in) alive while it runs."""
+    with JobLease(job, worker=worker) as lease:
+        return run_scan_job(job, lease=lease)
+
+
+def held_lease(job):
+    """The job's row, as long as it is still running under the lease this copy of the job took."""
+    return ScanJob.objects.filter(pk=job.pk, status="running", lease_owner=job.lease_owner, attempts=job.attempts)
+
+
+def update_job(job, **fields):
+    """
+    Persist progress fields without touching the rest of the row.
+    A leased job is only written while this process still holds the lease: once it expired and
+    another worker took the job (or it was failed), nothing is written. Returns whether it was.
+    """
+    jobs = held_lease(job) if job.status == "running" and job.lease_owner else ScanJob.objects.filter(pk=job.pk)
+    updated = bool(jobs.update(**fields))
+    if updated:
+        for name, value in fields.items():
+            setattr(job, name, value)
+    return updated
+
+
+def count_input_rows(url_file):
+    """Rows in a scanner_input file (minus header), used only to scale the progress bar."""
+    with open(url_file, "rb") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def find_unchanged_report(course_id, fingerprint, version, instance=None):
+    """Latest report for the course taken with the same content fingerprint and scanner version."""
+    return (
+        ScanReport.objects.filter(
+            instance=instance or primary_instance(), moodle_courseID=int(course_id),
+            content_fingerprint=fingerprint, model_version=version, finalised=True,
+        )
+        .order_by("-report_id")
+        .first()
+    )
+
+
+# ----------------------------------------------------
+# Job execution
+# ----------------------------------------------------
+def run_scan_job(job, lease=None):
+    """
+    Collect and scan the job's course, recording stage/progress on the job as it goes.
+    Every write is made under the job's lease: the scan stops at the first one that finds
+    another worker took the job over (or that it was failed meanwhile).
+    """
+    from scraperSite.management.helpers.URL_collector_helper import export_course_urls, course_content_fingerprint
+    from scraperSite.management.helpers.URL_scanner_helper import scan_from_file, scanner_version
+    from scraperSite.management.helpers.moodle_mirror_helper import ensure_mirror_fresh
+
+    def record(**fields):
+        if not update_job(job, **fields):
+            raise LeaseLost(f"job #{job.job_id} is no longer leased to {job.lease_owner}")
+
+    try:
+        if job.instance == primary_instance():
+            # No-op unless scans read the local mirror; then top it up if it has fallen behind
+            ensure_mirror_fresh()
+        db = moodle_alias(instance=job.instance)
+        course = MoodleCourse.objects.using(db).get(id=job.moodle_courseID)
+
+        # Taken before collecting, so edits made during the scan show up as a change next time
+        fingerprint = course_content_fingerprint(course.id, using=db)
+        version = scanner_version()
+        if job.reuse_unchanged:
+            prior = find_unchanged_report(course.id, fingerprint, version, instance=job.instance)
+            if prior:
+                record(
+                    status="done", stage="finished", progress=100, report=prior,
+                    message=f"Course unchanged since Report #{prior.report_id}", finished_at=timezone.now(),
+                )
+                return job
+
+        record(stage="collecting", progress=0, message=f"Collecting URLs from {course.fullname}")
+        url_file = export_course_urls(course, scan_type=job.scan_type, instance=job.instance)
+
+        total_rows = count_input_rows(url_file)
+        record(stage="scanning", progress=COLLECT_PROGRESS, message=f"Scanning {total_rows} URL(s)")
+
+        def on_progress(rows_done):
+            if lease:
+                lease.check()
+            pct = COLLECT_PROGRESS + int((100 - COLLECT_PROGRESS) * rows_done / max(total_rows, 1))
+            record(progress=min(pct, 99), message=f"Scanned {rows_done} of {total_rows} URL(s)")
+
+        report = scan_from_file(url_file, progress=on_progress, instance=job.instance,
+                                report_fields={"content_fingerprint": fingerprint, "model_version": version})
+
+        if lease:
+            lease.check()
+        record(
+            status="done", stage="finished", progress=100, report=report,
+            message="Scan complete" if report else "No URLs found", finished_at=timezone.now(),
+        )
+    except LeaseLost as e:
+        # The new owner reports the outcome; this copy just stops
+        print(f"🛑 Abandoning scan: {e}")
+    except Exception as e:
+        traceback.print_exc()
+        failed = update_job(
+            job, status="failed", stage="finished", error=f"{type(e).__name__}: {e}",
+            message="Scan failed", finished_at=timezone.now(),
+        )
+        if not failed:
+            print(f"🛑 Scan job #{job.job_id} was taken over — leaving its status to the new owner")
+    return job
+
+
+def wait_for_job(job, poll_interval=2, run_here=False, timeout=None):
+    """
+    Block until the job is done or failed; returns the refreshed job.
+    With run_here=True (the scanner daemon, or a command told there is nothing else to run it),
+    the job is run in this process whenever it is claimable: still queued, or its worker died and
+    the lease expired. Otherwise it is left to the queue workers.
+    After `timeout` seconds (SCAN_JOB_WAIT_SECONDS by default) a job still in flight is failed.
+    """
+    timeout = settings.SCAN_JOB_WAIT_SECONDS if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    while True:
+        job.refresh_from_db()
+        if job.status not in ACTIVE_STATUSES:
+            return job
+        if run_here and (job.status == "queued" or lease_expired(job)):
+            if start_job(job):
+                run_leased_job(job)
+                continue
+        if time.monotonic() >= deadline:
+            fail_job(job, f"No result after waiting {timeout}s (last held by {job.lease_owner or 'no worker'})")
+            continue
+        time.sleep(poll_interval)
+
+
+def fail_job(job, error):
+    """Fail a job that is still queued or running (a worker that still holds it loses its lease)."""
+    ScanJob.objects.filter(pk=job.pk, status__in=ACTIVE_STATUSES).update(
+        status="failed", stage="finished", message="Scan failed", error=error, finished_at=timezone.now(),
+    )
+    print(f"⏱️ Scan job #{job.job_id} failed: {error}")
+
+
+def workers_online():
+    """True if any queue worker (on any node) has checked in within two heartbeats."""
+    cutoff = timezone.now() - timedelta(seconds=2 * HEARTBEAT_SECONDS)
+    return ScanWorker.objects.filter(last_seen__gte=cutoff).exists()
+
+
+def scan_service_available():
+    """Something other than the caller will pick up queued jobs."""
+    return daemon_is_running() or workers_online()
+
+
+def run_course_scan(course_id, scan_type="auto", priority=None, requested_by="", run_here=False,
+                    reuse_unchanged=False, instance=None):
+    """
+    Scan a course at most once at a time.
+    Duplicate requests attach to the in-flight job and get its report instead of starting another.
+    run_here=True runs the job in this process (see wait_for_job); otherwise a queue worker picks it up.
+    reuse_unchanged=True returns the previous report when the course has not changed since.
+    Returns the finished ScanJob.
+    """
+    job, created = enqueue_scan_job(
+        course_id, scan_type, priority=priority, requested_by=requested_by, reuse_unchanged=reuse_unchanged,
+        instance=instance,
+    )
+    if not created:
+        print(f"🔗 Course {course_id} already has scan job #{job.job_id} in flight — attaching to it.")
+
+    return wait_for_job(job, run_here=run_here)
+
+
+def check_in(owner):
+    ScanWorker.objects.update_or_create(name=owner, defaults={"last_seen": timezone.now()})
+
+
+def work_queue(poll_interval=5, stop_event=None, owner=None):
+    """
+    Claim and run queued jobs until stop_event is set (or forever).
+    Safe to run on any number of nodes at once; each loop checks in to ScanWorker.
+    """
+    owner = owner or worker_name(threading.current_thread().name)
+    last_check_in = 0
+    while not (stop_event and stop_event.is_set()):
+        close_old_connections()
+        if time.monotonic() - last_check_in >= HEARTBEAT_SECONDS:
+            check_in(owner)
+            last_check_in = time.monotonic()
+        job = claim_next_job(owner)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        print(f"🧾 {owner} running scan job #{job.job_id} ({job.instance} course {job.moodle_courseID}, {job.scan_type}, "
+              f"attempt {job.attempts})")
+        run_leased_job(job, worker=owner)
+        check_in(owner)
+        last_check_in = time.monotonic()
+        close_old_connections()
+    ScanWorker.objects.filter(name=owner).delete()
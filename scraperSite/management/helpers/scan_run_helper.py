@@ -0,0 +1,160 @@
+import threading
+import time
+import traceback
+from datetime import timedelta
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from scraperSite.models import ScanJob, ScanRun, ScanRunCourse
+from scraperSite.management.helpers.scan_queue_helper import run_course_scan, scan_service_available
+
+# A failing course is retried after 1, 2, 4 ... minutes (capped), then given up on
+RETRY_BASE = timedelta(minutes=1)
+RETRY_MAX = timedelta(hours=1)
+MAX_ATTEMPTS = 4
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE * (2 ** (attempts - 1)), RETRY_MAX)
+
+
+def start_or_resume_run(courses, scan_type="auto", fresh=False):
+    """
+    The unfinished run to resume (its course list is kept as it was), or a new run over
+    `courses` = {Moodle instance name: [course, ...]}.
+    fresh=True abandons an unfinished run and starts over.
+    Returns (run, resumed).
+    """
+    unfinished = ScanRun.objects.filter(status="running", scan_type=scan_type).order_by("-run_id").first()
+    if unfinished and not fresh:
+        ScanRun.objects.filter(pk=unfinished.pk).update(resumes=unfinished.resumes + 1)
+        # Units waiting out a backoff from the dead process may go again straight away
+        unfinished.units.filter(status="retrying").update(next_attempt_at=None)
+        return unfinished, True
+    if unfinished:
+        ScanRun.objects.filter(pk=unfinished.pk).update(status="abandoned", finished_at=timezone.now())
+
+    run = ScanRun.objects.create(scan_type=scan_type)
+    units = []
+    for instance, site_courses in courses.items():
+        for c in site_courses:
+            units.append(ScanRunCourse(
+                run=run, position=len(units), instance=instance, moodle_courseID=c.id, moodle_courseName=c.fullname,
+            ))
+    ScanRunCourse.objects.bulk_create(units)
+    return run, False
+
+
+def record_failure(unit, error):
+    unit.attempts += 1
+    unit.last_error = error
+    if unit.attempts >= MAX_ATTEMPTS:
+        unit.status, unit.next_attempt_at, unit.finished_at = "failed", None, timezone.now()
+    else:
+        unit.status, unit.next_attempt_at = "retrying", timezone.now() + retry_delay(unit.attempts)
+    unit.save(update_fields=["attempts", "last_error", "status", "next_attempt_at", "finished_at"])
+
+
+def run_unit(unit, scan_type):
+    """Scan one course of the run and checkpoint the outcome. Returns the unit."""
+    try:
+        # Run it in this process only if no daemon or queue worker is there to take it
+        job = run_course_scan(unit.moodle_courseID, scan_type=scan_type, priority=ScanJob.PRIORITY_BATCH,
+                              instance=unit.instance, run_here=not scan_service_available())
+    except Exception as e:
+        # e.g. the database failed over mid-enqueue: drop the dead connection and retry later
+        traceback.print_exc()
+        close_old_connections()
+        record_failure(unit, f"{type(e).__name__}: {e}")
+        return unit
+
+    unit.job = job
+    if job.status == "done":
+        unit.status, unit.report, unit.finished_at = "done", job.report, timezone.now()
+        unit.next_attempt_at = None
+        unit.save(update_fields=["job", "status", "report", "finished_at", "next_attempt_at"])
+    else:
+        unit.save(update_fields=["job"])
+        record_failure(unit, job.error or job.message)
+    return unit
+
+
+def run_site_units(run, instance, report=print):
+    """
+    Work through the run's unfinished courses of one Moodle site in order, sleeping out retry
+    backoffs, until every course is done or has used up its attempts. `report` gets one line per course.
+    """
+    while True:
+        now = timezone.now()
+        open_units = run.units.filter(instance=instance, status__in=("pending", "retrying"))
+        unit = (
+            open_units.filter(next_attempt_at__isnull=True).order_by("position").first()
+            or open_units.filter(next_attempt_at__lte=now).order_by("next_attempt_at").first()
+        )
+        if unit is None:
+            waiting = open_units.order_by("next_attempt_at").first()
+            if waiting is None:
+                break
+            pause = max((waiting.next_attempt_at - now).total_seconds(), 1)
+            report(f"⏳ Waiting {int(pause)}s to retry {waiting.moodle_courseName} (attempt {waiting.attempts + 1})")
+            time.sleep(pause)
+            continue
+
+        report(f"🔍 Scanning URLs for: {unit.moodle_courseName} ...")
+        unit = run_unit(unit, run.scan_type)
+        if unit.status == "done":
+            outcome = f"Report #{unit.report_id}" if unit.report_id else "no URLs found"
+            report(f"✅ Scan completed for: {unit.moodle_courseName} → {outcome}")
+        elif unit.status == "retrying":
+            report(f"⚠️ Error scanning {unit.moodle_courseName}: {unit.last_error} — "
+                   f"retry {unit.attempts + 1}/{MAX_ATTEMPTS} at {timezone.localtime(unit.next_attempt_at):%H:%M:%S}")
+        else:
+            report(f"❌ Giving up on {unit.moodle_courseName} after {unit.attempts} attempts: {unit.last_error}")
+
+
+def run_units(run, report=print):
+    """
+    Work through the run's unfinished courses, each Moodle site in its own thread so one slow
+    site does not hold up the others, then mark the run done. Returns run_summary().
+    """
+    instances = list(
+        run.units.filter(status__in=("pending", "retrying")).order_by("instance")
+        .values_list("instance", flat=True).distinct()
+    )
+    if len(instances) <= 1:
+        for instance in instances:
+            run_site_units(run, instance, report)
+    else:
+        crashed = []
+
+        def site_worker(instance):
+            try:
+                run_site_units(run, instance, report=lambda line: report(f"[{instance}] {line}"))
+            except Exception:
+                traceback.print_exc()
+                crashed.append(instance)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=site_worker, args=(instance,), name=f"scan-run-{instance}", daemon=True)
+            for instance in instances
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            while t.is_alive():
+                t.join(1)
+        if crashed:
+            # Left running, so the next URL_collector_all resumes the unfinished sites
+            raise RuntimeError(f"Run #{run.run_id} stopped early for: {', '.join(crashed)}")
+
+    ScanRun.objects.filter(pk=run.pk).update(status="done", finished_at=timezone.now())
+    return run_summary(run)
+
+
+def run_summary(run):
+    counts = {s: 0 for s, _ in ScanRunCourse.STATUS_CHOICES}
+    for status in run.units.values_list("status", flat=True):
+        counts[status] += 1
+    return counts
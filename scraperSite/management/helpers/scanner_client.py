@@ -0,0 +1,109 @@
+import os
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from django.conf import settings
+
+# Kept free of pandas/sklearn imports: this module is loaded by the web workers.
+
+
+class ScannerDaemonUnavailable(Exception):
+    """The scanner daemon is not running or not reachable."""
+
+
+class ScanJobFailed(Exception):
+    """The scanner daemon accepted the job but it raised an error."""
+
+
+def daemon_address():
+    return (settings.SCANNER_DAEMON_HOST, settings.SCANNER_DAEMON_PORT)
+
+
+def daemon_authkey():
+    """The shared secret the daemon listens with; ScannerDaemonUnavailable if none is configured."""
+    if not settings.SCANNER_DAEMON_AUTHKEY:
+        raise ScannerDaemonUnavailable("SCANNER_DAEMON_AUTHKEY is not set")
+    return settings.SCANNER_DAEMON_AUTHKEY.encode()
+
+
+def submit_scan_job(job):
+    """
+    Send one job dict to the scanner daemon and wait for its result dict.
+    Raises ScannerDaemonUnavailable if the daemon cannot be reached, rejects our key or drops the
+    connection before taking the job, and ScanJobFailed if it drops it while the job is running.
+    """
+    authkey = daemon_authkey()
+    try:
+        conn = Client(daemon_address(), authkey=authkey)
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise ScannerDaemonUnavailable(f"{type(e).__name__}: {e}") from e
+
+    with conn:
+        try:
+            conn.send(job)
+        except (OSError, EOFError) as e:
+            raise ScannerDaemonUnavailable(f"{type(e).__name__}: {e}") from e
+        try:
+            result = conn.recv()
+        except (OSError, EOFError) as e:
+            # The job may have been partly done; running it again here is not safe to assume
+            raise ScanJobFailed(f"Scanner daemon connection lost: {type(e).__name__}: {e}") from e
+
+    if not result.get("ok"):
+        raise ScanJobFailed(result.get("error", "unknown error"))
+    return result
+
+
+def daemon_is_running():
+    try:
+        submit_scan_job({"op": "ping"})
+        return True
+    except (ScannerDaemonUnavailable, ScanJobFailed):
+        return False
+
+
+def scan_file(url_file):
+    """
+    Scan an exported scanner_input file, through the daemon when it is running.
+    Returns the ScanReport (or None if nothing was scanned).
+    """
+    from scraperSite.models import ScanReport
+
+    try:
+        result = submit_scan_job({"op": "scan_file", "file": os.path.abspath(url_file)})
+    except ScannerDaemonUnavailable:
+        print("⚠️ Scanner daemon not running — scanning in this process.")
+        from scraperSite.management.helpers.URL_scanner_helper import scan_from_file
+        return scan_from_file(url_file)
+
+    report_id = result.get("report_id")
+    return ScanReport.objects.get(pk=report_id) if report_id else None
+
+
+def scan_course(course_id, scan_type="auto", instance=None):
+    """
+    Collect and scan one course (of the primary Moodle site unless `instance` names another),
+    through the daemon when it is running. Returns the report id (or None if nothing was scanned).
+    """
+    try:
+        result = submit_scan_job({
+            "op": "scan_course", "course_id": int(course_id), "scan_type": scan_type, "instance": instance,
+        })
+    except ScannerDaemonUnavailable:
+        print("⚠️ Scanner daemon not running — scanning in this process.")
+        from scraperSite.management.helpers.scanner_daemon_helper import collect_and_scan_course
+        try:
+            report = collect_and_scan_course(int(course_id), scan_type, instance)
+        except Exception as e:
+            raise ScanJobFailed(f"{type(e).__name__}: {e}") from e
+        return report.report_id if report else None
+
+    return result.get("report_id")
+
+
+def scan_urls(urls, run_vt=False):
+    """Classify a batch of URLs without touching the DB; returns one result dict per URL."""
+    try:
+        return submit_scan_job({"op": "scan_urls", "urls": list(urls), "run_vt": run_vt})["results"]
+    except ScannerDaemonUnavailable:
+        from scraperSite.management.helpers.scanner_daemon_helper import classify_urls
+        return classify_urls(urls, run_vt=run_vt)
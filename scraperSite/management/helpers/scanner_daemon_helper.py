@@ -0,0 +1,123 @@
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+import pandas as pd
+import tldextract
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+from scraperSite.management.helpers.URL_scanner_helper import (
+    scan_from_file, classify_chunk, load_ai_model
+)
+from scraperSite.management.helpers.domain_blocklist_helper import get_blocklist
+from scraperSite.management.helpers.allowlist_helper import load_allowlist
+from scraperSite.management.helpers.scan_queue_helper import work_queue, run_course_scan
+
+
+# Files a scan_file job may name: scanner_input files live under here (scan_from_file deletes them)
+SCAN_INPUT_ROOT = "url_details"
+
+
+# ----------------------------------------------------
+# Job implementations (also used in-process as fallback)
+# ----------------------------------------------------
+def scan_input_path(path):
+    """The real path of a client-supplied scanner_input file; ValueError unless it is under SCAN_INPUT_ROOT."""
+    root = os.path.realpath(SCAN_INPUT_ROOT)
+    real = os.path.realpath(path)
+    if os.path.commonpath([root, real]) != root or real == root:
+        raise ValueError(f"Refusing to scan {path}: scanner input files must be under {SCAN_INPUT_ROOT}/")
+    return real
+
+
+def collect_and_scan_course(course_id, scan_type="auto", instance=None):
+    """
+    Export one course's URLs from Moodle and scan them, or attach to a scan of
+    the same course already in flight. Returns the ScanReport or None.
+    """
+    job = run_course_scan(course_id, scan_type, run_here=True, instance=instance)
+    if job.status == "failed":
+        raise RuntimeError(job.error or f"Scan job #{job.job_id} failed")
+    return job.report
+
+
+def classify_urls(urls, run_vt=False):
+    """Classify a batch of URLs in memory (no report, no files)."""
+    df = pd.DataFrame({"url": list(urls)})
+    if df.empty:
+        return []
+    df = classify_chunk(load_ai_model(), df, run_vt=run_vt, allowlist=load_allowlist())
+    cols = ["url", "pred_label", "confidence", "vt_result", "final_status", "verdict_source"]
+    return df[cols].to_dict(orient="records")
+
+
+def handle_job(job):
+    """Run one job dict and return a result dict (never raises)."""
+    op = job.get("op")
+    close_old_connections()
+    try:
+        if op == "ping":
+            return {"ok": True}
+        if op == "scan_file":
+            report = scan_from_file(scan_input_path(job["file"]))
+            return {"ok": True, "report_id": report.report_id if report else None}
+        if op == "scan_course":
+            report = collect_and_scan_course(job["course_id"], job.get("scan_type", "auto"), job.get("instance"))
+            return {"ok": True, "report_id": report.report_id if report else None}
+        if op == "scan_urls":
+            return {"ok": True, "results": classify_urls(job.get("urls", []), run_vt=job.get("run_vt", False))}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+    except Exception as e:
+        traceback.print_exc()
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        close_old_connections()
+
+
+# ----------------------------------------------------
+# Socket server
+# ----------------------------------------------------
+def warm_up():
+    """Load the model, blocklist and tldextract suffix list before accepting jobs."""
+    load_ai_model()
+    get_blocklist()
+    tldextract.extract("https://example.com")
+
+
+def _serve_connection(conn):
+    with conn:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        conn.send(handle_job(job))
+
+
+def serve(host=None, port=None, workers=2, queue_workers=1):
+    """
+    Accept jobs on a local socket until interrupted; each connection carries one job.
+    `queue_workers` threads also drain the ScanJob queue in the default DB.
+    """
+    address = (host or settings.SCANNER_DAEMON_HOST, port or settings.SCANNER_DAEMON_PORT)
+    if not settings.SCANNER_DAEMON_AUTHKEY:
+        raise ImproperlyConfigured("Set SCANNER_DAEMON_AUTHKEY in .env before starting the scanner daemon")
+    authkey = settings.SCANNER_DAEMON_AUTHKEY.encode()
+
+    warm_up()
+    for _ in range(queue_workers):
+        threading.Thread(target=work_queue, daemon=True).start()
+    print(f"🛰️ Scanner daemon listening on {address[0]}:{address[1]} "
+          f"({workers} socket worker(s), {queue_workers} queue worker(s))")
+
+    with Listener(address, authkey=authkey) as listener, ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # Bad authkey or a dropped handshake should not kill the daemon
+                print(f"⚠️ Rejected connection: {e}")
+                continue
+            pool.submit(_serve_connection, conn)
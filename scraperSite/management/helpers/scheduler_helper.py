@@ -0,0 +1,191 @@
+import time
+import traceback
+from datetime import timedelta
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from scraperSite.models import MoodleCourse, ScanJob, ScheduledTask
+from scraperSite.management.helpers.scan_queue_helper import enqueue_scan_job
+from scraperSite.management.helpers.adaptive_scan_helper import plan_course_scans
+from scraperSite.management.helpers.moodle_db_helper import moodle_alias, moodle_instances, mirror_enabled
+from scraperSite.management.helpers.moodle_mirror_helper import sync_mirror
+
+# Two-int advisory lock key held for the scheduler's lifetime (302 is taken by per-course scan locks)
+SCHEDULER_LOCK_NAMESPACE = 303
+SCHEDULER_LOCK_ID = 1
+
+# Courses hidden now but starting within this window are scanned ahead of time
+UPCOMING_WINDOW = timedelta(weeks=4)
+
+
+# ----------------------------------------------------
+# Course selection
+# ----------------------------------------------------
+def active_courses(now=None, instance=None):
+    """Visible courses plus hidden ones starting within UPCOMING_WINDOW, of one Moodle site (primary by default)."""
+    now_ts = int((now or timezone.now()).timestamp())
+    cutoff_ts = now_ts + int(UPCOMING_WINDOW.total_seconds())
+
+    courses = []
+    for c in MoodleCourse.objects.using(moodle_alias(instance=instance)).all():
+        start_ts = int(c.startdate)
+        # If timestamp is in milliseconds, convert to seconds
+        if start_ts > 1e12:
+            start_ts = start_ts // 1000
+
+        if c.visible == 1:
+            courses.append(c)
+        elif c.visible == 0 and now_ts <= start_ts <= cutoff_ts:
+            courses.append(c)
+    return courses
+
+
+# ----------------------------------------------------
+# Tasks (ScheduledTask.task -> callable returning a status message)
+# ----------------------------------------------------
+def scan_active_courses():
+    """Queue batch-priority scans on every Moodle site; the worker pool runs them, manual scans still go first."""
+    total = queued = 0
+    for site in moodle_instances():
+        courses = active_courses(instance=site["name"])
+        total += len(courses)
+        for course in courses:
+            _, created = enqueue_scan_job(course.id, scan_type="auto", priority=ScanJob.PRIORITY_BATCH,
+                                          instance=site["name"])
+            queued += int(created)
+    return f"Queued {queued} course scan(s) ({total - queued} already in flight)"
+
+
+def scan_changed_courses():
+    """
+    Queue scans only for courses that changed, are risky or are overdue,
+    within ADAPTIVE_SCAN_BUDGET per Moodle site.
+    """
+    queued = waiting = skipped = 0
+    for site in moodle_instances():
+        plans = plan_course_scans(active_courses(instance=site["name"]), instance=site["name"])
+        site_queued = [p for p in plans if p.queued]
+        for plan in site_queued:
+            # Risky courses are rescanned for fresh verdicts even when their content has not changed
+            enqueue_scan_job(plan.course.id, scan_type="auto", priority=ScanJob.PRIORITY_BATCH,
+                             reuse_unchanged=not plan.unsafe, instance=site["name"])
+        site_waiting = sum(1 for p in plans if p.eligible and not p.queued)
+        queued += len(site_queued)
+        waiting += site_waiting
+        skipped += len(plans) - len(site_queued) - site_waiting
+    return f"Queued {queued} course scan(s); {waiting} over budget, {skipped} unchanged or recently scanned"
+
+
+def reconcile_moodle_mirror():
+    """Catch up the local Moodle mirror and drop rows deleted in Moodle since the last reconcile."""
+    if not mirror_enabled():
+        return "MOODLE_READ_FROM_MIRROR is off — nothing to reconcile"
+    results = sync_mirror(reconcile=True, wait=True, report=lambda line: None)
+    copied = sum(c for c, _ in results.values())
+    deleted = sum(d for _, d in results.values())
+    return f"Mirrored {len(results)} table(s): {copied} row(s) copied, {deleted} deleted"
+
+
+TASKS = {
+    "scan_active_courses": scan_active_courses,
+    "scan_changed_courses": scan_changed_courses,
+    "reconcile_moodle_mirror": reconcile_moodle_mirror,
+}
+
+
+# ----------------------------------------------------
+# Scheduler loop
+# ----------------------------------------------------
+HELD_LOCK_SQL = """
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory' AND classid = %s AND objid = %s AND objsubid = 2
+          AND pid = pg_backend_pid() AND granted
+    )
+"""
+
+
+class SchedulerLock:
+    """
+    Session-level advisory lock that makes this process the one scheduler.
+    It lives on a connection of its own, outside Django's pool, so CONN_MAX_AGE and
+    close_old_connections() never recycle it. Postgres releases it if the process or connection dies.
+    """
+    def __init__(self):
+        self.conn = connections.create_connection(DEFAULT_DB_ALIAS)
+
+    def held(self):
+        """
+        Checked before every pass: True if this session still holds the lock, or could take it again
+        after its connection was lost (e.g. a DB restart). False means another scheduler has it now.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(HELD_LOCK_SQL, [SCHEDULER_LOCK_NAMESPACE, SCHEDULER_LOCK_ID])
+                if cur.fetchone()[0]:
+                    return True
+                cur.execute("SELECT pg_try_advisory_lock(%s, %s)", [SCHEDULER_LOCK_NAMESPACE, SCHEDULER_LOCK_ID])
+                return cur.fetchone()[0]
+        except DatabaseError as e:
+            print(f"⚠️ Scheduler lock connection lost: {e}")
+            self.conn.close()
+            return False
+
+    def release(self):
+        self.conn.close()
+
+
+def run_task(task, now):
+    """
+    Run one due task and move its next_run_at forward.
+    A run missed while no scheduler was up fires once (not once per missed period) on the next pass.
+    """
+    # Claim this occurrence first, so the task cannot fire twice for the same slot
+    next_run = task.next_run_after(now)
+    claimed = ScheduledTask.objects.filter(pk=task.pk, next_run_at=task.next_run_at).update(
+        next_run_at=next_run, last_run_at=now,
+    )
+    if not claimed:
+        return
+
+    late = now - task.next_run_at
+    if late > timedelta(minutes=5):
+        print(f"⏰ {task.name} missed its {timezone.localtime(task.next_run_at):%Y-%m-%d %H:%M} run — catching up now")
+
+    try:
+        message = TASKS[task.task]()
+        print(f"✅ {task.name}: {message}")
+    except Exception as e:
+        traceback.print_exc()
+        message = f"Failed: {type(e).__name__}: {e}"
+        print(f"⚠️ {task.name}: {message}")
+    ScheduledTask.objects.filter(pk=task.pk).update(last_message=message[:200])
+    print(f"🗓️ {task.name} next runs at {timezone.localtime(next_run):%Y-%m-%d %H:%M}")
+
+
+def run_due_tasks(now=None):
+    """Fire every enabled task whose next_run_at has passed; new tasks get their first slot."""
+    now = now or timezone.now()
+    for task in ScheduledTask.objects.filter(enabled=True).order_by("name"):
+        if task.task not in TASKS:
+            print(f"⚠️ Unknown task '{task.task}' for schedule {task.name} — skipped")
+            continue
+        if task.next_run_at is None:
+            task.next_run_at = task.next_run_after(now)
+            ScheduledTask.objects.filter(pk=task.pk).update(next_run_at=task.next_run_at)
+            print(f"🗓️ {task.name} first runs at {timezone.localtime(task.next_run_at):%Y-%m-%d %H:%M}")
+        elif task.next_run_at <= now:
+            run_task(task, now)
+
+
+def run_scheduler(lock, poll_interval=30, stop_event=None):
+    """
+    Check the schedule every poll_interval seconds until stop_event is set (or forever).
+    Stops as soon as `lock` (a SchedulerLock) is no longer held, so two schedulers never overlap.
+    """
+    while not (stop_event and stop_event.is_set()):
+        if not lock.held():
+            print("⚠️ Lost the scheduler lock to another URL_scheduler — stopping")
+            return
+        run_due_tasks()
+        time.sleep(poll_interval)
@@ -0,0 +1,64 @@
+from django.db.models import Count, Max, Min
+
+from scraperSite.models import ScanResult, catalogued_q
+from scraperSite.management.helpers.domain_blocklist_helper import registered_domain
+
+# Shorter substrings have no trigrams to look up, so they would fall back to a full scan
+MIN_QUERY_LENGTH = 3
+SEARCH_LIMIT = 200
+
+
+def search_mode(query):
+    """'domain' for a bare host like evil-domain.xyz, otherwise 'contains' (substring of the URL)."""
+    q = query.strip()
+    if "/" not in q and " " not in q and "." in q.strip("."):
+        return "domain"
+    return "contains"
+
+
+def search_scanned_urls(query, mode=None, limit=SEARCH_LIMIT):
+    """
+    Every scanned URL matching the query, newest first:
+      mode='domain'   -> same registrable domain (btree index on ScanResult.domain)
+      mode='contains' -> case-insensitive substring of the URL (pg_trgm GIN index on UPPER(url))
+    Returns (hits, summary) where summary counts matches and distinct courses/reports.
+    """
+    query = (query or "").strip()
+    mode = mode or search_mode(query)
+    if len(query) < MIN_QUERY_LENGTH:
+        return [], {"mode": mode, "matches": 0, "courses": 0, "reports": 0}
+
+    if mode == "domain":
+        results = ScanResult.objects.filter(domain=registered_domain(query))
+    else:
+        results = ScanResult.objects.filter(url__icontains=query)
+    results = results.filter(catalogued_q("output__"))
+
+    summary = results.aggregate(
+        matches=Count("result_id"),
+        courses=Count("output__moodle_courseID", distinct=True),
+        reports=Count("output__report_id", distinct=True),
+        first_seen=Min("output__scanned_at"),
+        last_seen=Max("output__scanned_at"),
+    )
+    summary["mode"] = mode
+
+    hits = list(
+        results.select_related("output")
+        .order_by("-result_id")[:limit]
+    )
+    return hits, summary
+
+
+def backfill_domains(batch_size=5000):
+    """Fill ScanResult.domain for rows stored before the column existed. Returns rows updated."""
+    updated = 0
+    while True:
+        batch = list(ScanResult.objects.filter(domain="").exclude(url="").only("result_id", "url")[:batch_size])
+        if not batch:
+            return updated
+        for result in batch:
+            # Unparseable URLs get a placeholder so they are not picked up again
+            result.domain = registered_domain(result.url) or "-"
+        ScanResult.objects.bulk_update(batch, ["domain"])
+        updated += len(batch)
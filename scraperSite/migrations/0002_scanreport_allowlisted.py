@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanreport',
+            name='allowlisted',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0002_scanreport_allowlisted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('moodle_courseID', models.IntegerField()),
+                ('scan_type', models.CharField(default='auto', max_length=10)),
+                ('priority', models.IntegerField(default=100)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('stage', models.CharField(choices=[('queued', 'Queued'), ('collecting', 'Collecting URLs'), ('scanning', 'Scanning URLs'), ('finished', 'Finished')], default='queued', max_length=12)),
+                ('progress', models.IntegerField(default=0)),
+                ('message', models.CharField(blank=True, default='', max_length=200)),
+                ('requested_by', models.CharField(blank=True, default='', max_length=15)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='scraperSite.scanreport')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['status', 'priority', 'created_at'], name='scanjob_queue_idx')],
+            },
+        ),
+    ]
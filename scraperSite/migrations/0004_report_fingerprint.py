@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0003_scanjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='reuse_unchanged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='scanreport',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='scanreport',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0004_report_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanOutput',
+            fields=[
+                ('output_id', models.AutoField(primary_key=True, serialize=False)),
+                ('moodle_courseID', models.IntegerField()),
+                ('moodle_courseName', models.CharField(max_length=200)),
+                ('scan_type', models.CharField(max_length=10)),
+                ('scanned_at', models.DateTimeField()),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('total_link', models.IntegerField(default=0)),
+                ('safe_link', models.IntegerField(default=0)),
+                ('suspicious', models.IntegerField(default=0)),
+                ('malicious', models.IntegerField(default=0)),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outputs', to='scraperSite.scanreport')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['scan_type', 'scanned_at'], name='scanoutput_period_idx'), models.Index(fields=['moodle_courseID', 'scan_type', 'scanned_at'], name='scanoutput_course_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0005_scanoutput'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanResult',
+            fields=[
+                ('result_id', models.AutoField(primary_key=True, serialize=False)),
+                ('url', models.TextField()),
+                ('author_username', models.CharField(blank=True, default='', max_length=100)),
+                ('author_name', models.CharField(blank=True, default='', max_length=200)),
+                ('author_email', models.CharField(blank=True, default='', max_length=100)),
+                ('source', models.CharField(blank=True, default='', max_length=100)),
+                ('pred_label', models.CharField(max_length=10)),
+                ('confidence', models.FloatField(default=0)),
+                ('vt_result', models.CharField(blank=True, default='', max_length=15)),
+                ('final_status', models.CharField(max_length=10)),
+                ('verdict_source', models.CharField(blank=True, default='', max_length=10)),
+                ('output', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='scraperSite.scanoutput')),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['output', 'final_status'], name='scanresult_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0006_scanresult'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scanreport',
+            index=models.Index(fields=['moodle_courseID', 'report_id'], name='scanreport_course_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanreport',
+            index=models.Index(fields=['date', 'report_id'], name='scanreport_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unsafeurl',
+            index=models.Index(fields=['url'], name='unsafeurl_url_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unsafeurl',
+            index=models.Index(fields=['status', 'check_status', 'url_id'], name='unsafeurl_status_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0007_reporting_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reports', models.IntegerField(default=0)),
+                ('total_link', models.IntegerField(default=0)),
+                ('safe_link', models.IntegerField(default=0)),
+                ('suspicious', models.IntegerField(default=0)),
+                ('malicious', models.IntegerField(default=0)),
+                ('allowlisted', models.IntegerField(default=0)),
+                ('vt_calls', models.IntegerField(default=0)),
+                ('week_start', models.DateField(unique=True)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='scanreport',
+            name='vt_calls',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CourseWeekSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reports', models.IntegerField(default=0)),
+                ('total_link', models.IntegerField(default=0)),
+                ('safe_link', models.IntegerField(default=0)),
+                ('suspicious', models.IntegerField(default=0)),
+                ('malicious', models.IntegerField(default=0)),
+                ('allowlisted', models.IntegerField(default=0)),
+                ('vt_calls', models.IntegerField(default=0)),
+                ('week_start', models.DateField()),
+                ('moodle_courseID', models.IntegerField()),
+                ('moodle_courseName', models.CharField(max_length=200)),
+            ],
+            options={
+                'managed': True,
+                'indexes': [models.Index(fields=['moodle_courseID', 'week_start'], name='courseweek_course_idx')],
+                'constraints': [models.UniqueConstraint(fields=('week_start', 'moodle_courseID'), name='courseweek_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WeeklyUnsafeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_start', models.DateField()),
+                ('status', models.CharField(max_length=10)),
+                ('source_type', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('week_start', 'status', 'source_type'), name='weeklyunsafe_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:30
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0008_weekly_summaries'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='scanresult',
+            name='domain',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=models.Index(fields=['domain'], name='scanresult_domain_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scanresult',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('url'), name='gin_trgm_ops'), name='scanresult_url_trgm'),
+        ),
+    ]
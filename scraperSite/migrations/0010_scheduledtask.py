@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:32
+
+from django.db import migrations, models
+
+
+def seed_weekly_scan(apps, schema_editor):
+    # Same slot the old in-process `schedule` thread used: every Saturday at 01:00
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.get_or_create(
+        name='weekly_course_scan',
+        defaults={'task': 'scan_active_courses', 'weekday': 5, 'hour': 1, 'minute': 0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0009_url_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('task', models.CharField(choices=[('scan_active_courses', 'Queue scans of visible / soon-starting courses')], max_length=50)),
+                ('weekday', models.IntegerField(blank=True, null=True)),
+                ('hour', models.IntegerField(default=1)),
+                ('minute', models.IntegerField(default=0)),
+                ('enabled', models.BooleanField(default=True)),
+                ('next_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_message', models.CharField(blank=True, default='', max_length=200)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.RunPython(seed_weekly_scan, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+def seed_adaptive_scan(apps, schema_editor):
+    # Daily budgeted scan of changed / risky / overdue courses replaces the blanket weekly scan
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.get_or_create(
+        name='adaptive_course_scan',
+        defaults={'task': 'scan_changed_courses', 'weekday': None, 'hour': 1, 'minute': 0},
+    )
+    ScheduledTask.objects.filter(name='weekly_course_scan').update(enabled=False)
+
+
+def restore_weekly_scan(apps, schema_editor):
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.filter(name='adaptive_course_scan').delete()
+    ScheduledTask.objects.filter(name='weekly_course_scan').update(enabled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0010_scheduledtask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scheduledtask',
+            name='task',
+            field=models.CharField(choices=[('scan_active_courses', 'Queue scans of visible / soon-starting courses'), ('scan_changed_courses', 'Queue scans of changed, risky or overdue courses (budgeted)')], max_length=50),
+        ),
+        migrations.RunPython(seed_adaptive_scan, restore_weekly_scan),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0011_adaptive_scan_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MoodleLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('eventname', models.CharField(max_length=255)),
+                ('crud', models.CharField(max_length=1)),
+                ('objecttable', models.CharField(max_length=50, null=True)),
+                ('objectid', models.BigIntegerField(null=True)),
+                ('contextid', models.BigIntegerField()),
+                ('userid', models.BigIntegerField()),
+                ('courseid', models.BigIntegerField(null=True)),
+                ('timecreated', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'mdl_logstore_standard_log',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+    ]
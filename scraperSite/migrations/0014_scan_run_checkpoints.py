@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0013_scan_job_leases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRun',
+            fields=[
+                ('run_id', models.AutoField(primary_key=True, serialize=False)),
+                ('scan_type', models.CharField(default='auto', max_length=10)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('abandoned', 'Abandoned')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('resumes', models.IntegerField(default=0)),
+            ],
+            options={
+                'managed': True,
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanRunCourse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('moodle_courseID', models.IntegerField()),
+                ('moodle_courseName', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('retrying', 'Waiting to retry'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='run_units', to='scraperSite.scanjob')),
+                ('report', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='run_units', to='scraperSite.scanreport')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='scraperSite.scanrun')),
+            ],
+            options={
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('run', 'moodle_courseID'), name='scanruncourse_unique_course')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+def seed_mirror_reconcile(apps, schema_editor):
+    # Off by default: only worth running once MOODLE_READ_FROM_MIRROR is switched on
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.get_or_create(
+        name='nightly_mirror_reconcile',
+        defaults={'task': 'reconcile_moodle_mirror', 'weekday': None, 'hour': 0, 'minute': 30, 'enabled': False},
+    )
+
+
+def remove_mirror_reconcile(apps, schema_editor):
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.filter(name='nightly_mirror_reconcile').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0014_scan_run_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scheduledtask',
+            name='task',
+            field=models.CharField(choices=[('scan_active_courses', 'Queue scans of visible / soon-starting courses'), ('scan_changed_courses', 'Queue scans of changed, risky or overdue courses (budgeted)'), ('reconcile_moodle_mirror', 'Sync the local Moodle mirror and drop rows deleted in Moodle')], max_length=50),
+        ),
+        migrations.RunPython(seed_mirror_reconcile, remove_mirror_reconcile),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0015_moodle_mirror_schedule'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='scanruncourse',
+            name='scanruncourse_unique_course',
+        ),
+        migrations.AddField(
+            model_name='scanjob',
+            name='instance',
+            field=models.CharField(default='moodle', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='scanreport',
+            name='instance',
+            field=models.CharField(default='moodle', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='scanruncourse',
+            name='instance',
+            field=models.CharField(default='moodle', max_length=50),
+        ),
+        migrations.AddConstraint(
+            model_name='scanruncourse',
+            constraint=models.UniqueConstraint(fields=('run', 'instance', 'moodle_courseID'), name='scanruncourse_unique_course'),
+        ),
+    ]
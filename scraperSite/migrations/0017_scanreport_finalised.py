@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0016_moodle_instances'),
+    ]
+
+    # Reports that already exist count as finalised; new ones start unfinalised
+    operations = [
+        migrations.AddField(
+            model_name='scanreport',
+            name='finalised',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='scanreport',
+            name='finalised',
+            field=models.BooleanField(default=False),
+        ),
+    ]
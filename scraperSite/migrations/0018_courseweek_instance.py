@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:12
+
+from datetime import timedelta
+from django.db import migrations, models
+
+TOTAL_FIELDS = ("total_link", "safe_link", "suspicious", "malicious", "allowlisted", "vt_calls")
+
+
+def split_course_weeks_by_site(apps, schema_editor):
+    """Course-week rows were keyed on the course id alone: recompute them per site if other sites were scanned."""
+    ScanReport = apps.get_model('scraperSite', 'ScanReport')
+    CourseWeekSummary = apps.get_model('scraperSite', 'CourseWeekSummary')
+    if not ScanReport.objects.exclude(instance='moodle').exists():
+        return
+    rows = {}
+    for report in ScanReport.objects.filter(finalised=True).order_by('report_id').iterator():
+        week = report.date - timedelta(days=report.date.weekday())
+        row = rows.setdefault((week, report.instance, report.moodle_courseID), CourseWeekSummary(
+            week_start=week, instance=report.instance, moodle_courseID=report.moodle_courseID,
+            moodle_courseName=report.moodle_courseName,
+        ))
+        row.reports += 1
+        for name in TOTAL_FIELDS:
+            setattr(row, name, getattr(row, name) + getattr(report, name))
+    CourseWeekSummary.objects.all().delete()
+    CourseWeekSummary.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0017_scanreport_finalised'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='courseweeksummary',
+            name='courseweek_unique',
+        ),
+        migrations.RemoveIndex(
+            model_name='courseweeksummary',
+            name='courseweek_course_idx',
+        ),
+        migrations.AddField(
+            model_name='courseweeksummary',
+            name='instance',
+            field=models.CharField(default='moodle', max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='courseweeksummary',
+            index=models.Index(fields=['instance', 'moodle_courseID', 'week_start'], name='courseweek_site_course_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='courseweeksummary',
+            constraint=models.UniqueConstraint(fields=('week_start', 'instance', 'moodle_courseID'), name='courseweek_site_unique'),
+        ),
+        migrations.RunPython(split_course_weeks_by_site, migrations.RunPython.noop),
+    ]
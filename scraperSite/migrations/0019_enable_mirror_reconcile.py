@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:05
+
+from django.db import migrations
+
+
+def enable_mirror_reconcile(apps, schema_editor):
+    # The task skips itself while MOODLE_READ_FROM_MIRROR is off, so it can run whenever the mirror is used
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.filter(name='nightly_mirror_reconcile', last_run_at__isnull=True).update(enabled=True)
+
+
+def disable_mirror_reconcile(apps, schema_editor):
+    ScheduledTask = apps.get_model('scraperSite', 'ScheduledTask')
+    ScheduledTask.objects.filter(name='nightly_mirror_reconcile').update(enabled=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scraperSite', '0018_courseweek_instance'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_mirror_reconcile, disable_mirror_reconcile),
+    ]
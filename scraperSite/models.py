@@ -1,7 +1,12 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from scraperSite.management.helpers.moodle_db_helper import primary_instance
 
 # --------------------------
 # Internal Users & Reports
@@ -40,7 +45,18 @@ class ScanReport(models.Model):
     malicious = models.IntegerField()
     moodle_courseID = models.IntegerField()
     moodle_courseName = models.CharField(max_length=200)
+    # Moodle site the course belongs to (a MOODLE_INSTANCES name); course ids are only unique per site
+    instance = models.CharField(max_length=50, default='moodle')
     all_url = models.CharField(max_length=100)
+    # URLs short-circuited by the allowlist (reviewed-safe or trusted domain)
+    allowlisted = models.IntegerField(default=0)
+    # Course content + scanner version at scan time; equal values mean a rescan would give the same result
+    content_fingerprint = models.CharField(max_length=64, blank=True, default='')
+    model_version = models.CharField(max_length=64, blank=True, default='')
+    # VirusTotal lookups spent on this report (rows whose vt_result is not "not_checked")
+    vt_calls = models.IntegerField(default=0)
+    # Set once every chunk is saved; a scan that died half way never shows up in pages, API or planning
+    finalised = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Report {self.report_id}"
@@ -48,6 +64,28 @@ class ScanReport(models.Model):
     class Meta:
         managed = True
         app_label = 'scraperSite'
+        indexes = [
+            models.Index(fields=['moodle_courseID', 'report_id'], name='scanreport_course_idx'),
+            models.Index(fields=['date', 'report_id'], name='scanreport_date_idx'),
+        ]
+
+
+def finalised_q(prefix=""):
+    """Rows of finalised reports; `prefix` is the lookup path to the ScanReport, e.g. "report__"."""
+    return Q(**{f"{prefix}finalised": True})
+
+
+def catalogued_q(prefix=""):
+    """ScanOutput rows (at `prefix`) of finalised reports, or catalogued from files without a report."""
+    return Q(**{f"{prefix}report__isnull": True}) | finalised_q(f"{prefix}report__")
+
+
+def site_q(instance, prefix=""):
+    """ScanOutput rows (at `prefix`) of one Moodle site; outputs catalogued without a report are the primary's."""
+    q = Q(**{f"{prefix}report__instance": instance})
+    if instance == primary_instance():
+        q |= Q(**{f"{prefix}report__isnull": True})
+    return q
 
 
 class UnsafeURL(models.Model):
@@ -76,6 +114,308 @@ class UnsafeURL(models.Model):
     class Meta:
         managed = True
         app_label = 'scraperSite'
+        indexes = [
+            models.Index(fields=['url'], name='unsafeurl_url_idx'),
+            models.Index(fields=['status', 'check_status', 'url_id'], name='unsafeurl_status_idx'),
+        ]
+
+
+# --------------------------
+# Dashboard aggregates (added to as each ScanReport is finalised)
+# --------------------------
+
+class SummaryTotals(models.Model):
+    reports = models.IntegerField(default=0)
+    total_link = models.IntegerField(default=0)
+    safe_link = models.IntegerField(default=0)
+    suspicious = models.IntegerField(default=0)
+    malicious = models.IntegerField(default=0)
+    allowlisted = models.IntegerField(default=0)
+    vt_calls = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class WeeklySummary(SummaryTotals):
+    week_start = models.DateField(unique=True)  # Monday
+
+    def __str__(self):
+        return f"Week of {self.week_start}"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+
+
+class CourseWeekSummary(SummaryTotals):
+    week_start = models.DateField()  # Monday
+    instance = models.CharField(max_length=50, default='moodle')  # Moodle site, see ScanReport.instance
+    moodle_courseID = models.IntegerField()
+    moodle_courseName = models.CharField(max_length=200)
+
+    def __str__(self):
+        return f"Course {self.moodle_courseID} ({self.instance}), week of {self.week_start}"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        constraints = [
+            models.UniqueConstraint(fields=['week_start', 'instance', 'moodle_courseID'], name='courseweek_site_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['instance', 'moodle_courseID', 'week_start'], name='courseweek_site_course_idx'),
+        ]
+
+
+class WeeklyUnsafeCount(models.Model):
+    """Unsafe URLs per week by final status and source type (url_resource, forum_post, mod_resource, ...)."""
+    week_start = models.DateField()  # Monday
+    status = models.CharField(max_length=10)
+    source_type = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.week_start} {self.status}/{self.source_type}: {self.count}"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        constraints = [
+            models.UniqueConstraint(fields=['week_start', 'status', 'source_type'], name='weeklyunsafe_unique'),
+        ]
+
+
+class ScanOutput(models.Model):
+    """Catalogue of scanned output files under url_details/, so dashboards never walk the folders."""
+    output_id = models.AutoField(primary_key=True)
+    report = models.ForeignKey(ScanReport, on_delete=models.CASCADE, null=True, blank=True, related_name='outputs')
+    moodle_courseID = models.IntegerField()
+    moodle_courseName = models.CharField(max_length=200)
+    scan_type = models.CharField(max_length=10)  # auto / manual
+    scanned_at = models.DateTimeField()
+    path = models.CharField(max_length=255, unique=True)
+    total_link = models.IntegerField(default=0)
+    safe_link = models.IntegerField(default=0)
+    suspicious = models.IntegerField(default=0)
+    malicious = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.path
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        indexes = [
+            models.Index(fields=['scan_type', 'scanned_at'], name='scanoutput_period_idx'),
+            models.Index(fields=['moodle_courseID', 'scan_type', 'scanned_at'], name='scanoutput_course_idx'),
+        ]
+
+
+class ScanResult(models.Model):
+    """One classified URL from a scan output, so log pages can filter and page on the server."""
+    result_id = models.AutoField(primary_key=True)
+    output = models.ForeignKey(ScanOutput, on_delete=models.CASCADE, related_name='results')
+    url = models.TextField()
+    # Registrable domain of the URL (evil.co.uk for https://a.evil.co.uk/x), for incident lookups
+    domain = models.CharField(max_length=255, blank=True, default='')
+    author_username = models.CharField(max_length=100, blank=True, default='')
+    author_name = models.CharField(max_length=200, blank=True, default='')
+    author_email = models.CharField(max_length=100, blank=True, default='')
+    source = models.CharField(max_length=100, blank=True, default='')
+    pred_label = models.CharField(max_length=10)
+    confidence = models.FloatField(default=0)
+    vt_result = models.CharField(max_length=15, blank=True, default='')
+    final_status = models.CharField(max_length=10)
+    verdict_source = models.CharField(max_length=10, blank=True, default='')
+
+    def __str__(self):
+        return self.url
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        indexes = [
+            models.Index(fields=['output', 'final_status'], name='scanresult_status_idx'),
+            models.Index(fields=['domain'], name='scanresult_domain_idx'),
+            # Trigram index on UPPER(url) serves Django's icontains (UPPER(url) LIKE UPPER('%...%'))
+            GinIndex(OpClass(Upper('url'), name='gin_trgm_ops'), name='scanresult_url_trgm'),
+        ]
+
+
+class ScanJob(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    STAGE_CHOICES = (
+        ('queued', 'Queued'),
+        ('collecting', 'Collecting URLs'),
+        ('scanning', 'Scanning URLs'),
+        ('finished', 'Finished'),
+    )
+    # Lower number = picked first, so a waiting user is served before the weekly batch
+    PRIORITY_MANUAL = 10
+    PRIORITY_BATCH = 100
+
+    job_id = models.AutoField(primary_key=True)
+    moodle_courseID = models.IntegerField()
+    instance = models.CharField(max_length=50, default='moodle')  # Moodle site, see ScanReport.instance
+    scan_type = models.CharField(max_length=10, default='auto')
+    priority = models.IntegerField(default=PRIORITY_BATCH)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    stage = models.CharField(max_length=12, choices=STAGE_CHOICES, default='queued')
+    progress = models.IntegerField(default=0)  # 0-100
+    message = models.CharField(max_length=200, blank=True, default='')
+    requested_by = models.CharField(max_length=15, blank=True, default='')
+    # Return the previous report if the course content and scanner version are unchanged
+    reuse_unchanged = models.BooleanField(default=False)
+    report = models.ForeignKey(ScanReport, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    error = models.TextField(blank=True, default='')
+    # Lease held by the worker running the job; renewed by its heartbeat, re-claimable once expired
+    lease_owner = models.CharField(max_length=100, blank=True, default='')
+    lease_expires_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Job {self.job_id} ({self.status})"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        indexes = [
+            models.Index(fields=['status', 'priority', 'created_at'], name='scanjob_queue_idx'),
+            models.Index(fields=['status', 'lease_expires_at'], name='scanjob_lease_idx'),
+        ]
+
+
+class ScanRun(models.Model):
+    """One full-site URL_collector_all run; its units are the checkpoint a restarted run resumes from."""
+    STATUS_CHOICES = (
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('abandoned', 'Abandoned'),
+    )
+
+    run_id = models.AutoField(primary_key=True)
+    scan_type = models.CharField(max_length=10, default='auto')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    resumes = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Run {self.run_id} ({self.status})"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+
+
+class ScanRunCourse(models.Model):
+    """Progress of one course within a ScanRun (the job's stage shows collecting / scanning)."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('retrying', 'Waiting to retry'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    run = models.ForeignKey(ScanRun, on_delete=models.CASCADE, related_name='units')
+    position = models.IntegerField()
+    instance = models.CharField(max_length=50, default='moodle')
+    moodle_courseID = models.IntegerField()
+    moodle_courseName = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    job = models.ForeignKey(ScanJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='run_units')
+    report = models.ForeignKey(ScanReport, on_delete=models.SET_NULL, null=True, blank=True, related_name='run_units')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Run {self.run_id} course {self.moodle_courseID} ({self.status})"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'instance', 'moodle_courseID'], name='scanruncourse_unique_course'),
+        ]
+
+
+class ScanWorker(models.Model):
+    """A process draining the ScanJob queue (URL_worker, URL_scheduler or the scanner daemon), seen via heartbeat."""
+    name = models.CharField(max_length=100, unique=True)  # host:pid/thread
+    started_at = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+
+
+
+class ScheduledTask(models.Model):
+    """Persisted schedule run by `manage.py URL_scheduler` (one instance cluster-wide)."""
+    TASK_CHOICES = (
+        ('scan_active_courses', 'Queue scans of visible / soon-starting courses'),
+        ('scan_changed_courses', 'Queue scans of changed, risky or overdue courses (budgeted)'),
+        ('reconcile_moodle_mirror', 'Sync the local Moodle mirror and drop rows deleted in Moodle'),
+    )
+
+    name = models.CharField(max_length=50, unique=True)
+    task = models.CharField(max_length=50, choices=TASK_CHOICES)
+    weekday = models.IntegerField(null=True, blank=True)  # 0 = Monday ... 6 = Sunday; empty = every day
+    hour = models.IntegerField(default=1)
+    minute = models.IntegerField(default=0)
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_message = models.CharField(max_length=200, blank=True, default='')
+
+    def next_run_after(self, moment):
+        """First scheduled time strictly after `moment`, in the site timezone."""
+        local = timezone.localtime(moment)
+        candidate = local.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.weekday is None:
+            if candidate <= local:
+                candidate += timedelta(days=1)
+        else:
+            candidate += timedelta(days=(self.weekday - local.weekday()) % 7)
+            if candidate <= local:
+                candidate += timedelta(days=7)
+        return candidate
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
+
+
+class Watermark(models.Model):
+    """How far an incremental reader has got (e.g. the last Moodle log id handled by URL_live_scan)."""
+    name = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+    class Meta:
+        managed = True
+        app_label = 'scraperSite'
 
 
 # --------------------------
@@ -282,3 +622,21 @@ class ForumPost(models.Model):
         managed = False
         db_table = 'mdl_forum_posts'
         app_label = 'scraperSite'
+
+
+class MoodleLogEntry(models.Model):
+    """Moodle standard log store (one row per event; ids increase, but may commit out of order)."""
+    id = models.BigAutoField(primary_key=True)
+    eventname = models.CharField(max_length=255)
+    crud = models.CharField(max_length=1)  # c / r / u / d
+    objecttable = models.CharField(max_length=50, null=True)
+    objectid = models.BigIntegerField(null=True)
+    contextid = models.BigIntegerField()
+    userid = models.BigIntegerField()
+    courseid = models.BigIntegerField(null=True)
+    timecreated = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'mdl_logstore_standard_log'
+        app_label = 'scraperSite'
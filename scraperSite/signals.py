@@ -1,7 +1,11 @@
 from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import User
+from .models import User, UnsafeURL
 from .user_log_event import user_log_event  # must exist in same folder
+from .management.helpers.moodle_db_helper import moodle_aliases, install_governor
+from .management.helpers.allowlist_helper import allowlist_changed
 
 @receiver(user_logged_in)
 def on_user_login(sender, request, user, **kwargs):
@@ -12,3 +16,17 @@ def on_user_login(sender, request, user, **kwargs):
 def on_user_logout(sender, request, user, **kwargs):
     if isinstance(user, User):
         user_log_event("LOGOUT", user)
+
+@receiver(connection_created)
+def on_connection_created(sender, connection, **kwargs):
+    # Every query to the Moodle DB (primary or replica) goes through the load governor
+    if connection.alias in moodle_aliases():
+        install_governor(connection)
+
+@receiver(post_save, sender=UnsafeURL)
+def on_unsafe_url_reviewed(sender, instance, created, update_fields=None, **kwargs):
+    # A review may add or remove an allowlisted URL; scans insert new rows with bulk_create
+    if created and instance.check_status != "safe":
+        return
+    if update_fields is None or "check_status" in update_fields:
+        allowlist_changed()
@@ -1,6 +1,8 @@
 // Use injected data from template (see manual_scan.html)
-const injectedCourseManagers = window.courseManagers || {};
-const hasScanResultPopup = !!window.hasScanResultPopup;
+const courseManagersUrl = window.courseManagersUrl || '';
+const scanJobId = window.scanJobId || '';
+const scanJobStatusUrl = (window.scanJobStatusUrl || '').replace(/0\/$/, scanJobId + '/');
+const SCAN_POLL_MS = 2000;
 
 // ===== Pagination globals =====
 const ROWS_PER_PAGE = 10;
@@ -198,27 +200,106 @@ function closeScanPopup() {
   if (popup) popup.style.display = 'none';
 }
 
-// ===== Page initialisation =====
-document.addEventListener('DOMContentLoaded', function () {
-  // 1. Populate manager / email columns (ONLY real course rows)
-  const courseRowsNodeList = document.querySelectorAll('#courseTableBody tr[data-course-id]');
-  allCourseRows = Array.from(courseRowsNodeList);
-  filteredCourseRows = allCourseRows.slice(); // initial: all rows
+// ===== Background scan job: poll progress, then show results =====
+function showScanOverlay(text, progress) {
+  const overlay = document.getElementById('scanningOverlay');
+  const textEl = document.getElementById('scanProgressText');
+  const barEl = document.getElementById('scanProgressBar');
+  if (overlay) overlay.style.display = 'flex';
+  if (textEl) textEl.textContent = text || '';
+  if (barEl) barEl.style.width = `${progress || 0}%`;
+}
+
+function hideScanOverlay() {
+  const overlay = document.getElementById('scanningOverlay');
+  if (overlay) overlay.style.display = 'none';
+}
 
+function showScanResult(job) {
+  const pre = document.getElementById('scanResultRaw');
+  const title = document.getElementById('scanPopupTitle');
+  if (pre) pre.textContent = job.scan_result || '';
+  if (title) title.textContent = `Scan Results for ${job.course_name || ''}`;
+
+  renderScanResultFromRaw();
+  const popup = document.getElementById('scanResultPopup');
+  if (popup) popup.style.display = 'flex';
+}
+
+function pollScanJob() {
+  fetch(scanJobStatusUrl, { credentials: 'same-origin' })
+    .then(resp => resp.json())
+    .then(job => {
+      if (job.status === 'done') {
+        hideScanOverlay();
+        // Drop ?job= so a refresh does not re-open the popup
+        window.history.replaceState(null, '', window.location.pathname);
+        showScanResult(job);
+      } else if (job.status === 'failed' || job.error) {
+        hideScanOverlay();
+        window.history.replaceState(null, '', window.location.pathname);
+        alert(`Scan failed: ${job.error || 'unknown error'}`);
+      } else {
+        const label = job.status === 'queued' ? 'Waiting in queue' : job.stage_label;
+        showScanOverlay(`${label} — ${job.message || ''}`, job.progress);
+        setTimeout(pollScanJob, SCAN_POLL_MS);
+      }
+    })
+    .catch(() => setTimeout(pollScanJob, SCAN_POLL_MS));
+}
+
+// ===== Manager / email columns (fetched after page load) =====
+function fillCourseManagers(courseManagers) {
   allCourseRows.forEach(row => {
     const courseId = row.getAttribute('data-course-id');
     const managerCell = row.querySelector('.col-managers');
     const emailCell = row.querySelector('.col-emails');
-    const managers = injectedCourseManagers[courseId] || [];
+    const managers = courseManagers[courseId] || [];
+
+    if (managerCell) managerCell.replaceChildren();
+    if (emailCell) emailCell.replaceChildren();
 
     if (!managers.length) {
       if (managerCell) managerCell.textContent = '—';
       if (emailCell) emailCell.textContent = '—';
-    } else {
-      if (managerCell) managerCell.innerHTML = managers.map(m => m.name).join('<br>');
-      if (emailCell) emailCell.innerHTML = managers.map(m => m.email).join('<br>');
+      return;
     }
+
+    managers.forEach((m, idx) => {
+      if (idx > 0) {
+        if (managerCell) managerCell.appendChild(document.createElement('br'));
+        if (emailCell) emailCell.appendChild(document.createElement('br'));
+      }
+      if (managerCell) managerCell.appendChild(document.createTextNode(m.name));
+      if (emailCell) emailCell.appendChild(document.createTextNode(m.email));
+    });
   });
+}
+
+function loadCourseManagers() {
+  if (!courseManagersUrl) return;
+
+  allCourseRows.forEach(row => {
+    const managerCell = row.querySelector('.col-managers');
+    const emailCell = row.querySelector('.col-emails');
+    if (managerCell) managerCell.textContent = '…';
+    if (emailCell) emailCell.textContent = '…';
+  });
+
+  fetch(courseManagersUrl, { credentials: 'same-origin' })
+    .then(resp => (resp.ok ? resp.json() : {}))
+    .then(fillCourseManagers)
+    .catch(() => fillCourseManagers({}));
+}
+
+// ===== Page initialisation =====
+document.addEventListener('DOMContentLoaded', function () {
+  // 1. Collect course rows; manager / email columns are filled asynchronously
+  const courseRowsNodeList = document.querySelectorAll('#courseTableBody tr[data-course-id]');
+  allCourseRows = Array.from(courseRowsNodeList);
+  filteredCourseRows = allCourseRows.slice(); // initial: all rows
+
+  loadCourseManagers();
 
   // 2. Initially disable scan button (and keep log button faded)
   toggleScanButton();
@@ -233,14 +314,12 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   // Ensure overlay is hidden when page is loaded / reloaded
-  const overlay = document.getElementById('scanningOverlay');
-  if (overlay) overlay.style.display = 'none';
+  hideScanOverlay();
 
-  // 4. Show popup if we have scan results
-  if (hasScanResultPopup) {
-    renderScanResultFromRaw();
-    const popup = document.getElementById('scanResultPopup');
-    if (popup) popup.style.display = 'flex';
+  // 4. Follow the submitted scan job until its results are ready
+  if (scanJobId) {
+    showScanOverlay('Waiting in queue', 0);
+    pollScanJob();
   }
 
   // 5. Hide "no results" row initially (pagination will control it later)
@@ -1,9 +1,14 @@
+// Shared by the automatic (weekly) and manual (per course) log pages.
+// Rows come from the log API one page at a time; all filtering happens on the server.
 (function () {
-  const raw = document.getElementById('rawLog').value || '';
-  const tbody = document.querySelector('#logsTable tbody');
+  const apiUrl = window.scanLogApiUrl;
+  const scope  = window.scanLogScope || {};      // fixed by the page: scan_type + period or course_id
+  const csvName = window.scanLogCsvName || 'scanned_logs';
+
+  const tbody      = document.querySelector('#logsTable tbody');
   const emptyState = document.getElementById('emptyState');
 
-  const courseSelect = document.getElementById('courseSelect');
+  const courseSelect = document.getElementById('courseSelect');  // auto page only
   const labelFilter  = document.getElementById('labelFilter');
   const dateFrom     = document.getElementById('dateFrom');
   const dateTo       = document.getElementById('dateTo');
@@ -23,8 +28,12 @@
   const nextPageBtn        = document.getElementById('nextPageBtn');
 
   const rowsPerPage = 20;
+  // cursors[i] is the `after` value for page i+1 (null = first page)
+  let cursors = [null];
   let currentPage = 1;
-  let filteredRowsCache = [];
+  let nextAfter = null;
+  let totalRows = 0;
+  let requestSeq = 0;
 
   /* ---------- helpers: safe HTML + soft breaks ---------- */
   function escapeHtml(s) {
@@ -54,118 +63,53 @@
       .replaceAll('#', '#<wbr>');
   }
 
-  function toCSV(rows) {
-    const headers = ["course","exported","url","label","confidence","source","author"];
-    const esc = s => ('"'+(s??'').toString().replaceAll('"','""')+'"');
-    return [headers.join(","), ...rows.map(r => headers.map(h => esc(r[h])).join(","))].join("\n");
-  }
-  function download(name, text) {
-    const a = document.createElement('a');
-    a.href = URL.createObjectURL(new Blob([text], {type:'text/csv'}));
-    a.download = name; document.body.appendChild(a); a.click(); a.remove();
-  }
-
-  /* -------- Parse log text -------- */
-  const lines = raw.split(/\r?\n/);
-  let currentCourse = '';
-  let exportedOn = '';
-  let headerKeys = [];
-  let inCSV = false;
-  const rows = [];
-
-  function normalizeToFive(obj) {
-    const f = (obj.final_status || '').toLowerCase().trim();
-    const vt = (obj.vt_result || '').toLowerCase().trim();
-    const pred = (obj.pred_label || obj.label || '').toLowerCase().trim();
-
-    if (f) {
-      if (/\b(phish|phishing)\b/.test(f)) return 'phish';
-      if (/\badult\b/.test(f)) return 'adult';
-      if (/\b(malware|malicious|unsafe)\b/.test(f)) return 'malware';
-      if (/\b(suspicious)\b/.test(f)) return 'suspicious';
-      if (/\b(safe|benign|clean)\b/.test(f)) return 'benign';
-    }
-    if (vt) {
-      if (/\b(phish|phishing)\b/.test(vt)) return 'phish';
-      if (/\badult\b/.test(vt)) return 'adult';
-      if (/\b(malware|malicious|unsafe)\b/.test(vt)) return 'malware';
-      if (/\b(suspicious)\b/.test(vt)) return 'suspicious';
+  /* -------- Query string: page scope + current filters -------- */
+  function filterParams() {
+    const params = new URLSearchParams(scope);
+    if (courseSelect && courseSelect.value !== 'all') {
+      // value is "site:course id" — course ids are only unique within one Moodle site
+      const [instance, courseId] = courseSelect.value.split(':');
+      params.set('instance', instance);
+      params.set('course_id', courseId);
     }
-    if (/\b(phish|phishing)\b/.test(pred)) return 'phish';
-    if (/\badult\b/.test(pred)) return 'adult';
-    if (/\b(malware|malicious|unsafe)\b/.test(pred)) return 'malware';
-    if (/\b(suspicious|unknown)\b/.test(pred)) return 'suspicious';
-    if (/\b(safe|benign|clean)\b/.test(pred)) return 'benign';
-    return 'benign';
+    if (labelFilter.value !== 'all') params.set('label', labelFilter.value);
+    if (dateFrom.value) params.set('date_from', dateFrom.value);
+    if (dateTo.value)   params.set('date_to', dateTo.value);
+    if (confMin.value.trim())   params.set('conf_min', confMin.value.trim());
+    if (urlFilter.value.trim()) params.set('url', urlFilter.value.trim());
+    return params;
   }
 
-  function pushRow(obj) {
-    if (!obj.pred_label && obj._rawParts && obj._rawParts.length >= 1) {
-      const p = obj._rawParts.map(s => s.toLowerCase());
-      const maybeLabel = p.find(x => /benign|safe|suspicious|phish|phishing|malware|malicious|adult/.test(x));
-      const maybeConf  = p.slice().reverse().find(x => /^-?\d+(\.\d+)?$/.test(x)) || '';
-      if (maybeLabel) obj.pred_label = maybeLabel;
-      if (maybeConf)  obj.confidence = maybeConf;
-    }
-
-    const normalized = normalizeToFive(obj);
-    const exportedTS = exportedOn ? new Date(exportedOn.replace(' ', 'T')) : new Date(0);
-
-    rows.push({
-      course: currentCourse,
-      exported: exportedOn,
-      exportedTS,
-      url: obj.url || '',
-      label: normalized,
-      displayLabel: (obj.final_status || obj.vt_result || obj.pred_label || normalized).toUpperCase(),
-      confidence: (obj.confidence || '').trim(),
-      source: (obj.source || '').trim(),
-      author: (obj.author || obj.authorName || obj.authorusername || '').trim()
-    });
+  /* -------- Summary (first page of each filter change) -------- */
+  function updateSummary(summary) {
+    const n = key => summary[key] || 0;
+    summaryRow.classList.remove('d-none');
+    sumBenign.textContent     = n('benign');
+    sumSuspicious.textContent = n('suspicious');
+    sumPhish.textContent      = n('phish');
+    sumMalware.textContent    = n('malware');
+    sumAdult.textContent      = n('adult');
+    totalRows = Object.values(summary).reduce((a, b) => a + b, 0);
   }
 
-  for (let i=0; i<lines.length; i++) {
-    const line = lines[i].trim();
-    if (!line) continue;
-
-    if (line.startsWith('Course Name:')) { currentCourse = line.replace('Course Name:', '').trim(); continue; }
-    if (line.startsWith('Exported on:')) { exportedOn = line.replace('Exported on:', '').trim(); continue; }
-
-    if (/^url,/.test(line)) {
-      headerKeys = line.split(',').map(h => h.trim().toLowerCase());
-      inCSV = true; continue;
-    }
-
-    if (inCSV) {
-      if (line.startsWith('--- ') || /^Course Name:/.test(line) || /^Exported on:/.test(line)) {
-        inCSV = false; i--; continue;
-      }
-      const vals = line.split(',').map(v => v.trim());
-      const obj = {};
-      headerKeys.forEach((h, idx) => obj[h] = vals[idx] || '');
-      obj.author = obj.authorusername || obj.author || '';
-      obj.authorName = obj.authorname || '';
-      obj.authorusername = obj.authorusername || '';
-      pushRow(obj);
-      continue;
-    }
-
-    if (/^https?:\/\//i.test(line)) {
-      const parts = line.split(',').map(s => s.trim());
-      pushRow({ url: parts[0] || '', _rawParts: parts.slice(1) });
-    }
+  function fillCourses(courses) {
+    if (!courseSelect || courseSelect.options.length > 1) return;
+    const frag = document.createDocumentFragment();
+    const sites = new Set(courses.map(c => c.instance));
+    courses
+      .sort((a, b) => a.name.localeCompare(b.name))
+      .forEach(c => {
+        const opt = document.createElement('option');
+        opt.value = c.instance + ':' + c.id;
+        opt.textContent = sites.size > 1 ? c.name + ' (' + c.instance + ')' : c.name;
+        frag.appendChild(opt);
+      });
+    courseSelect.appendChild(frag);
   }
 
-  // newest first
-  rows.sort((a, b) => b.exportedTS - a.exportedTS);
-
-  /* -------- Render rows -------- */
-  if (!rows.length) {
-    emptyState.textContent = "No logs available.";
-    emptyState.classList.remove('d-none');
-  } else {
+  /* -------- Render one page -------- */
+  function renderRows(rows) {
     const frag = document.createDocumentFragment();
-
     rows.forEach(r => {
       const [dPart, tPart] = (r.exported || '').split(' ');
       let badgeClass = 'badge-benign';
@@ -175,164 +119,102 @@
       else if (r.label === 'adult')     { badgeClass = 'badge-adult'; }
 
       const tr = document.createElement('tr');
-      tr.setAttribute('data-label', r.label);
-      tr.dataset.ts   = String(r.exportedTS.getTime());
-      tr.dataset.conf = isNaN(parseFloat(r.confidence)) ? "" : String(parseFloat(r.confidence));
-      tr.dataset.courseFull = r.course || '';
-
       tr.innerHTML = `
-        <td>${softBreak(r.course)}</td>
+        ${courseSelect ? `<td>${softBreak(r.course)}</td>` : ''}
         <td class="exported-cell">
           <span class="date">${escapeHtml(dPart || '')}</span>
           <span class="time">${escapeHtml(tPart || '')}</span>
         </td>
         <td class="url-cell">${softBreakURL(r.url)}</td>
-        <td><span class="badge ${badgeClass} text-uppercase">${escapeHtml(r.displayLabel)}</span></td>
-        <td>${escapeHtml(r.confidence || '—')}</td>
+        <td><span class="badge ${badgeClass} text-uppercase">${escapeHtml(r.label)}</span></td>
+        <td>${escapeHtml(r.confidence ?? '—')}</td>
         <td>${softBreak(r.source || '—')}</td>
         <td>${softBreak(r.author || '—')}</td>
       `;
       frag.appendChild(tr);
     });
-    tbody.appendChild(frag);
-
-    // Populate course dropdown
-    const set = new Set();
-    Array.from(tbody.rows).forEach(r => set.add(r.dataset.courseFull));
-    const courses = Array.from(set).filter(Boolean).sort((a,b)=>a.localeCompare(b));
-    const fragOpts = document.createDocumentFragment();
-    courses.forEach(name => {
-      const opt = document.createElement('option');
-      opt.value = name;
-      opt.textContent = name;
-      fragOpts.appendChild(opt);
-    });
-    courseSelect.appendChild(fragOpts);
-
-    // Initial filters + summary + pagination
-    applyFilters(true);
+    tbody.replaceChildren(frag);
   }
 
-  /* -------- Summary update (uses filtered rows) -------- */
-  function updateSummary(rowsList) {
-    let cBen=0, cSus=0, cPhi=0, cMal=0, cAdult=0;
-
-    rowsList.forEach(r => {
-      const label = r.getAttribute('data-label');
-      if (label === 'suspicious') cSus++;
-      else if (label === 'phish') cPhi++;
-      else if (label === 'malware') cMal++;
-      else if (label === 'adult') cAdult++;
-      else cBen++;
-    });
-
-    summaryRow.classList.remove('d-none');
-    sumBenign.textContent     = cBen;
-    sumSuspicious.textContent = cSus;
-    sumPhish.textContent      = cPhi;
-    sumMalware.textContent    = cMal;
-    sumAdult.textContent      = cAdult;
+  function loadPage() {
+    const params = filterParams();
+    params.set('limit', rowsPerPage);
+    const after = cursors[currentPage - 1];
+    if (after !== null) params.set('after', after);
+
+    const seq = ++requestSeq;
+    fetch(`${apiUrl}?${params}`, { credentials: 'same-origin' })
+      .then(resp => resp.json())
+      .then(data => {
+        if (seq !== requestSeq) return;   // a newer filter change already went out
+        if (data.summary) updateSummary(data.summary);
+        if (data.courses) fillCourses(data.courses);
+
+        nextAfter = data.next_after;
+        renderRows(data.rows || []);
+
+        if (!totalRows) {
+          const filtered = filterParams().toString() !== new URLSearchParams(scope).toString();
+          emptyState.textContent = filtered ? "No logs match your filters." : "No logs available.";
+          emptyState.classList.remove('d-none');
+          paginationControls.classList.add('d-none');
+          return;
+        }
+        emptyState.classList.add('d-none');
+
+        const totalPages = Math.max(1, Math.ceil(totalRows / rowsPerPage));
+        paginationControls.classList.remove('d-none');
+        paginationInfo.textContent =
+          `Page ${currentPage} of ${totalPages} • Showing ${(data.rows || []).length} of ${totalRows} rows`;
+        prevPageBtn.disabled = currentPage <= 1;
+        nextPageBtn.disabled = nextAfter === null;
+      })
+      .catch(() => {
+        emptyState.textContent = "Could not load logs.";
+        emptyState.classList.remove('d-none');
+      });
   }
 
   /* -------- Filters + Pagination -------- */
-  function applyFilters(resetPage) {
-    if (resetPage) currentPage = 1;
-
-    const selectedCourse = courseSelect.value; // 'all' or exact course name
-    const lf = labelFilter.value;
-    const fromVal = dateFrom.value ? new Date(dateFrom.value + 'T00:00:00').getTime() : null;
-    const toVal   = dateTo.value   ? (new Date(dateTo.value + 'T00:00:00').getTime() + 86400000 - 1) : null;
-    const minRaw  = confMin.value.trim();
-    const minConf = minRaw ? parseFloat(minRaw) : null;
-    const urlQuery = urlFilter.value.trim().toLowerCase();
-
-    const allRowsDom = Array.from(tbody.rows);
-    filteredRowsCache = [];
-
-    allRowsDom.forEach(row => {
-      const matchCourse = (selectedCourse === 'all') ? true : (row.dataset.courseFull === selectedCourse);
-      const matchesLabel  = (lf === 'all') ? true : row.getAttribute('data-label') === lf;
-      const rowTs         = parseInt(row.dataset.ts || '0', 10);
-      const rowConf       = parseFloat(row.dataset.conf || 'NaN');
-
-      const matchFrom = (fromVal === null) ? true : (rowTs >= fromVal);
-      const matchTo   = (toVal   === null) ? true : (rowTs <= toVal);
-      const matchConf = (minConf === null || isNaN(minConf)) ? true : (!isNaN(rowConf) && rowConf >= minConf);
-
-      const urlText = (row.cells[2]?.innerText || '').toLowerCase();
-      const matchUrl = urlQuery ? urlText.includes(urlQuery) : true;
-
-      const matches = matchCourse && matchesLabel && matchFrom && matchTo && matchConf && matchUrl;
-
-      row.style.display = 'none'; // hide first; we'll show selected after
-      if (matches) filteredRowsCache.push(row);
-    });
-
-    const total = filteredRowsCache.length;
-
-    // update top summary for CURRENT FILTERED rows
-    updateSummary(filteredRowsCache);
-
-    if (!total) {
-      emptyState.textContent = "No logs match your filters.";
-      emptyState.classList.remove('d-none');
-      if (paginationControls) paginationControls.classList.add('d-none');
-      return;
-    } else {
-      emptyState.classList.add('d-none');
-    }
-
-    const totalPages = Math.max(1, Math.ceil(total / rowsPerPage));
-    if (currentPage > totalPages) currentPage = totalPages;
-
-    const startIdx = (currentPage - 1) * rowsPerPage;
-    const endIdx   = Math.min(startIdx + rowsPerPage, total);
-
-    filteredRowsCache.slice(startIdx, endIdx).forEach(row => {
-      row.style.display = '';
-    });
-
-    if (paginationControls) {
-      paginationControls.classList.remove('d-none');
-      paginationInfo.textContent = `Page ${currentPage} of ${totalPages} • Showing ${endIdx - startIdx} of ${total} rows`;
-      prevPageBtn.disabled = currentPage <= 1;
-      nextPageBtn.disabled = currentPage >= totalPages;
-    }
+  let debounce = null;
+  function applyFilters() {
+    cursors = [null];
+    currentPage = 1;
+    loadPage();
+  }
+  function applyFiltersSoon() {
+    clearTimeout(debounce);
+    debounce = setTimeout(applyFilters, 300);
   }
 
-  [courseSelect, labelFilter, dateFrom, dateTo].forEach(el =>
-    el.addEventListener('change', () => applyFilters(true))
+  [courseSelect, labelFilter, dateFrom, dateTo].filter(Boolean).forEach(el =>
+    el.addEventListener('change', applyFilters)
   );
-  confMin.addEventListener('input', () => applyFilters(true));
-  urlFilter.addEventListener('input', () => applyFilters(true));
+  confMin.addEventListener('input', applyFiltersSoon);
+  urlFilter.addEventListener('input', applyFiltersSoon);
 
-  if (prevPageBtn && nextPageBtn) {
-    prevPageBtn.addEventListener('click', () => {
-      if (currentPage > 1) {
-        currentPage--;
-        applyFilters(false);
-      }
-    });
-    nextPageBtn.addEventListener('click', () => {
-      currentPage++;
-      applyFilters(false);
-    });
-  }
+  prevPageBtn.addEventListener('click', () => {
+    if (currentPage > 1) {
+      currentPage--;
+      loadPage();
+    }
+  });
+  nextPageBtn.addEventListener('click', () => {
+    if (nextAfter === null) return;
+    cursors[currentPage] = nextAfter;
+    currentPage++;
+    loadPage();
+  });
 
-  // CSV (all filtered rows, ignoring pagination)
+  // CSV: every filtered row, streamed by the server
   document.getElementById('downloadBtn').addEventListener('click', function () {
-    const baseRows = filteredRowsCache.length ? filteredRowsCache : Array.from(tbody.rows);
-    const data = baseRows.map(r => ({
-      course: r.cells[0].innerText.trim(),
-      exported: (r.querySelector('.exported-cell .date')?.innerText || '') + ' ' +
-                (r.querySelector('.exported-cell .time')?.innerText || ''),
-      url: r.cells[2].innerText.trim(),
-      label: r.cells[3].innerText.trim(),
-      confidence: r.cells[4].innerText.trim(),
-      source: r.cells[5].innerText.trim(),
-      author: r.cells[6].innerText.trim(),
-    }));
-    const stamp = new Date().toISOString().slice(0,10);
-    download(`scanned_logs_${stamp}.csv`, toCSV(data));
+    const params = filterParams();
+    params.set('format', 'csv');
+    const a = document.createElement('a');
+    a.href = `${apiUrl}?${params}`;
+    a.download = `${csvName}_${new Date().toISOString().slice(0,10)}.csv`;
+    document.body.appendChild(a); a.click(); a.remove();
   });
+
+  loadPage();
 })();
@@ -1,3 +1,753 @@
-from django.test import TestCase
+import io
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from multiprocessing.connection import Listener
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from scraperSite.models import (
+    ScanReport, ScanOutput, UnsafeURL, ScanJob, ScanWorker, CourseWeekSummary, WeeklyUnsafeCount, Watermark,
+    ScheduledTask, ScanRun, ScanRunCourse, finalised_q,
+)
+from scraperSite.views import filter_by_course_and_date
+from scraperSite.management.helpers import (
+    URL_scanner_helper, adaptive_scan_helper, allowlist_helper, export_helper, live_scan_helper, scan_queue_helper, scan_run_helper,
+    scanner_client, scanner_daemon_helper, scheduler_helper,
+)
+from scraperSite.management.helpers.URL_collector_helper import extract_urls_from_html, extract_urls_from_text
+from scraperSite.management.helpers.content_sources_helper import SOURCES, available_sources, forget_source_tables
+from scraperSite.management.helpers.domain_blocklist_helper import DomainBlocklist, LABEL_CODES
+from scraperSite.management.helpers.export_helper import export_querysets, write_xlsx
+from scraperSite.management.helpers.report_summary_helper import record_report_summary
+
+
+class HtmlUrlExtractionTests(SimpleTestCase):
+    # Query strings whose parameter names are also legacy entity names without a ";"
+    URL = "https://x.com/a?id=1&lang=en&copy=2&not=3&reg=4"
+
+    def test_plain_text_is_not_entity_decoded(self):
+        self.assertEqual(extract_urls_from_html(f"see {self.URL} now"), [self.URL])
+        self.assertEqual(extract_urls_from_html(self.URL), [self.URL])
+
+    def test_bare_ampersands_stay_literal_in_markup(self):
+        html = f'<p><a href="{self.URL}">link</a> and {self.URL.replace("x.com", "y.com")}</p>'
+        self.assertEqual(
+            extract_urls_from_html(html),
+            [self.URL, self.URL.replace("x.com", "y.com")],
+        )
+
+    def test_terminated_entities_are_decoded(self):
+        html = '<a href="https://x.com/a?id=1&amp;lang=en&#38;copy=2">x</a>'
+        self.assertEqual(extract_urls_from_html(html), ["https://x.com/a?id=1&lang=en&copy=2"])
+
+    def test_relative_links_need_a_base(self):
+        html = '<a href="/mod/page/view.php?id=3">p</a><a href="//cdn.example.org/x.js">c</a><a href="#top">t</a>'
+        self.assertEqual(extract_urls_from_html(html), ["https://cdn.example.org/x.js"])
+        self.assertEqual(
+            extract_urls_from_html(html, "https://moodle.example.edu/"),
+            ["https://moodle.example.edu/mod/page/view.php?id=3", "https://cdn.example.org/x.js"],
+        )
+
+    def test_plain_text_sources_use_the_regex(self):
+        kinds = {source.name: source.kind for source in SOURCES}
+        for name in ("url", "forum_discussion", "chat_message"):
+            self.assertEqual(kinds[name], "text")
+        self.assertEqual(extract_urls_from_text(self.URL), [self.URL])
+
+    def test_source_tables_are_read_once_per_alias(self):
+        tables = sorted({t for s in SOURCES for t in s.tables})
+        introspection = connection.introspection
+        self.addCleanup(forget_source_tables)
+        forget_source_tables()
+        with mock.patch.object(introspection, "table_names", return_value=tables) as table_names:
+            self.assertEqual(available_sources("default"), SOURCES)
+            self.assertEqual(available_sources("default"), SOURCES)
+            self.assertEqual(table_names.call_count, 1)
+            forget_source_tables("default")
+            available_sources("default")
+            self.assertEqual(table_names.call_count, 2)
+
+
+class TempWorkingDirMixin:
+    """
+    Run each test in a fresh temporary working directory: scans, exports and the daemon write
+    under url_details/ relative to it, and nothing may be left in the checkout.
+    """
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        self.tmp_dir = tmp.name
+
+
+class PartialReportTests(TempWorkingDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.input_file = os.path.join(self.tmp_dir, "auto_7_scanner_input.txt")
+        with open(self.input_file, "w") as f:
+            f.write("url\n")
+
+    STATUSES = ("benign", "malware", "phish")
+
+    def chunks(self, *args, **kwargs):
+        for i, status in enumerate(self.STATUSES):
+            row = {col: f"https://example.com/{i}" if col == "url" else "x" for col in URL_scanner_helper.EXPORT_COLS}
+            row.update(final_status=status, source="forum_post", confidence=0.9, moodle_url_id=1)
+            yield pd.DataFrame([{**row, "courseID": "7", "courseName": "Course 7"}])
+
+    def scan(self, progress=None):
+        with mock.patch.object(URL_scanner_helper, "load_ai_model"), \
+                mock.patch.object(URL_scanner_helper, "load_allowlist"), \
+                mock.patch.object(URL_scanner_helper, "iter_classified_chunks", self.chunks):
+            return URL_scanner_helper.scan_from_file(self.input_file, progress=progress)
+
+    def test_completed_scan_is_finalised(self):
+        report = self.scan()
+        self.assertTrue(report.finalised)
+
+    def test_aborted_scan_leaves_no_report(self):
+        def progress(done):
+            if done == 2:
+                raise RuntimeError("lease lost")
+
+        with self.assertRaises(RuntimeError):
+            self.scan(progress)
+        self.assertFalse(ScanReport.objects.exists())
+
+    def test_summaries_match_the_report(self):
+        report = self.scan()
+        self.assertEqual((report.total_link, report.safe_link, report.malicious), (3, 1, 2))
+        week = CourseWeekSummary.objects.get(moodle_courseID=7)
+        self.assertEqual((week.reports, week.total_link, week.safe_link, week.malicious), (1, 3, 1, 2))
+        self.assertEqual(sum(WeeklyUnsafeCount.objects.values_list("count", flat=True)),
+                         UnsafeURL.objects.filter(report=report).count())
+        output = ScanOutput.objects.get(report=report)
+        self.assertEqual((output.total_link, output.malicious), (3, 2))
+
+    def test_failed_finalise_records_nothing(self):
+        def crash(report):
+            record_report_summary(report)
+            raise RuntimeError("killed while finalising")
+
+        with mock.patch.object(URL_scanner_helper, "record_report_summary", side_effect=crash), \
+                self.assertRaises(RuntimeError):
+            self.scan()
+        self.assertFalse(ScanReport.objects.exists())
+        self.assertFalse(CourseWeekSummary.objects.exists())
+        self.assertFalse(WeeklyUnsafeCount.objects.exists())
+        self.assertFalse(ScanOutput.objects.exists())
+
+
+@override_settings(ADAPTIVE_SCAN_BUDGET=40, ADAPTIVE_SCAN_CHANGED_SHARE=0.5, ADAPTIVE_SCAN_MAX_AGE_DAYS=28)
+class AdaptivePlanTests(SimpleTestCase):
+    def plan(self, overdue, changed):
+        now = timezone.now()
+        courses = [SimpleNamespace(id=i) for i in range(overdue + changed)]
+        checked = {i: now - timedelta(days=60) for i in range(overdue)}
+        checked.update({i: now - timedelta(days=2) for i in range(overdue, overdue + changed)})
+        activity = {i: {"forum_post": i} for i in range(overdue, overdue + changed)}
+        with mock.patch.object(adaptive_scan_helper, "last_checked_by_course", return_value=checked), \
+                mock.patch.object(adaptive_scan_helper, "recent_unsafe_by_course", return_value={}), \
+                mock.patch.object(adaptive_scan_helper, "course_activity_since", return_value=activity):
+            plans = adaptive_scan_helper.plan_course_scans(courses, now=now)
+        queued = {p.course.id for p in plans if p.queued}
+        return queued, set(range(overdue)), set(range(overdue, overdue + changed))
+
+    def test_changed_courses_are_not_starved_by_overdue_ones(self):
+        queued, due, changed = self.plan(overdue=100, changed=10)
+        self.assertEqual(len(queued), 40)
+        self.assertTrue(changed <= queued)
+        self.assertEqual(len(queued & due), 30)
+
+    def test_reserved_share_goes_to_the_busiest_changed_courses(self):
+        queued, due, changed = self.plan(overdue=100, changed=50)
+        self.assertEqual(len(queued & changed), 20)
+        self.assertEqual(len(queued & due), 20)
+        self.assertEqual(queued & changed, set(range(130, 150)))
+
+    def test_unused_share_goes_to_overdue_courses(self):
+        queued, due, changed = self.plan(overdue=100, changed=0)
+        self.assertEqual(len(queued), 40)
+
+    def test_unused_due_budget_goes_to_changed_courses(self):
+        queued, due, changed = self.plan(overdue=5, changed=50)
+        self.assertEqual(len(queued), 40)
+        self.assertTrue(due <= queued)
+
+    def test_every_content_source_counts_as_activity(self):
+        self.assertEqual([s.name for s in SOURCES if not s.activity_sql], [])
+
+    def test_edits_outside_posts_count_as_changes(self):
+        now = timezone.now()
+        course = SimpleNamespace(id=1)
+        with mock.patch.object(adaptive_scan_helper, "last_checked_by_course", return_value={1: now - timedelta(days=2)}), \
+                mock.patch.object(adaptive_scan_helper, "recent_unsafe_by_course", return_value={}), \
+                mock.patch.object(adaptive_scan_helper, "course_activity_since",
+                                  return_value={1: {"page": 1, "book": 2}}):
+            plan, = adaptive_scan_helper.plan_course_scans([course], now=now)
+        self.assertTrue(plan.queued)
+        self.assertEqual(plan.reason, "3 new item(s)")
+
+
+@override_settings(REPORTING_API_TOKENS=["tool-token"])
+class ReportingApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        day = timezone.now().date()
+        for course_id in range(1, 51):
+            report = ScanReport.objects.create(
+                date=day - timedelta(days=course_id), total_link=2, safe_link=1, suspicious=1, malicious=0,
+                moodle_courseID=course_id, moodle_courseName=f"Course {course_id}", all_url="", finalised=True,
+            )
+            UnsafeURL.objects.create(url=f"https://bad{course_id}.example/x", moodle_userID=1,
+                                     status="phish", source="forum_post", report=report)
+
+    def plan(self, queryset):
+        # Tiny tables are cheapest to read whole; take that option away so the plan shows which index is usable
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def test_course_filter_uses_course_index(self):
+        reports = filter_by_course_and_date(ScanReport.objects.filter(finalised_q()), {"course_id": "7"})
+        self.assertIn("scanreport_course_idx", self.plan(reports.order_by("report_id")))
+
+    def test_date_filter_uses_date_index(self):
+        day = timezone.now().date()
+        reports = filter_by_course_and_date(ScanReport.objects.filter(finalised_q()), {
+            "date_from": (day - timedelta(days=10)).isoformat(), "date_to": day.isoformat(),
+        })
+        self.assertIn("scanreport_date_idx", self.plan(reports.order_by("report_id")))
+
+    def test_url_lookup_uses_url_index(self):
+        unsafe = UnsafeURL.objects.filter(finalised_q("report__"), url="https://bad7.example/x")
+        self.assertIn("unsafeurl_url_idx", self.plan(unsafe.order_by("url_id")))
+
+    def test_status_filter_uses_status_index(self):
+        unsafe = UnsafeURL.objects.filter(status="phish", check_status="not safe")
+        self.assertIn("unsafeurl_status_idx", self.plan(unsafe.order_by("url_id")))
+
+    def test_bearer_token(self):
+        url = reverse("api_reports") + "?course_id=7"
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong-token").status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer t\u00f6ken").status_code, 401)
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer tool-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["course_id"] for r in response.json()["results"]], [7])
+
+
+@override_settings(SCAN_LEASE_SECONDS=300, SCAN_JOB_MAX_ATTEMPTS=3)
+class ScanQueueTests(TempWorkingDirMixin, TestCase):
+    def expire(self, job, **fields):
+        ScanJob.objects.filter(pk=job.pk).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1), **fields)
+
+    def test_enqueue_is_single_flight(self):
+        job, created = scan_queue_helper.enqueue_scan_job(5)
+        again, created_again = scan_queue_helper.enqueue_scan_job(5, scan_type="manual")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.priority, ScanJob.PRIORITY_MANUAL)
+        _, other_site = scan_queue_helper.enqueue_scan_job(5, instance="moodle2")
+        self.assertTrue(other_site)
+
+    def test_claim_takes_most_urgent_and_leases_it(self):
+        batch, _ = scan_queue_helper.enqueue_scan_job(1)
+        manual, _ = scan_queue_helper.enqueue_scan_job(2, scan_type="manual")
+        job = scan_queue_helper.claim_next_job("node-a")
+        self.assertEqual(job.pk, manual.pk)
+        self.assertEqual((job.status, job.lease_owner, job.attempts), ("running", "node-a", 1))
+        self.assertGreater(job.lease_expires_at, timezone.now())
+        self.assertEqual(scan_queue_helper.claim_next_job("node-b").pk, batch.pk)
+        self.assertIsNone(scan_queue_helper.claim_next_job("node-c"))
+
+    def test_expired_or_missing_lease_is_reclaimed(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        scan_queue_helper.claim_next_job("node-a")
+        self.expire(job)
+        self.assertEqual(scan_queue_helper.claim_next_job("node-b").lease_owner, "node-b")
+        # Left "running" before leases existed
+        ScanJob.objects.filter(pk=job.pk).update(lease_expires_at=None)
+        self.assertEqual(scan_queue_helper.claim_next_job("node-c").attempts, 3)
+
+    def test_job_fails_after_max_attempts(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        scan_queue_helper.claim_next_job("node-a")
+        self.expire(job, attempts=3)
+        self.assertIsNone(scan_queue_helper.claim_next_job("node-b"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_start_job_respects_live_leases(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        self.assertTrue(scan_queue_helper.start_job(job, "node-a"))
+        self.assertFalse(scan_queue_helper.start_job(job, "node-b"))
+        ScanJob.objects.filter(pk=job.pk).update(lease_expires_at=None)
+        self.assertTrue(scan_queue_helper.start_job(job, "node-b"))
+        self.expire(job, attempts=3)
+        self.assertFalse(scan_queue_helper.start_job(job, "node-c"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_lease_is_lost_once_taken_over(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        job = scan_queue_helper.claim_next_job("node-a")
+        lease = scan_queue_helper.JobLease(job)
+        self.assertTrue(lease.renew())
+        self.expire(job)
+        scan_queue_helper.claim_next_job("node-b")
+        self.assertFalse(lease.renew())
+        lease.lost.set()
+        with self.assertRaises(scan_queue_helper.LeaseLost):
+            lease.check()
+
+    def test_worker_busy_with_a_long_job_stays_online(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        job = scan_queue_helper.claim_next_job("node-a")
+        scan_queue_helper.check_in("node-a")
+        ScanWorker.objects.filter(name="node-a").update(last_seen=timezone.now() - timedelta(minutes=30))
+        self.assertFalse(scan_queue_helper.workers_online())
+        self.assertTrue(scan_queue_helper.JobLease(job, worker="node-a").heartbeat())
+        self.assertTrue(scan_queue_helper.workers_online())
+
+    def test_wait_takes_over_a_job_whose_worker_died(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        scan_queue_helper.claim_next_job("dead-node")
+        self.expire(job)
+
+        def run(leased):
+            self.assertNotEqual(leased.lease_owner, "dead-node")
+            scan_queue_helper.update_job(leased, status="done", stage="finished")
+
+        with mock.patch.object(scan_queue_helper, "run_leased_job", side_effect=run):
+            job = scan_queue_helper.wait_for_job(job, poll_interval=0, run_here=True, timeout=5)
+        self.assertEqual(job.status, "done")
+
+    def test_wait_leaves_the_job_to_the_workers(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        with mock.patch.object(scan_queue_helper, "scan_service_available", return_value=False), \
+                mock.patch.object(scan_queue_helper, "run_leased_job") as run:
+            job = scan_queue_helper.wait_for_job(job, poll_interval=0, timeout=0)
+        run.assert_not_called()
+        self.assertEqual(job.status, "failed")
+
+    def test_stale_owner_cannot_overwrite_the_new_run(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        stale = scan_queue_helper.claim_next_job("node-a")
+        self.assertTrue(scan_queue_helper.update_job(stale, progress=50))
+        self.expire(job)
+        scan_queue_helper.claim_next_job("node-b")
+        self.assertFalse(scan_queue_helper.update_job(stale, status="failed", error="boom"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.lease_owner, job.error), ("running", "node-b", ""))
+
+    def test_lost_lease_stops_the_scan(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        stale = scan_queue_helper.claim_next_job("node-a")
+        self.expire(job)
+        scan_queue_helper.claim_next_job("node-b")
+        course = SimpleNamespace(id=1, fullname="Course 1")
+        with mock.patch.object(scan_queue_helper.MoodleCourse.objects, "using") as using, \
+                mock.patch("scraperSite.management.helpers.URL_collector_helper.course_content_fingerprint",
+                           return_value="fp"), \
+                mock.patch("scraperSite.management.helpers.URL_collector_helper.export_course_urls") as export:
+            using.return_value.get.return_value = course
+            scan_queue_helper.run_scan_job(stale)
+        export.assert_not_called()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.lease_owner), ("running", "node-b"))
+
+    def scan_course(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1, reuse_unchanged=True)
+        job = scan_queue_helper.claim_next_job("node-a")
+        course = SimpleNamespace(id=1, fullname="Course 1")
+        with mock.patch.object(scan_queue_helper.MoodleCourse.objects, "using") as using, \
+                mock.patch("scraperSite.management.helpers.URL_collector_helper.course_content_fingerprint",
+                           return_value="fp"), \
+                mock.patch("scraperSite.management.helpers.URL_collector_helper.export_course_urls",
+                           return_value=os.path.join(self.tmp_dir, "input.txt")) as export, \
+                mock.patch.object(URL_scanner_helper, "scan_from_file", return_value=None):
+            using.return_value.get.return_value = course
+            with open(os.path.join(self.tmp_dir, "input.txt"), "w") as f:
+                f.write("url\n")
+            scan_queue_helper.run_scan_job(job)
+        job.refresh_from_db()
+        return job, export.called
+
+    def test_blocklist_or_review_change_forces_a_rescan(self):
+        blocklist = os.path.join(self.tmp_dir, "blocklist.pkl")
+        with open(blocklist, "w") as f:
+            f.write("v1")
+        with mock.patch.object(URL_scanner_helper, "BLOCKLIST_PATH", blocklist):
+            prior = ScanReport.objects.create(
+                date=timezone.now().date(), total_link=0, safe_link=0, suspicious=0, malicious=0,
+                moodle_courseID=1, moodle_courseName="Course 1", all_url="", finalised=True,
+                content_fingerprint="fp", model_version=URL_scanner_helper.scanner_version(),
+            )
+            job, rescanned = self.scan_course()
+            self.assertEqual((job.report_id, rescanned), (prior.pk, False))
+
+            with open(blocklist, "w") as f:
+                f.write("v2")
+            os.utime(blocklist, ns=(0, os.stat(blocklist).st_mtime_ns + 1))
+            job, rescanned = self.scan_course()
+            self.assertTrue(rescanned)
+
+            ScanReport.objects.filter(pk=prior.pk).update(model_version=URL_scanner_helper.scanner_version())
+            self.assertEqual(self.scan_course()[0].report_id, prior.pk)
+            allowlist_helper.allowlist_changed()
+            self.assertTrue(self.scan_course()[1])
+
+    def test_wait_times_out(self):
+        job, _ = scan_queue_helper.enqueue_scan_job(1)
+        scan_queue_helper.claim_next_job("busy-node")
+        job = scan_queue_helper.wait_for_job(job, poll_interval=0, run_here=True, timeout=0)
+        self.assertEqual(job.status, "failed")
+        self.assertIn("busy-node", job.error)
+
+
+@override_settings(
+    REPORTING_API_TOKENS=["tool-token"],
+    MOODLE_INSTANCES=[{"name": "moodle", "alias": "moodle", "filedir": ""},
+                      {"name": "moodle2", "alias": "moodle2", "filedir": ""}],
+)
+class MultiSiteReportTests(TestCase):
+    """Course 42 exists on both sites; nothing downstream of the report may merge them."""
+    def setUp(self):
+        for instance, malicious in (("moodle", 1), ("moodle2", 2)):
+            report = ScanReport.objects.create(
+                date=timezone.now().date(), total_link=5, safe_link=5 - malicious, suspicious=0, malicious=malicious,
+                moodle_courseID=42, moodle_courseName=f"Course 42 on {instance}", instance=instance,
+                all_url="", finalised=True,
+            )
+            UnsafeURL.objects.create(url=f"https://{instance}.bad.example/", moodle_userID=1,
+                                     status="malware", source="forum_post", report=report)
+            record_report_summary(report)
+
+    def test_course_week_summary_is_per_site(self):
+        rows = dict(CourseWeekSummary.objects.filter(moodle_courseID=42).values_list("instance", "malicious"))
+        self.assertEqual(rows, {"moodle": 1, "moodle2": 2})
+
+    def test_api_course_filter_is_per_site(self):
+        auth = {"HTTP_AUTHORIZATION": "Bearer tool-token"}
+        primary = self.client.get(reverse("api_reports") + "?course_id=42", **auth).json()["results"]
+        self.assertEqual([(r["instance"], r["malicious"]) for r in primary], [("moodle", 1)])
+        other = self.client.get(reverse("api_unsafe_urls") + "?course_id=42&instance=moodle2", **auth).json()
+        self.assertEqual([(r["instance"], r["url"]) for r in other["results"]],
+                         [("moodle2", "https://moodle2.bad.example/")])
+
+    def test_export_course_filter_is_per_site(self):
+        unsafe, _ = export_querysets(course_id=42)
+        self.assertEqual([u.report.instance for u in unsafe], ["moodle"])
+        unsafe, _ = export_querysets(course_id=42, instance="moodle2")
+        self.assertEqual([u.report.instance for u in unsafe], ["moodle2"])
+
+
+class ExportTests(TempWorkingDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.report = ScanReport.objects.create(
+            date=now.date(), total_link=1, safe_link=0, suspicious=0, malicious=1,
+            moodle_courseID=7, moodle_courseName="Course 7", all_url="", finalised=True,
+        )
+        for n in (1, 2):
+            ScanOutput.objects.create(report=self.report, moodle_courseID=7, moodle_courseName="Course 7",
+                                      scan_type="manual", scanned_at=now, path=f"url_details/7/{n}.csv")
+        UnsafeURL.objects.create(url="https://bad.example/", moodle_userID=1, status="malware",
+                                 source="forum_post", report=self.report)
+
+    def test_report_with_several_outputs_exports_each_url_once(self):
+        unsafe, _ = export_querysets(scan_type="manual")
+        self.assertEqual([u.url for u in unsafe], ["https://bad.example/"])
+
+    def test_xlsx_rolls_over_to_a_new_sheet_at_the_row_limit(self):
+        target = io.BytesIO()
+        with mock.patch.object(export_helper, "XLSX_MAX_ROWS", 3):
+            written = write_xlsx(target, [("Unsafe URLs", ["n"], ([n] for n in range(5))),
+                                          ("Scan results", ["n"], iter(()))])
+        self.assertEqual(written, 5)
+        with zipfile.ZipFile(target) as book:
+            names = re.findall(r'<sheet name="([^"]+)"', book.read("xl/workbook.xml").decode())
+            rows = [book.read(f"xl/worksheets/sheet{n}.xml").decode().count("<row ") for n in (1, 2, 3, 4)]
+        self.assertEqual(names, ["Unsafe URLs", "Unsafe URLs (2)", "Unsafe URLs (3)", "Scan results"])
+        self.assertEqual(rows, [3, 3, 2, 1])
+
+
+class MirrorReconcileTests(SimpleTestCase):
+    @override_settings(MOODLE_READ_FROM_MIRROR=False)
+    def test_reconcile_is_skipped_while_mirror_reads_are_off(self):
+        with mock.patch.object(scheduler_helper, "sync_mirror") as sync:
+            message = scheduler_helper.reconcile_moodle_mirror()
+        sync.assert_not_called()
+        self.assertIn("off", message)
+
+    @override_settings(MOODLE_READ_FROM_MIRROR=True)
+    def test_reconcile_runs_while_mirror_reads_are_on(self):
+        with mock.patch.object(scheduler_helper, "sync_mirror", return_value={"mdl_course": (2, 1)}) as sync:
+            message = scheduler_helper.reconcile_moodle_mirror()
+        sync.assert_called_once()
+        self.assertEqual(message, "Mirrored 1 table(s): 2 row(s) copied, 1 deleted")
+
+
+class ScannerClientTests(SimpleTestCase):
+    """A misbehaving daemon must surface as one of the client's two errors, never a raw socket error."""
+    def serve_once(self, authkey, handle):
+        listener = Listener(("127.0.0.1", 0), authkey=authkey)
+        self.addCleanup(listener.close)
+
+        def serve():
+            try:
+                with listener.accept() as conn:
+                    handle(conn)
+            except Exception:
+                pass
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        return override_settings(SCANNER_DAEMON_HOST="127.0.0.1", SCANNER_DAEMON_PORT=listener.address[1],
+                                 SCANNER_DAEMON_AUTHKEY="client-key")
+
+    def test_wrong_authkey_means_unavailable(self):
+        with self.serve_once(b"other-key", lambda conn: None):
+            with self.assertRaises(scanner_client.ScannerDaemonUnavailable):
+                scanner_client.submit_scan_job({"op": "ping"})
+
+    def test_connection_dropped_mid_job_fails_the_job(self):
+        with self.serve_once(b"client-key", lambda conn: conn.recv()):
+            with self.assertRaises(scanner_client.ScanJobFailed):
+                scanner_client.submit_scan_job({"op": "ping"})
+
+    def test_daemon_is_running_survives_a_dropped_connection(self):
+        with self.serve_once(b"client-key", lambda conn: conn.recv()):
+            self.assertFalse(scanner_client.daemon_is_running())
+
+    @override_settings(SCANNER_DAEMON_AUTHKEY="")
+    def test_no_authkey_means_no_daemon(self):
+        with self.assertRaises(scanner_client.ScannerDaemonUnavailable):
+            scanner_client.submit_scan_job({"op": "ping"})
+        with mock.patch.object(scanner_daemon_helper, "warm_up") as warm_up, \
+                self.assertRaises(ImproperlyConfigured):
+            scanner_daemon_helper.serve()
+        warm_up.assert_not_called()
+
+
+class ScannerDaemonTests(TempWorkingDirMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs("url_details/2026-10-19")
+        with open("secret.txt", "w") as f:
+            f.write("url\n")
+
+    def test_scan_file_outside_url_details_is_refused(self):
+        with mock.patch.object(scanner_daemon_helper, "scan_from_file") as scan:
+            for path in ("secret.txt", os.path.abspath("secret.txt"), "url_details/../secret.txt",
+                         "url_details/2026-10-19/../../secret.txt", "url_details"):
+                result = scanner_daemon_helper.handle_job({"op": "scan_file", "file": path})
+                self.assertFalse(result["ok"])
+                self.assertIn("url_details/", result["error"])
+        scan.assert_not_called()
+        self.assertTrue(os.path.exists("secret.txt"))
+
+    def test_scan_file_under_url_details_is_scanned(self):
+        path = "url_details/2026-10-19/auto_7_scanner_input.txt"
+        with mock.patch.object(scanner_daemon_helper, "scan_from_file", return_value=None) as scan:
+            self.assertTrue(scanner_daemon_helper.handle_job({"op": "scan_file", "file": path})["ok"])
+        scan.assert_called_once_with(os.path.realpath(path))
+
+
+class DomainBlocklistTests(SimpleTestCase):
+    def test_most_specific_entry_wins(self):
+        blocklist = DomainBlocklist.build(
+            domains=[("example.com", "adult"), ("files.example.com", "malware")],
+            urls=[("https://files.example.com/login", "phish")],
+        )
+        codes = blocklist.match_urls([
+            "https://files.example.com/login",
+            "https://files.example.com/other",
+            "https://www.example.com/",
+            "https://unlisted.org/",
+        ])
+        self.assertEqual(list(codes), [LABEL_CODES["phish"], LABEL_CODES["malware"], LABEL_CODES["adult"], 0])
+
+
+@override_settings(SCANNER_TRUSTED_DOMAINS=["trusted.example"])
+class AllowlistTests(TestCase):
+    def setUp(self):
+        allowlist_helper._allowlist_cache.clear()
+        report = ScanReport.objects.create(
+            date=timezone.now().date(), total_link=1, safe_link=0, suspicious=0, malicious=1,
+            moodle_courseID=1, moodle_courseName="Course 1", all_url="", finalised=True,
+        )
+        self.unsafe = UnsafeURL.objects.create(url="https://reviewed.example/page", moodle_userID=1,
+                                               status="phish", source="forum_post", report=report)
+
+    def review(self, check_status):
+        self.unsafe.check_status = check_status
+        self.unsafe.save()
+
+    def test_cached_until_a_review_changes(self):
+        first = allowlist_helper.load_allowlist()
+        with self.assertNumQueries(1):
+            self.assertIs(allowlist_helper.load_allowlist(), first)
+        self.assertFalse(first.is_allowed("https://reviewed.example/page"))
+
+        self.review("safe")
+        self.assertTrue(allowlist_helper.load_allowlist().is_allowed("https://reviewed.example/page"))
+        self.review("not safe")
+        self.assertFalse(allowlist_helper.load_allowlist().is_allowed("https://reviewed.example/page"))
+
+    def test_a_review_in_another_process_is_seen(self):
+        allowlist_helper.load_allowlist()
+        # Another process bumps the shared version; this process's cache is left as it was
+        Watermark.objects.update_or_create(name=allowlist_helper.ALLOWLIST_MARK, defaults={"position": 99})
+        UnsafeURL.objects.filter(pk=self.unsafe.pk).update(check_status="safe")
+        self.assertTrue(allowlist_helper.load_allowlist().is_allowed("https://reviewed.example/page"))
+
+    def test_allowlist_is_checked_before_blocklist_and_model(self):
+        self.review("safe")
+        blocklist = DomainBlocklist.build(domains=[("reviewed.example", "phish"), ("trusted.example", "malware")])
+        clf = mock.Mock(classes_=np.array([0, 1]))
+        clf.predict_proba.return_value = np.array([[0.1, 0.9]])
+        chunk = pd.DataFrame({"url": [
+            "https://reviewed.example/page", "https://docs.trusted.example/a", "https://unknown.example/",
+        ]})
+        with mock.patch.object(URL_scanner_helper, "get_blocklist", return_value=blocklist):
+            out = URL_scanner_helper.classify_chunk(clf, chunk, run_vt=False,
+                                                    allowlist=allowlist_helper.load_allowlist())
+
+        self.assertEqual(list(out["verdict_source"]), ["allowlist", "allowlist", "model"])
+        self.assertEqual(list(out["final_status"]), ["benign", "benign", "phish"])
+        # Only the URL that is on neither list reaches the model
+        features = clf.predict_proba.call_args.args[0]
+        self.assertEqual(len(features), 1)
+
+
+class LiveScanOnceTests(TempWorkingDirMixin, TestCase):
+    """Events newer than COMMIT_LAG keep the cursor short of the log's end; --once must still finish."""
+    def test_once_stops_when_the_cursor_cannot_settle(self):
+        Watermark.objects.create(name=live_scan_helper.LIVE_CURSOR, position=100)
+        with mock.patch.object(live_scan_helper, "latest_log_id", return_value=150), \
+                mock.patch.object(live_scan_helper, "read_events", return_value=[]) as read, \
+                mock.patch.object(live_scan_helper, "settled_log_id", side_effect=lambda after, upto: 120), \
+                mock.patch("scraperSite.management.commands.URL_live_scan.log_store_available", return_value=True), \
+                mock.patch("scraperSite.management.commands.URL_live_scan.acquire_live_scan_lock", return_value=True), \
+                mock.patch("scraperSite.management.commands.URL_live_scan.latest_log_id", return_value=150):
+            call_command("URL_live_scan", "--once", stdout=io.StringIO())
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual(Watermark.objects.get(name=live_scan_helper.LIVE_CURSOR).position, 120)
+
+    def test_poll_reports_the_settled_advance(self):
+        Watermark.objects.create(name=live_scan_helper.LIVE_CURSOR, position=100)
+        with mock.patch.object(live_scan_helper, "latest_log_id", return_value=150), \
+                mock.patch.object(live_scan_helper, "read_events", return_value=[]), \
+                mock.patch.object(live_scan_helper, "settled_log_id", return_value=100):
+            self.assertEqual(live_scan_helper.poll_once(), (0, 0, 0, 150))
+
+
+class SchedulerTests(TestCase):
+    def test_due_task_runs_once_for_concurrent_callers(self):
+        ScheduledTask.objects.create(name="nightly", task="scan_active_courses", hour=1,
+                                     next_run_at=timezone.now() - timedelta(minutes=1))
+        # Both schedulers read the task before either claimed it
+        first, second = ScheduledTask.objects.get(name="nightly"), ScheduledTask.objects.get(name="nightly")
+        task = mock.Mock(return_value="ran")
+        with mock.patch.dict(scheduler_helper.TASKS, {"scan_active_courses": task}):
+            now = timezone.now()
+            scheduler_helper.run_task(first, now)
+            scheduler_helper.run_task(second, now)
+        task.assert_called_once()
+        self.assertGreater(ScheduledTask.objects.get(name="nightly").next_run_at, now)
+
+    def test_lock_is_held_on_its_own_connection(self):
+        first, second = scheduler_helper.SchedulerLock(), scheduler_helper.SchedulerLock()
+        self.addCleanup(first.release)
+        self.addCleanup(second.release)
+        self.assertTrue(first.held())
+        self.assertTrue(first.held())
+        # Not held by Django's own session, which CONN_MAX_AGE / close_old_connections() may recycle
+        with connection.cursor() as cur:
+            cur.execute(scheduler_helper.HELD_LOCK_SQL,
+                        [scheduler_helper.SCHEDULER_LOCK_NAMESPACE, scheduler_helper.SCHEDULER_LOCK_ID])
+            self.assertFalse(cur.fetchone()[0])
+        self.assertFalse(second.held())
+        # Its session dying hands the lock over; the old scheduler sees that on its next pass
+        first.conn.close()
+        self.assertTrue(second.held())
+        self.assertFalse(first.held())
+
+
+class ScanRunTests(TestCase):
+    """URL_collector_all checkpoints: per-course retries with backoff, and resuming a killed run."""
+    def start(self, *course_ids):
+        courses = [SimpleNamespace(id=cid, fullname=f"Course {cid}") for cid in course_ids]
+        return scan_run_helper.start_or_resume_run({"moodle": courses})
+
+    def job(self, course_id, status):
+        return ScanJob.objects.create(moodle_courseID=course_id, status=status, error="boom" if status == "failed" else "")
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        self.assertEqual([scan_run_helper.retry_delay(n) for n in (1, 2, 3)],
+                         [timedelta(minutes=1), timedelta(minutes=2), timedelta(minutes=4)])
+        self.assertEqual(scan_run_helper.retry_delay(20), scan_run_helper.RETRY_MAX)
+
+    def test_failed_course_is_retried_with_backoff_then_given_up(self):
+        run, _ = self.start(1)
+        unit = run.units.get()
+        failing = self.job(1, "failed")
+        with mock.patch.object(scan_run_helper, "run_course_scan", return_value=failing):
+            for attempt in range(1, scan_run_helper.MAX_ATTEMPTS):
+                before = timezone.now()
+                unit = scan_run_helper.run_unit(unit, "auto")
+                self.assertEqual((unit.status, unit.attempts, unit.last_error), ("retrying", attempt, "boom"))
+                delay = unit.next_attempt_at - before
+                self.assertGreaterEqual(delay, scan_run_helper.retry_delay(attempt))
+                self.assertLess(delay, scan_run_helper.retry_delay(attempt) + timedelta(seconds=5))
+            unit = scan_run_helper.run_unit(unit, "auto")
+        self.assertEqual((unit.status, unit.attempts, unit.next_attempt_at), ("failed", scan_run_helper.MAX_ATTEMPTS, None))
+
+    def test_run_stops_retrying_after_max_attempts(self):
+        run, _ = self.start(1, 2)
+        outcomes = {1: self.job(1, "failed"), 2: self.job(2, "done")}
+        with mock.patch.object(scan_run_helper, "run_course_scan",
+                               side_effect=lambda course_id, **kw: outcomes[course_id]) as scan, \
+                mock.patch.object(scan_run_helper, "retry_delay", return_value=timedelta(0)):
+            summary = scan_run_helper.run_units(run, report=lambda line: None)
+        self.assertEqual([c.args[0] for c in scan.call_args_list].count(1), scan_run_helper.MAX_ATTEMPTS)
+        self.assertEqual((summary["failed"], summary["done"]), (1, 1))
+        self.assertEqual(ScanRun.objects.get(pk=run.pk).status, "done")
+
+    def test_resumed_run_skips_courses_already_done(self):
+        run, resumed = self.start(1, 2, 3)
+        self.assertFalse(resumed)
+        run.units.filter(moodle_courseID=1).update(status="done")
+        run.units.filter(moodle_courseID=2).update(status="retrying", attempts=1,
+                                                   next_attempt_at=timezone.now() + timedelta(hours=1))
+        again, resumed = self.start(1, 2, 3, 4)
+        self.assertTrue(resumed)
+        self.assertEqual(again.pk, run.pk)
+        # The course list is kept as it was when the run started
+        self.assertEqual(again.units.count(), 3)
+        with mock.patch.object(scan_run_helper, "run_course_scan",
+                               side_effect=lambda course_id, **kw: self.job(course_id, "done")) as scan:
+            scan_run_helper.run_units(again, report=lambda line: None)
+        self.assertEqual(sorted(c.args[0] for c in scan.call_args_list), [2, 3])
+        self.assertEqual(set(ScanRunCourse.objects.filter(run=run).values_list("status", flat=True)), {"done"})
@@ -7,6 +7,13 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('view_scanned_log/', views.view_scanned_log, name='view_scanned_log'),
     path('manual', views.manual_scan, name='manual_scan'),  # manual scan page
+    path('manual/course_managers/', views.course_managers_json, name='course_managers'),
+    path('manual/jobs/<int:job_id>/', views.scan_job_status, name='scan_job_status'),
     path('guide/', views.guide, name='guide'),
+    path('search/', views.url_search, name='url_search'),
     path('manual_scan_log/', views.manual_scan_log, name='manual_scan_log'),
+    path('logs/rows/', views.scan_log_rows, name='scan_log_rows'),
+    path('api/reports/', views.api_reports, name='api_reports'),
+    path('api/unsafe_urls/', views.api_unsafe_urls, name='api_unsafe_urls'),
+    path('export/', views.export_scan_data, name='export_scan_data'),
 ]
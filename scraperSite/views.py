@@ -1,20 +1,31 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, FileResponse
 from django.shortcuts import render, redirect
 from .models import (
-    MoodleCourse, User,
-    MoodleContext, MoodleRoleAssign,
-    MoodleUser, MoodleRole, ScanReport
+    MoodleCourse, User, ScanJob, ScanOutput, ScanResult, ScanReport, UnsafeURL, finalised_q, catalogued_q, site_q,
 )
 from django.urls import reverse
 from datetime import datetime, timedelta
-from pathlib import Path
 from django.contrib import messages
+import hmac
 import json
-from django.core.management import call_command
+import tempfile
+from urllib.parse import urlencode
 from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
 
 from .user_log_event import user_log_event
 from .manual_scan_activity import append_activity_log
+from .management.helpers.scan_queue_helper import enqueue_scan_job, scan_service_available
+from .management.helpers.moodle_db_helper import moodle_alias, primary_instance
+from .management.helpers.report_summary_helper import weekly_trend
+from .management.helpers.url_search_helper import search_scanned_urls, MIN_QUERY_LENGTH
+from .management.helpers.export_helper import (
+    EXPORT_FETCH_SIZE, UNSAFE_HEADERS, RESULT_HEADERS,
+    export_querysets, unsafe_rows, result_rows, write_xlsx, iter_csv_lines,
+)
 
 
 # -----------------------------
@@ -56,6 +67,23 @@ def logout_view(request):
 # -----------------------------
 # Home Page (Dashboard)
 # -----------------------------
+TREND_WEEKS = 12
+
+
+def trend_rows(weeks):
+    """Weekly summaries plus bar widths (% of the busiest week) for the trend table."""
+    peak = max((w.total_link for w in weeks), default=0) or 1
+    return [
+        {
+            "week": w,
+            "safe_pct": round(100 * w.safe_link / peak, 1),
+            "suspicious_pct": round(100 * w.suspicious / peak, 1),
+            "malicious_pct": round(100 * w.malicious / peak, 1),
+        }
+        for w in weeks
+    ]
+
+
 def home(request):
     username = request.session.get('username')
     if not username:
@@ -64,16 +92,8 @@ def home(request):
     user = User.objects.get(username=username)
     fullname = user.fullname
 
-    base_dir = Path("url_details")
-    all_dates = []
-    if base_dir.exists():
-        for folder in base_dir.iterdir():
-            if folder.is_dir():
-                try:
-                    d = datetime.strptime(folder.name, "%Y-%m-%d")
-                    all_dates.append(d)
-                except ValueError:
-                    continue
+    # Days that have scan output, straight from the catalogue (local time, like the url_details folders)
+    all_dates = [d.replace(tzinfo=None) for d in ScanOutput.objects.filter(catalogued_q()).datetimes("scanned_at", "day")]
 
     years = sorted({d.year for d in all_dates}, reverse=True)
     year_month_map = {}
@@ -107,6 +127,7 @@ def home(request):
         'selected_year': selected_year,
         'selected_month': selected_month,
         'selected_period_key': selected_period_key,
+        'trend': trend_rows(weekly_trend(TREND_WEEKS)),
     }
 
     return render(request, 'scraperSite/home.html', context)
@@ -115,36 +136,74 @@ def home(request):
 # -----------------------------
 # Helper: Courses + Managers
 # -----------------------------
-def build_courses_and_managers():
-    courses_qs = MoodleCourse.objects.using("moodle").all()
+COURSE_MANAGERS_CACHE_KEY = "course_managers"
+
+COURSE_MANAGERS_SQL = """
+    SELECT DISTINCT ctx.instanceid, u.id, u.firstname, u.lastname, u.email
+    FROM mdl_role_assignments ra
+    JOIN mdl_role r
+      ON r.id = ra.roleid
+     AND r.shortname = 'editingteacher'
+    JOIN mdl_context ctx
+      ON ctx.id = ra.contextid
+     AND ctx.contextlevel = 50
+    JOIN mdl_user u
+      ON u.id = ra.userid
+    ORDER BY ctx.instanceid, u.id
+"""
+
+
+def build_course_managers():
+    """Map course id -> [{name, email}] of its editing teachers, in one query."""
     managers = {}
+    with connections[moodle_alias()].cursor() as cur:
+        cur.execute(COURSE_MANAGERS_SQL)
+        for course_id, _user_id, firstname, lastname, email in cur.fetchall():
+            managers.setdefault(course_id, []).append(
+                {"name": f"{firstname} {lastname}", "email": email}
+            )
+    return managers
 
-    for c in courses_qs:
-        context_ids = MoodleContext.objects.using("moodle").filter(
-            contextlevel=50, instanceid=c.id
-        ).values_list('id', flat=True)
-
-        manager_role_ids = MoodleRole.objects.using("moodle").filter(
-            shortname='editingteacher'
-        ).values_list('id', flat=True)
 
-        manager_user_ids = MoodleRoleAssign.objects.using("moodle").filter(
-            roleid__in=manager_role_ids,
-            contextid__in=context_ids
-        ).values_list('userid', flat=True)
+def get_course_managers():
+    """Cached course -> managers map (refreshed every settings.COURSE_MANAGERS_CACHE_TTL seconds)."""
+    return cache.get_or_set(
+        COURSE_MANAGERS_CACHE_KEY, build_course_managers, settings.COURSE_MANAGERS_CACHE_TTL
+    )
 
-        users = MoodleUser.objects.using("moodle").filter(id__in=manager_user_ids)
-        managers[c.id] = [
-            {"name": f"{u.firstname} {u.lastname}", "email": u.email}
-            for u in users
-        ]
 
-    return courses_qs, managers
+def course_managers_json(request):
+    """Lazily fetched by the manual scan page to fill the manager/email columns."""
+    if not request.session.get('username'):
+        return JsonResponse({"error": "Not logged in"}, status=403)
+    return JsonResponse(get_course_managers())
 
 
 # -----------------------------
 # Manual Scan Page
 # -----------------------------
+def format_report_summary(report):
+    """Plain-text report summary parsed by manual_scan.js into the result popup."""
+    if report is None:
+        return "No scan reports found for this course."
+
+    all_logs = (
+        f"--- Report {report.report_id} ({report.date}) ---\n"
+        f"Total Links: {report.total_link}\n"
+        f"Safe Links: {report.safe_link}\n"
+        f"Suspicious: {report.suspicious}, Malicious: {report.malicious}\n"
+        f"Allowlisted: {report.allowlisted}\n"
+        "Unsafe URLs:\n"
+    )
+    unsafe_urls = report.unsafe_urls.all()
+    if unsafe_urls.exists():
+        for url in unsafe_urls:
+            all_logs += f"- [Label: {url.status}, Source: {url.source}] {url.url}\n"
+    else:
+        all_logs += "None\n"
+    return all_logs
+
+
 def manual_scan(request):
     username = request.session.get('username')
     if not username:
@@ -160,52 +219,80 @@ def manual_scan(request):
             return redirect(request.path)
 
         try:
-            course = MoodleCourse.objects.using("moodle").get(id=course_id)
+            course = MoodleCourse.objects.using(moodle_alias()).get(id=course_id)
         except MoodleCourse.DoesNotExist:
             messages.error(request, "Selected course does not exist.")
             return redirect(request.path)
 
-        # ✅ Run scan as manual type
-        call_command("URL_collector_single", course_id=course_id, scan_type="manual")
-
+        # ✅ Queue scan as manual type (served before the weekly batch by the scanner daemon).
+        # If the course is already being scanned, follow that job instead of starting another.
+        job, created = enqueue_scan_job(
+            course.id, scan_type="manual", requested_by=username, reuse_unchanged=True,
+        )
         append_activity_log("SCAN", username, course.fullname)
+        if not created:
+            messages.info(request, "This course is already being scanned — showing that scan's progress.")
 
-        reports = ScanReport.objects.filter(moodle_courseID=course_id).order_by('-report_id')
-        if reports.exists():
-            latest = reports.first()
-            all_logs = (
-                f"--- Report {latest.report_id} ({latest.date}) ---\n"
-                f"Total Links: {latest.total_link}\n"
-                f"Safe Links: {latest.safe_link}\n"
-                f"Suspicious: {latest.suspicious}, Malicious: {latest.malicious}\n"
-                "Unsafe URLs:\n"
-            )
-            unsafe_urls = latest.unsafe_urls.all()
-            if unsafe_urls.exists():
-                for url in unsafe_urls:
-                    all_logs += f"- [Label: {url.status}, Source: {url.source}] {url.url}\n"
-            else:
-                all_logs += "None\n"
+        return redirect(f"{reverse('manual_scan')}?job={job.job_id}")
+
+    return render(request, "scraperSite/manual_scan.html", {
+        "courses": MoodleCourse.objects.using(moodle_alias()).all(),
+        "fullname": fullname,
+        "scan_job_id": request.GET.get("job", ""),
+    })
+
+
+def scan_job_status(request, job_id):
+    """Polled by the manual scan page while a job is queued/running."""
+    if not request.session.get('username'):
+        return JsonResponse({"error": "Not logged in"}, status=403)
+
+    try:
+        job = ScanJob.objects.select_related("report").get(job_id=job_id)
+    except ScanJob.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    data = {
+        "job_id": job.job_id,
+        "status": job.status,
+        "stage": job.stage,
+        "stage_label": job.get_stage_display(),
+        "progress": job.progress,
+        "message": job.message,
+        "error": job.error,
+    }
+    if job.status == "queued" and not scan_service_available():
+        # Scans never run inside a web request; say why this one is not moving
+        data["message"] = "No scan worker is online — the scan starts as soon as one is"
+    if job.status == "done":
+        data["scan_result"] = format_report_summary(job.report)
+        if job.report:
+            data["course_name"] = job.report.moodle_courseName
         else:
-            all_logs = "No scan reports found for this course."
+            course = MoodleCourse.objects.using(moodle_alias(instance=job.instance)).filter(id=job.moodle_courseID).first()
+            data["course_name"] = course.fullname if course else ""
+    return JsonResponse(data)
 
-        courses, course_managers = build_courses_and_managers()
-        course_managers_json = json.dumps(course_managers)
 
-        return render(request, "scraperSite/manual_scan.html", {
-            "courses": courses,
-            "fullname": fullname,
-            "course_managers_json": course_managers_json,
-            "scan_result": all_logs,
-            "course_name": course.fullname,
-        })
+# -----------------------------
+# URL Search (incident lookups over every scanned URL)
+# -----------------------------
+def url_search(request):
+    username = request.session.get('username')
+    if not username:
+        return redirect('login')
 
-    courses, course_managers = build_courses_and_managers()
-    course_managers_json = json.dumps(course_managers)
-    return render(request, "scraperSite/manual_scan.html", {
-        "courses": courses,
-        "fullname": fullname,
-        "course_managers_json": course_managers_json,
+    query = request.GET.get("q", "").strip()
+    mode = request.GET.get("mode") if request.GET.get("mode") in ("domain", "contains") else None
+    hits, summary = search_scanned_urls(query, mode=mode) if query else ([], {})
+
+    return render(request, 'scraperSite/url_search.html', {
+        'fullname': User.objects.get(username=username).fullname,
+        'query': query,
+        'mode_param': mode or "",
+        'hits': hits,
+        'summary': summary,
+        'min_length': MIN_QUERY_LENGTH,
     })
 
 
@@ -218,6 +305,320 @@ def guide(request):
     return render(request, 'scraperSite/guide.html', {'fullname': fullname})
 
 
+# -----------------------------
+# Log API: stored scan results, filtered + paged on the server
+# -----------------------------
+LOG_PAGE_SIZE = 20
+LOG_PAGE_MAX = 200
+LOG_CSV_COLS = ["course", "exported", "url", "label", "confidence", "vt_result", "source", "author"]
+
+
+def parse_day(value):
+    """'YYYY-MM-DD' -> aware midnight in the site timezone, or None."""
+    try:
+        return timezone.make_aware(datetime.strptime(value, "%Y-%m-%d"))
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_scan_results(params):
+    """
+    ScanResult rows matching the log page's scope and filters:
+    scan_type, period (Monday of the week), course_id + instance, label, source, date_from, date_to, conf_min, url.
+    """
+    results = ScanResult.objects.select_related("output").filter(catalogued_q("output__"))
+
+    scan_type = params.get("scan_type")
+    if scan_type in ("auto", "manual", "live"):
+        results = results.filter(output__scan_type=scan_type)
+
+    period_start = parse_day(params.get("period"))
+    if period_start:
+        results = results.filter(
+            output__scanned_at__gte=period_start, output__scanned_at__lt=period_start + timedelta(days=7),
+        )
+
+    course_id = params.get("course_id")
+    if course_id and course_id.isdigit():
+        results = results.filter(output__moodle_courseID=int(course_id))
+    instance = site_param(params)
+    if instance:
+        results = results.filter(site_q(instance, "output__"))
+
+    label = params.get("label")
+    if label and label != "all":
+        results = results.filter(final_status=label)
+
+    source = params.get("source")
+    if source:
+        results = results.filter(source=source)
+
+    date_from = parse_day(params.get("date_from"))
+    if date_from:
+        results = results.filter(output__scanned_at__gte=date_from)
+    date_to = parse_day(params.get("date_to"))
+    if date_to:
+        results = results.filter(output__scanned_at__lt=date_to + timedelta(days=1))
+
+    try:
+        results = results.filter(confidence__gte=float(params.get("conf_min", "")))
+    except ValueError:
+        pass
+
+    url_query = (params.get("url") or "").strip()
+    if url_query:
+        results = results.filter(url__icontains=url_query)
+
+    return results
+
+
+def scan_result_row(result):
+    return {
+        "id": result.result_id,
+        "course": result.output.moodle_courseName,
+        "exported": timezone.localtime(result.output.scanned_at).strftime("%Y-%m-%d %H:%M:%S"),
+        "url": result.url,
+        "label": result.final_status,
+        "confidence": result.confidence,
+        "vt_result": result.vt_result,
+        "source": result.source,
+        "author": result.author_username or result.author_name,
+    }
+
+
+def stream_scan_results_csv(results):
+    rows = (scan_result_row(r) for r in results.iterator(chunk_size=EXPORT_FETCH_SIZE))
+    return iter_csv_lines(LOG_CSV_COLS, ([row[c] for c in LOG_CSV_COLS] for row in rows))
+
+
+def scan_log_rows(request):
+    """
+    JSON page of scan results, newest first, keyset-paged with ?after=<id>.
+    The first page (no `after`) also carries per-label counts and the courses in scope.
+    ?format=csv streams every matching row instead.
+    """
+    if not request.session.get('username'):
+        return JsonResponse({"error": "Not logged in"}, status=403)
+
+    params = request.GET
+    results = filter_scan_results(params).order_by("-result_id")
+
+    if params.get("format") == "csv":
+        response = StreamingHttpResponse(stream_scan_results_csv(results), content_type="text/csv")
+        stamp = timezone.localtime(timezone.now()).strftime("%Y-%m-%d")
+        response["Content-Disposition"] = f'attachment; filename="scanned_logs_{stamp}.csv"'
+        return response
+
+    try:
+        limit = min(max(int(params.get("limit", LOG_PAGE_SIZE)), 1), LOG_PAGE_MAX)
+    except ValueError:
+        limit = LOG_PAGE_SIZE
+
+    data = {}
+    after = params.get("after")
+    if after and after.isdigit():
+        page = results.filter(result_id__lt=int(after))
+    else:
+        page = results
+        counts = results.order_by().values("final_status").annotate(n=Count("result_id"))
+        data["summary"] = {c["final_status"]: c["n"] for c in counts}
+        # Outputs catalogued without a report belong to the primary site
+        courses = {
+            (course_id, instance or primary_instance()): name
+            for course_id, instance, name in (
+                results.order_by()
+                .values_list("output__moodle_courseID", "output__report__instance", "output__moodle_courseName")
+                .distinct()
+            )
+        }
+        data["courses"] = [
+            {"id": course_id, "instance": instance, "name": name} for (course_id, instance), name in courses.items()
+        ]
+
+    rows = [scan_result_row(r) for r in page[:limit + 1]]
+    data["rows"] = rows[:limit]
+    data["next_after"] = rows[limit - 1]["id"] if len(rows) > limit else None
+    return JsonResponse(data)
+
+
+# -----------------------------
+# Reporting API (read-only JSON / NDJSON for SIEM + coordinator tools)
+# -----------------------------
+API_PAGE_SIZE = 100
+API_PAGE_MAX = 1000
+
+
+def api_authorised(request):
+    """Logged-in site users, or a bearer token listed in REPORTING_API_TOKENS."""
+    if request.session.get('username'):
+        return True
+    auth = request.headers.get("Authorization", "")
+    if not auth.startswith("Bearer "):
+        return False
+    # Constant-time comparison against every token, so timing does not reveal a matching prefix
+    token = auth[len("Bearer "):].strip().encode()
+    return any([hmac.compare_digest(token, t.encode()) for t in settings.REPORTING_API_TOKENS])
+
+
+def report_row(report):
+    return {
+        "report_id": report.report_id,
+        "date": report.date.isoformat(),
+        "instance": report.instance,
+        "course_id": report.moodle_courseID,
+        "course_name": report.moodle_courseName,
+        "total_link": report.total_link,
+        "safe_link": report.safe_link,
+        "suspicious": report.suspicious,
+        "malicious": report.malicious,
+        "allowlisted": report.allowlisted,
+    }
+
+
+def unsafe_url_row(unsafe):
+    return {
+        "url_id": unsafe.url_id,
+        "url": unsafe.url,
+        "status": unsafe.status,
+        "check_status": unsafe.check_status,
+        "source": unsafe.source,
+        "moodle_user_id": unsafe.moodle_userID,
+        "report_id": unsafe.report_id,
+        "instance": unsafe.report.instance,
+        "course_id": unsafe.report.moodle_courseID,
+    }
+
+
+def api_response(request, queryset, pk_name, to_row):
+    """
+    Keyset-paged JSON ({"results", "next_after"}) ordered by primary key; ?after=<pk> for the next page.
+    ?format=ndjson streams every matching row, one JSON object per line.
+    """
+    queryset = queryset.order_by(pk_name)
+    after = request.GET.get("after", "")
+    if after.isdigit():
+        queryset = queryset.filter(**{f"{pk_name}__gt": int(after)})
+
+    if request.GET.get("format") == "ndjson":
+        rows = (json.dumps(to_row(obj)) + "\n" for obj in queryset.iterator(chunk_size=2000))
+        return StreamingHttpResponse(rows, content_type="application/x-ndjson")
+
+    try:
+        limit = min(max(int(request.GET.get("limit", API_PAGE_SIZE)), 1), API_PAGE_MAX)
+    except ValueError:
+        limit = API_PAGE_SIZE
+
+    page = list(queryset[:limit + 1])
+    return JsonResponse({
+        "results": [to_row(obj) for obj in page[:limit]],
+        "next_after": getattr(page[limit - 1], pk_name) if len(page) > limit else None,
+    })
+
+
+def site_param(params):
+    """?instance= (Moodle site); course ids are only unique per site, so ?course_id= alone means the primary."""
+    instance = params.get("instance", "")
+    if not instance and params.get("course_id", "").isdigit():
+        return primary_instance()
+    return instance
+
+
+def filter_by_course_and_date(queryset, params, prefix=""):
+    """?course_id= / ?instance= and ?date_from= / ?date_to= (YYYY-MM-DD, inclusive) against ScanReport fields."""
+    course_id = params.get("course_id", "")
+    if course_id.isdigit():
+        queryset = queryset.filter(**{f"{prefix}moodle_courseID": int(course_id)})
+    instance = site_param(params)
+    if instance:
+        queryset = queryset.filter(**{f"{prefix}instance": instance})
+    date_from = parse_day(params.get("date_from"))
+    if date_from:
+        queryset = queryset.filter(**{f"{prefix}date__gte": date_from.date()})
+    date_to = parse_day(params.get("date_to"))
+    if date_to:
+        queryset = queryset.filter(**{f"{prefix}date__lte": date_to.date()})
+    return queryset
+
+
+def api_reports(request):
+    """GET /api/reports/?course_id=&instance=&date_from=&date_to=&after=&limit=&format=ndjson"""
+    if not api_authorised(request):
+        return JsonResponse({"error": "Unauthorised"}, status=401)
+    reports = filter_by_course_and_date(ScanReport.objects.filter(finalised_q()), request.GET)
+    return api_response(request, reports, "report_id", report_row)
+
+
+def api_unsafe_urls(request):
+    """GET /api/unsafe_urls/?report_id=&course_id=&instance=&date_from=&date_to=&status=&check_status=&url=&after=&limit=&format=ndjson"""
+    if not api_authorised(request):
+        return JsonResponse({"error": "Unauthorised"}, status=401)
+
+    params = request.GET
+    unsafe = filter_by_course_and_date(
+        UnsafeURL.objects.select_related("report").filter(finalised_q("report__")), params, prefix="report__",
+    )
+    report_id = params.get("report_id", "")
+    if report_id.isdigit():
+        unsafe = unsafe.filter(report_id=int(report_id))
+    for field in ("status", "check_status", "url"):
+        if params.get(field):
+            unsafe = unsafe.filter(**{field: params[field]})
+    return api_response(request, unsafe, "url_id", unsafe_url_row)
+
+
+# -----------------------------
+# Export: UnsafeURL / full scan rows as XLSX or CSV
+# -----------------------------
+def export_scan_data(request):
+    """
+    GET /export/?format=xlsx|csv&kind=unsafe|results|both&report_id=&course_id=&instance=&date_from=&date_to=&scan_type=
+    XLSX is built in constant-memory mode in a temp file; CSV is streamed row by row.
+    Both read through a server-side cursor.
+    """
+    if not api_authorised(request):
+        return JsonResponse({"error": "Unauthorised"}, status=401)
+
+    params = request.GET
+    fmt = params.get("format", "xlsx")
+    kind = params.get("kind", "both" if fmt == "xlsx" else "unsafe")
+    if fmt not in ("xlsx", "csv") or kind not in ("unsafe", "results", "both") or (fmt == "csv" and kind == "both"):
+        return JsonResponse({"error": "Use format=xlsx (kind unsafe/results/both) or format=csv (kind unsafe/results)"},
+                            status=400)
+
+    date_from = parse_day(params.get("date_from"))
+    date_to = parse_day(params.get("date_to"))
+    unsafe, results = export_querysets(
+        report_id=int(params["report_id"]) if params.get("report_id", "").isdigit() else None,
+        course_id=int(params["course_id"]) if params.get("course_id", "").isdigit() else None,
+        instance=site_param(params) or None,
+        date_from=date_from.date() if date_from else None,
+        date_to=date_to.date() if date_to else None,
+        scan_type=params.get("scan_type") if params.get("scan_type") in ("auto", "manual", "live") else None,
+    )
+    stamp = timezone.localtime(timezone.now()).strftime("%Y%m%d_%H%M%S")
+
+    if fmt == "csv":
+        if kind == "unsafe":
+            lines = iter_csv_lines(UNSAFE_HEADERS, unsafe_rows(unsafe))
+        else:
+            lines = iter_csv_lines(RESULT_HEADERS, result_rows(results))
+        response = StreamingHttpResponse(lines, content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="scan_{kind}_{stamp}.csv"'
+        return response
+
+    sheets = []
+    if kind in ("unsafe", "both"):
+        sheets.append(("Unsafe URLs", UNSAFE_HEADERS, unsafe_rows(unsafe)))
+    if kind in ("results", "both"):
+        sheets.append(("Scan results", RESULT_HEADERS, result_rows(results)))
+
+    # Anonymous temp file: removed as soon as FileResponse closes it
+    tmp = tempfile.TemporaryFile()
+    write_xlsx(tmp, sheets)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename=f"scan_{kind}_{stamp}.xlsx")
+
+
 # -----------------------------
 # Period Log View (Automatic Weekly Logs)
 # -----------------------------
@@ -233,29 +634,13 @@ def view_scanned_log(request):
     monday_date = datetime.strptime(period_key, "%Y-%m-%d")
     sunday_date = monday_date + timedelta(days=6)
 
-    base_dir = Path("url_details")
-    all_files_content = ""
-
-    if base_dir.exists():
-        for folder in base_dir.iterdir():
-            if folder.is_dir():
-                try:
-                    folder_date = datetime.strptime(folder.name, "%Y-%m-%d")
-                except ValueError:
-                    continue
-
-                if monday_date <= folder_date <= sunday_date:
-                    # 🔥 AUTO ONLY
-                    for txt_file in folder.glob("auto_*_scanned.txt"):
-                        all_files_content += f"\n--- {txt_file.name} ---\n"
-                        all_files_content += txt_file.read_text(encoding="utf-8") + "\n"
-
-    if not all_files_content:
-        all_files_content = "No logs found for this period."
-
+    # Rows are fetched page by page from scan_log_rows
     return render(request, 'scraperSite/scanned_logs.html', {
         'fullname': User.objects.get(username=username).fullname,
-        'log_content': all_files_content,
+        'log_scope': {"scan_type": "auto", "period": period_key},  # 🔥 AUTO ONLY
+        'export_query': urlencode({
+            "scan_type": "auto", "date_from": period_key, "date_to": sunday_date.strftime("%Y-%m-%d"),
+        }),
         'label': f"{monday_date.strftime('%d %b')} - {sunday_date.strftime('%d %b')}"
     })
 
@@ -275,40 +660,15 @@ def manual_scan_log(request):
         return redirect('manual_scan')
 
     try:
-        course = MoodleCourse.objects.using("moodle").get(id=course_id)
+        course = MoodleCourse.objects.using(moodle_alias()).get(id=course_id)
     except MoodleCourse.DoesNotExist:
         messages.error(request, "Selected course does not exist.")
         return redirect('manual_scan')
 
-    course_name = course.fullname
-
-    base_dir = Path("url_details")
-    all_files_content = ""
-
-    if base_dir.exists():
-        for folder in base_dir.iterdir():
-            if not folder.is_dir():
-                continue
-
-            # 🔥 MANUAL ONLY
-            for txt_file in folder.glob("manual_*_scanned.txt"):
-                try:
-                    txt = txt_file.read_text(encoding="utf-8")
-                except Exception:
-                    continue
-
-                if f"Course Name: {course_name}" not in txt:
-                    continue
-
-                all_files_content += f"\n--- {txt_file.name} ---\n"
-                all_files_content += txt + "\n"
-
-    if not all_files_content:
-        all_files_content = "No logs found for this course."
-
     return render(request, "scraperSite/manual_scan_log.html", {
         "fullname": user.fullname,
-        "course_name": course_name,
-        "log_content": all_files_content,
+        "course_name": course.fullname,
+        "log_scope": {"scan_type": "manual", "course_id": str(course.id)},  # 🔥 MANUAL ONLY
+        "export_query": urlencode({"scan_type": "manual", "course_id": course.id}),
     })
 